@@ -0,0 +1,436 @@
+#!/usr/bin/env python3
+# -*- coding: utf-8 -*-
+"""
+Script to stand in for the external tools of the pipeline, writing format-correct synthetic outputs in a configurable time
+"""
+
+# authorship
+__author__ = "Gemy George Kaithakottil"
+__maintainer__ = "Gemy George Kaithakottil"
+__email__ = "gemygk@gmail.com"
+
+# import libraries
+import argparse
+from argparse import Namespace, RawTextHelpFormatter
+import gzip
+import json
+import os
+import random
+import re
+import shutil
+import stat
+import sys
+import time
+import zlib
+
+# the tools are run from the pipeline rules, outside of the repository
+sys.path.insert(0, os.path.dirname(os.path.dirname(os.path.abspath(__file__))))
+
+from benchmarks.generators import (
+    FAMILIES,
+    REPEATMASKER_OUT_HEADER,
+    SyntheticRepeats,
+)
+from eirepeat.scripts.fasta_stats import FastaStats
+
+# get script name
+script = os.path.basename(sys.argv[0])
+
+# configuration of the tools, written next to them
+CONFIG_FILE = "fake_tools.json"
+LINE_WIDTH = 60
+# stand-in for GNU time, for machines without /usr/bin/time. Writes the fields resource_telemetry reads
+TIME_SCRIPT = r"""#!/bin/sh
+[ "$1" = "-v" ] && shift
+start=$(date +%s%N)
+"$@"
+status=$?
+end=$(date +%s%N)
+cs=$(( (end - start) / 10000000 ))
+printf '\tCommand being timed: "%s"\n\tUser time (seconds): 0.00\n\tSystem time (seconds): 0.00\n\tPercent of CPU this job got: 0%%\n\tElapsed (wall clock) time (h:mm:ss or m:ss): %d:%02d.%02d\n\tMaximum resident set size (kbytes): 0\n\tExit status: %d\n' "$*" $((cs / 6000)) $((cs / 100 % 60)) $((cs % 100)) $status >&2
+exit $status
+"""
+
+
+def read_fasta(fasta):
+    """
+    :return: List of (header, sequence) of a FASTA, optionally gzip compressed, or of stdin for '-'
+    """
+    if fasta == "-":
+        data = sys.stdin.buffer.read()
+    else:
+        with open(fasta, "rb") as fh:
+            data = fh.read()
+    if data[:2] == b"\x1f\x8b":
+        data = gzip.decompress(data)
+    records = list()
+    for line in data.decode().splitlines():
+        if line.startswith(">"):
+            records.append([line[1:], list()])
+        elif records:
+            records[-1][1].append(line.strip())
+    return [(header, "".join(lines)) for header, lines in records]
+
+
+def write_fasta(records, output, width=LINE_WIDTH):
+    fh = sys.stdout if output == "-" else open(output, "w")
+    try:
+        for header, seq in records:
+            fh.write(f">{header}\n")
+            for i in range(0, len(seq), width):
+                fh.write(f"{seq[i : i + width]}\n")
+    finally:
+        if fh is not sys.stdout:
+            fh.close()
+
+
+def get_sizes(fasta):
+    """
+    :return: List of (name, length) of the non-empty sequences of a FASTA
+    """
+    stats = FastaStats(Namespace(fasta=fasta))
+    stats.process_fasta()
+    return [(name, length) for name, length, *_ in stats.records if length]
+
+
+def mask_sequence(seq, intervals, soft=False):
+    """
+    :param intervals: 0-based, half-open intervals to mask
+    :return: Sequence masked with N, or lower case with soft
+    """
+    seq = bytearray(seq, "ascii")
+    for start, end in intervals:
+        seq[start:end] = seq[start:end].lower() if soft else b"N" * (end - start)
+    return seq.decode()
+
+
+def get_random_sequence(rng, length):
+    return "".join(rng.choices("ACGT", k=length))
+
+
+class FakeTool:
+    def __init__(self, tool, args, config):
+        self.tool = tool
+        self.args = args
+        self.config = config
+        self.records = config.get("records", 1000)
+        self.families = config.get("families", 100)
+        # same command, same outputs
+        self.seed = config.get("seed", 7) + zlib.crc32(
+            " ".join([os.getcwd(), tool] + args).encode()
+        )
+
+    def parse_args(self, *options, flags=(), positional=True):
+        parser = argparse.ArgumentParser(
+            prog=self.tool, add_help=False, allow_abbrev=False
+        )
+        for option in options:
+            parser.add_argument(option)
+        for flag in flags:
+            parser.add_argument(flag, action="store_true")
+        if positional:
+            parser.add_argument("inputs", nargs="*")
+        args, _ = parser.parse_known_intermixed_args(self.args)
+        return args
+
+    def get_repeats(self, sizes):
+        return SyntheticRepeats(self.records, seed=self.seed, sizes=sizes)
+
+    def seqkit(self):
+        command = self.args[0]
+        args = self.parse_args(
+            "-w",
+            "-o",
+            "-p",
+            "-j",
+            flags=("-u", "--only-id", "-r", "--by-length", "--reverse", "--two-pass"),
+        )
+        inputs = args.inputs[1:] or ["-"]
+        records = [r for fasta in inputs for r in read_fasta(fasta)]
+        if command == "seq":
+            if args.only_id:
+                records = [(h.split(maxsplit=1)[0], s) for h, s in records]
+            if args.u:
+                records = [(h, s.upper()) for h, s in records]
+        elif command == "sort":
+            records.sort(key=lambda r: len(r[1]), reverse=args.reverse)
+        elif command == "grep":
+            pattern = re.compile(args.p) if args.r else None
+            records = [
+                r
+                for r in records
+                if (
+                    pattern.search(r[0].split()[0])
+                    if pattern
+                    else r[0].split()[0] == args.p
+                )
+            ]
+        write_fasta(records, args.o or "-", int(args.w or LINE_WIDTH))
+
+    def BuildDatabase(self):
+        args = self.parse_args("-name", "-engine")
+        with open(f"{args.name}.translation", "w") as fh:
+            for i, (name, _) in enumerate(get_sizes(args.inputs[0])):
+                fh.write(f"{name}\t{i}\n")
+        for ext in ("nhr", "nin", "nnd", "nni", "nog", "nsq"):
+            open(f"{args.name}.{ext}", "wb").close()
+
+    def RepeatModeler(self):
+        args = self.parse_args("-database", "-engine", "-p", "-srand")
+        rng = random.Random(self.seed)
+        names = [
+            (f"rnd-1_family-{i + 1}", FAMILIES[i % len(FAMILIES)][1])
+            for i in range(self.families)
+        ]
+        with open(f"{args.database}-families.fa", "w") as fa:
+            for name, family in names:
+                seq = get_random_sequence(rng, rng.randint(100, 3000))
+                fa.write(f">{name}#{family} ( RepeatScout Family Size = 12 )\n")
+                for i in range(0, len(seq), LINE_WIDTH):
+                    fa.write(f"{seq[i : i + LINE_WIDTH]}\n")
+        with open(f"{args.database}-families.stk", "w") as stk:
+            for name, family in names:
+                stk.write(
+                    f"# STOCKHOLM 1.0\n#=GF ID    {name}\n#=GF TP    {family}\n"
+                    f"{name}    ACGT\n//\n"
+                )
+
+    def RepeatMasker(self):
+        args = self.parse_args(
+            "-engine",
+            "-pa",
+            "-lib",
+            "-species",
+            "-dir",
+            flags=("-a", "-x", "-xsmall", "-gff"),
+        )
+        fasta = args.inputs[0]
+        name = os.path.basename(fasta)
+        output = os.path.join(args.dir or os.path.dirname(fasta), name)
+        repeats = self.get_repeats(get_sizes(fasta))
+        intervals = dict()
+        counts = dict()
+        with open(f"{output}.out", "w") as out, open(f"{output}.out.gff", "w") as gff:
+            out.write(REPEATMASKER_OUT_HEADER)
+            gff.write(f"##gff-version 2\n##date 2023-03-01\n##sequence-region {name}\n")
+            for i, repeat in enumerate(repeats.get_repeats(), 1):
+                out.write(repeats.get_repeatmasker_out(i, repeat))
+                gff.write(repeats.get_repeatmasker_gff(i, repeat))
+                intervals.setdefault(repeat[0], list()).append(
+                    (repeat[1] - 1, repeat[2])
+                )
+                counts[repeat[5]] = counts.get(repeat[5], 0) + 1
+        with open(f"{output}.tbl", "w") as fh:
+            fh.write(f"file name: {name}\n")
+            for family, count in sorted(counts.items()):
+                fh.write(f"{family:<20} {count:>8} elements\n")
+        with gzip.open(f"{output}.cat.gz", "wt") as fh:
+            fh.write(f"## Total Sequences: {len(repeats.scaffolds)}\n")
+        if args.a:
+            with open(f"{output}.align", "w") as fh:
+                fh.write(f"## {name} alignments\n")
+        write_fasta(
+            [
+                (h, mask_sequence(s, intervals.get(h.split()[0], []), not args.x))
+                for h, s in read_fasta(fasta)
+            ],
+            f"{output}.masked",
+        )
+
+    def famdb(self):
+        # famdb.py -i <database> info|families .. <species>
+        if "info" in self.args:
+            print("Dfam famdb\nVersion: 3.7-benchmark\nTotal consensus sequences: 100")
+            return
+        rng = random.Random(self.seed)
+        for i in range(self.families):
+            repeat, family = FAMILIES[i % len(FAMILIES)]
+            seq = get_random_sequence(rng, rng.randint(50, 2000))
+            print(f">{repeat}_{i + 1}#{family}")
+            for j in range(0, len(seq), LINE_WIDTH):
+                print(seq[j : j + LINE_WIDTH])
+
+    def Red(self):
+        args = self.parse_args(
+            "-gnm", "-sco", "-cnd", "-rpt", "-msk", "-hmo", positional=False
+        )
+        for fasta in sorted(os.listdir(args.gnm)):
+            if not fasta.endswith(".fa"):
+                continue
+            stem = fasta[: -len(".fa")]
+            path = os.path.join(args.gnm, fasta)
+            repeats = self.get_repeats(get_sizes(path))
+            intervals = dict()
+            with open(os.path.join(args.rpt, f"{stem}.rpt"), "w") as fh:
+                for i, repeat in enumerate(repeats.get_repeats(), 1):
+                    fh.write(repeats.get_red_rpt(i, repeat))
+                    intervals.setdefault(repeat[0], list()).append(
+                        (repeat[1] - 1, repeat[2])
+                    )
+            write_fasta(
+                [
+                    (h, mask_sequence(s, intervals.get(h.split()[0], []), True))
+                    for h, s in read_fasta(path)
+                ],
+                os.path.join(args.msk, f"{stem}.msk"),
+            )
+
+    def transposonPSI(self):
+        # transposonPSI.pl <fasta> nuc
+        fasta = self.args[0]
+        rng = random.Random(self.seed)
+        hits = list()
+        for name, length in get_sizes(fasta):
+            # about one in five reference sequences carries transposon hits
+            if rng.random() >= 0.2 or length < 30:
+                continue
+            start = rng.randint(1, length - 29)
+            end = rng.randint(start + 29, min(length, start + 1500))
+            repeat, _ = FAMILIES[rng.randrange(len(FAMILIES))]
+            hits.append(
+                (name, start, end, rng.choice("+-"), repeat, rng.randint(50, 900))
+            )
+        with open(f"{fasta}.TPSI.allHits", "w") as fh:
+            for name, start, end, strand, repeat, score in hits:
+                first, second = (start, end) if strand == "+" else (end, start)
+                fh.write(
+                    f"chain\t{repeat}\t1\t{end - start + 1}\t{score}\t{name}\t{strand}\t{score}\t{first}\t{second}\n"
+                )
+        for ext in ("allHits.chains", "allHits.bestPerLocus"):
+            shutil.copyfile(f"{fasta}.TPSI.allHits", f"{fasta}.TPSI.{ext}")
+            with open(f"{fasta}.TPSI.{ext}.gff3", "w") as fh:
+                for i, (name, start, end, strand, repeat, score) in enumerate(hits, 1):
+                    fh.write(
+                        f"{name}\tTPSI\ttranspos\t{start}\t{end}\t{score}\t{strand}\t.\tID=chain{i};Target={repeat}\n"
+                    )
+
+    def makeblastdb(self):
+        args = self.parse_args("-in", "-dbtype", "-input_type", positional=False)
+        for ext in ("nhr", "nin", "nsq"):
+            open(f"{vars(args)['in']}.{ext}", "wb").close()
+
+    def blastn(self):
+        args = self.parse_args(
+            "-task", "-query", "-db", "-evalue", "-num_threads", "-outfmt", "-out"
+        )
+        rng = random.Random(self.seed)
+        subjects = get_sizes(args.db) if os.path.exists(args.db) else [("db", 10000)]
+        with open(args.out, "w") as fh:
+            for name, length in get_sizes(args.query):
+                if rng.random() >= 0.5 or length < 30:
+                    continue
+                start = rng.randint(1, length - 29)
+                end = rng.randint(start + 29, length)
+                hit = end - start + 1
+                subject, subject_length = rng.choice(subjects)
+                identity = round(rng.uniform(80, 100), 2)
+                # -outfmt '6 qseqid sseqid pident qstart qend sstart send qlen slen length nident mismatch positive gapopen gaps evalue bitscore'
+                fh.write(
+                    f"{name}\t{subject}\t{identity}\t{start}\t{end}\t1\t{min(hit, subject_length)}\t{length}\t{subject_length}"
+                    f"\t{hit}\t{int(hit * identity / 100)}\t{hit - int(hit * identity / 100)}\t{int(hit * identity / 100)}\t0\t0\t1e-30\t{hit * 1.8:.1f}\n"
+                )
+
+    def maskFastaFromBed(self):
+        args = self.parse_args("-fi", "-bed", "-fo", flags=("-soft",), positional=False)
+        intervals = dict()
+        with open(args.bed, "r") as fh:
+            for line in fh:
+                x = line.rstrip("\n").split("\t")
+                if len(x) >= 3:
+                    intervals.setdefault(x[0], list()).append((int(x[1]), int(x[2])))
+        write_fasta(
+            [
+                (h, mask_sequence(s, intervals.get(h.split()[0], []), args.soft))
+                for h, s in read_fasta(args.fi)
+            ],
+            args.fo,
+        )
+
+    def run(self):
+        start = time.time()
+        function = TOOLS[self.tool]
+        getattr(self, function)()
+        seconds = self.config.get("seconds", dict())
+        target = seconds.get(self.tool, seconds.get("__default__", 0))
+        time.sleep(max(0, target - (time.time() - start)))
+        if self.config.get("log"):
+            with open(self.config["log"], "a") as fh:
+                fh.write(f"{self.tool}\t{start:.6f}\t{time.time():.6f}\n")
+
+
+# tool name in the pipeline rules to the method writing its outputs
+TOOLS = {
+    "seqkit": "seqkit",
+    "BuildDatabase": "BuildDatabase",
+    "RepeatModeler": "RepeatModeler",
+    "RepeatMasker": "RepeatMasker",
+    "famdb.py": "famdb",
+    "Red": "Red",
+    "transposonPSI.pl": "transposonPSI",
+    "makeblastdb": "makeblastdb",
+    "blastn": "blastn",
+    "maskFastaFromBed": "maskFastaFromBed",
+}
+
+
+def write_tools(bin_dir, config):
+    """
+    Write an executable for each of the tools to bin_dir, with an 'activate' script adding them to the PATH
+    for the 'source' configuration, and a 'time' stand-in for machines without GNU time
+    :param config: Dictionary of 'seconds' (tool: seconds, '__default__' for the rest), 'records' (repeats per annotation),
+    'families' (RepeatModeler and RepeatMasker library families), 'seed' and 'log' (file the tool runs are appended to)
+    :return: Path to the 'activate' script
+    """
+    bin_dir = os.path.abspath(bin_dir)
+    os.makedirs(os.path.join(bin_dir, "Libraries"), exist_ok=True)
+    # species_library finds the RepeatMasker database next to the RepeatMasker executable
+    open(os.path.join(bin_dir, "Libraries", "famdb"), "w").close()
+    config_file = os.path.join(bin_dir, CONFIG_FILE)
+    with open(config_file, "w") as fh:
+        json.dump(config, fh, indent=4)
+    executables = {
+        tool: f'#!/bin/sh\nexec "{sys.executable}" "{os.path.abspath(__file__)}" --config "{config_file}" {tool} "$@"\n'
+        for tool in TOOLS
+    }
+    executables["time"] = TIME_SCRIPT
+    for name, content in executables.items():
+        path = os.path.join(bin_dir, name)
+        with open(path, "w") as fh:
+            fh.write(content)
+        os.chmod(
+            path, os.stat(path).st_mode | stat.S_IXUSR | stat.S_IXGRP | stat.S_IXOTH
+        )
+    activate = os.path.join(bin_dir, "activate")
+    with open(activate, "w") as fh:
+        fh.write(f'export PATH="{bin_dir}:$PATH"\n')
+    return activate
+
+
+def main():
+    parser = argparse.ArgumentParser(
+        description="Script to stand in for the external tools of the pipeline, writing format-correct synthetic outputs in a configurable time",
+        formatter_class=RawTextHelpFormatter,
+        epilog="Example command:\n\t"
+        + script
+        + " --config fake_tools/fake_tools.json RepeatMasker -engine ncbi -gff -lib species.lib.fa -dir . genome.fa\n\nContact:"
+        + __author__
+        + "("
+        + __email__
+        + ")",
+    )
+    parser.add_argument(
+        "--config", required=True, help=f"Provide {CONFIG_FILE} of the tools"
+    )
+    parser.add_argument("tool", choices=sorted(TOOLS), help="Provide tool to run")
+    parser.add_argument(
+        "args", nargs=argparse.REMAINDER, help="Provide arguments of the tool"
+    )
+    args = parser.parse_args()
+
+    with open(args.config, "r") as fh:
+        config = json.load(fh)
+    FakeTool(args.tool, args.args, config).run()
+
+
+if __name__ == "__main__":
+    main()
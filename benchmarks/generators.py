@@ -0,0 +1,265 @@
+#!/usr/bin/env python3
+# -*- coding: utf-8 -*-
+"""
+Script to generate seeded synthetic inputs for the eirepeat benchmarks
+"""
+
+# authorship
+__author__ = "Gemy George Kaithakottil"
+__maintainer__ = "Gemy George Kaithakottil"
+__email__ = "gemygk@gmail.com"
+
+# import libraries
+import argparse
+from argparse import RawTextHelpFormatter
+import math
+import os
+import random
+import sys
+
+# get script name
+script = os.path.basename(sys.argv[0])
+
+# (repeat, class/family) pairs as written by RepeatMasker
+FAMILIES = [
+    ("(TTAAG)n", "Simple_repeat"),
+    ("A-rich", "Low_complexity"),
+    ("L2-1_DR", "LINE/L2"),
+    ("Gypsy-12_BM", "LTR/Gypsy"),
+    ("hAT-N1_DM", "DNA/hAT-Charlie"),
+    ("rnd-1_family-177", "Unknown"),
+    ("Helitron-3_SM", "RC/Helitron"),
+    ("SINE2-1_AMi", "SINE/tRNA"),
+]
+# the FASTA is written by repeating one block of random lines, to write large files quickly
+LINE_WIDTH = 60
+BLOCK_LINES = 97
+# input type to the file written for it
+FILENAMES = {
+    "bed3": "genome.bed",
+    "fasta": "genome.fa",
+    "repeatmasker_out": "genome.fa.out",
+    "repeatmasker_gff": "genome.fa.out.gff",
+    "gff3": "genome.fa.out.gff3",
+    "red_rpt": "genome.rpt",
+    "transposonpsi": "chunk.txt.TPSI.allHits",
+    "blast": "genome.fa.unknown.fasta-vs-organellar.blastn.tblr",
+}
+REPEATMASKER_OUT_HEADER = (
+    "   SW   perc perc perc  query      position in query           matching       repeat              position in repeat\n"
+    "score   div. del. ins.  sequence    begin     end    (left)    repeat         class/family         begin  end (left)   ID\n\n"
+)
+
+
+class SyntheticRepeats:
+    def __init__(
+        self,
+        records,
+        scaffolds=1000,
+        scaffold_size=100000,
+        overlap=0.2,
+        seed=7,
+        sizes=None,
+    ):
+        """
+        Seeded synthetic repeat annotation, every format is written from the same repeats
+        :param records: Number of repeats
+        :param scaffolds: Number of scaffolds, with log-normal sizes around scaffold_size
+        :param overlap: Fraction of repeats starting inside the previous repeat on the scaffold
+        :param sizes: List of (name, size) of existing sequences to place the repeats on, instead of the scaffolds
+        """
+        self.records = records
+        self.overlap = overlap
+        self.seed = seed
+        rng = random.Random(seed)
+        self.scaffolds = sizes or [
+            (
+                f"scaffold_{i + 1}",
+                max(1000, int(rng.lognormvariate(math.log(scaffold_size), 0.5))),
+            )
+            for i in range(scaffolds)
+        ]
+        self.sizes = dict(self.scaffolds)
+
+    def get_repeats(self):
+        """
+        :return: Generator of (scaffold, start, end, strand, repeat, family, score, divergence), 1-based inclusive,
+        in scaffold order and sorted by start
+        """
+        rng = random.Random(self.seed + 1)
+        total_size = sum(size for _, size in self.scaffolds)
+        remaining = self.records
+        for i, (name, size) in enumerate(self.scaffolds):
+            # repeats are spread over the scaffolds by size, the last one takes the rest
+            if i == len(self.scaffolds) - 1:
+                count = remaining
+            else:
+                count = min(remaining, round(self.records * size / total_size))
+            remaining -= count
+            spacing = max(1, size // max(count, 1))
+            position, previous = 1, None
+            for _ in range(count):
+                length = min(size, 20 + int(rng.expovariate(1 / 300)))
+                if previous and rng.random() < self.overlap:
+                    start = rng.randint(previous[0], previous[1])
+                else:
+                    start = position + rng.randint(0, spacing)
+                start = min(start, size - length + 1)
+                end = start + length - 1
+                position = max(position, end + 1)
+                previous = (start, end)
+                repeat, family = FAMILIES[rng.randrange(len(FAMILIES))]
+                yield (
+                    name,
+                    start,
+                    end,
+                    "+" if rng.random() < 0.5 else "-",
+                    repeat,
+                    family,
+                    rng.randint(200, 5000),
+                    round(rng.uniform(0, 35), 1),
+                )
+
+    def write_bed3(self, path):
+        with open(path, "w") as fh:
+            for name, size in self.scaffolds:
+                fh.write(f"{name}\t0\t{size}\n")
+
+    def write_fasta(self, path):
+        rng = random.Random(self.seed + 2)
+        lines = [
+            "".join(rng.choice("ACGT") for _ in range(LINE_WIDTH))
+            for _ in range(BLOCK_LINES)
+        ]
+        block = "".join(f"{line}\n" for line in lines)
+        with open(path, "w") as fh:
+            for name, size in self.scaffolds:
+                fh.write(f">{name}\n")
+                full_lines, rest = divmod(size, LINE_WIDTH)
+                fh.write(block * (full_lines // BLOCK_LINES))
+                fh.write(block[: full_lines % BLOCK_LINES * (LINE_WIDTH + 1)])
+                if rest:
+                    fh.write(f"{lines[0][:rest]}\n")
+
+    def get_repeatmasker_out(self, i, repeat):
+        name, start, end, strand, repeat, family, score, div = repeat
+        left = f"({self.sizes[name] - end})"
+        length = end - start + 1
+        if strand == "+":
+            repeat_coords = f"{1:>6} {length:>6} {'(0)':>6}"
+        else:
+            strand, repeat_coords = "C", f"{'(0)':>6} {length:>6} {1:>6}"
+        return f"{score:>6} {div:>5} {0.5:>4} {1.2:>4}  {name:<12} {start:>8} {end:>8} {left:>10} {strand} {repeat:<20} {family:<20} {repeat_coords} {i:>6}\n"
+
+    def get_repeatmasker_gff(self, i, repeat):
+        name, start, end, strand, repeat, _, _, div = repeat
+        return f'{name}\tRepeatMasker\tsimilarity\t{start}\t{end}\t{div}\t{strand}\t.\tTarget "Motif:{repeat}" 1 {end - start + 1}\n'
+
+    def get_gff3(self, i, repeat):
+        name, start, end, strand, repeat, _, _, div = repeat
+        return (
+            f"{name}\tRepeatMasker\tmatch\t{start}\t{end}\t{div}\t{strand}\t.\tID=RM_{i};Name=Motif:{repeat}\n"
+            f"{name}\tRepeatMasker\tmatch_part\t{start}\t{end}\t{div}\t{strand}\t.\tID=RM_{i}-exon1;Parent=RM_{i}\n"
+            "###\n"
+        )
+
+    def get_red_rpt(self, i, repeat):
+        name, start, end, *_ = repeat
+        return f">{name}:{start - 1}-{end}\n"
+
+    def get_transposonpsi(self, i, repeat):
+        name, start, end, strand, repeat, _, score, _ = repeat
+        first, second = (start, end) if strand == "+" else (end, start)
+        return f"chain\t{repeat}\t1\t{end - start + 1}\t{score}\t{name}\t{strand}\t{score}\t{first}\t{second}\n"
+
+    def get_blast(self, i, repeat):
+        name, start, end, strand, _, _, score, div = repeat
+        first, second = (start, end) if strand == "+" else (end, start)
+        length = end - start + 1
+        return f"{name}\torganellar_1\t{100 - div:.2f}\t{first}\t{second}\t{length}\t0\t0\t1\t{length}\t1e-50\t{score}\n"
+
+    def write_all(self, output_dir):
+        """
+        Write every format in one pass over the repeats
+        :return: Dictionary of input type to the file written in output_dir
+        """
+        os.makedirs(output_dir, exist_ok=True)
+        paths = {k: os.path.join(output_dir, v) for k, v in FILENAMES.items()}
+        self.write_bed3(paths["bed3"])
+        self.write_fasta(paths["fasta"])
+        formats = [k for k in FILENAMES if k not in ("bed3", "fasta")]
+        handles = {k: open(paths[k], "w") for k in formats}
+        try:
+            handles["repeatmasker_out"].write(REPEATMASKER_OUT_HEADER)
+            handles["repeatmasker_gff"].write(
+                "##gff-version 2\n##date 2023-03-01\n##sequence-region genome.fa\n"
+            )
+            handles["gff3"].write("##gff-version 3\n")
+            writers = [(handles[k].write, getattr(self, f"get_{k}")) for k in formats]
+            for i, repeat in enumerate(self.get_repeats(), 1):
+                for write, get_line in writers:
+                    write(get_line(i, repeat))
+        finally:
+            for fh in handles.values():
+                fh.close()
+        return paths
+
+
+def add_arguments(parser):
+    parser.add_argument(
+        "--scaffolds",
+        type=int,
+        default=1000,
+        help="Provide number of scaffolds (default: %(default)s)",
+    )
+    parser.add_argument(
+        "--scaffold_size",
+        type=int,
+        default=100000,
+        help="Provide median scaffold size in bp (default: %(default)s)",
+    )
+    parser.add_argument(
+        "--overlap",
+        type=float,
+        default=0.2,
+        help="Provide fraction of repeats overlapping the previous one (default: %(default)s)",
+    )
+    parser.add_argument(
+        "--seed",
+        type=int,
+        default=7,
+        help="Provide random seed (default: %(default)s)",
+    )
+
+
+def main():
+    parser = argparse.ArgumentParser(
+        description="Script to generate seeded synthetic inputs for the eirepeat benchmarks",
+        formatter_class=RawTextHelpFormatter,
+        epilog="Example command:\n\t"
+        + script
+        + " --records 1000000 --output_dir benchmark_data\n\nContact:"
+        + __author__
+        + "("
+        + __email__
+        + ")",
+    )
+    parser.add_argument(
+        "--records",
+        type=int,
+        default=10000,
+        help="Provide number of repeats (default: %(default)s)",
+    )
+    parser.add_argument("--output_dir", required=True, help="Provide output directory")
+    add_arguments(parser)
+    args = parser.parse_args()
+
+    paths = SyntheticRepeats(
+        args.records, args.scaffolds, args.scaffold_size, args.overlap, args.seed
+    ).write_all(args.output_dir)
+    for path in paths.values():
+        print(path)
+
+
+if __name__ == "__main__":
+    main()
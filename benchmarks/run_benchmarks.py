@@ -0,0 +1,332 @@
+#!/usr/bin/env python3
+# -*- coding: utf-8 -*-
+"""
+Script to benchmark the hot paths of the eirepeat scripts on synthetic inputs
+"""
+
+# authorship
+__author__ = "Gemy George Kaithakottil"
+__maintainer__ = "Gemy George Kaithakottil"
+__email__ = "gemygk@gmail.com"
+
+# import libraries
+import argparse
+from argparse import Namespace, RawTextHelpFormatter
+import contextlib
+from datetime import datetime
+import gc
+import json
+import logging
+import os
+import platform
+import sys
+import tempfile
+import time
+import tracemalloc
+
+from benchmarks.generators import SyntheticRepeats, add_arguments
+
+# get script name
+script = os.path.basename(sys.argv[0])
+
+# bump when the results layout changes
+RESULTS_VERSION = 1
+
+
+def bench_merge_repeats(inputs, workdir):
+    from eirepeat.scripts import merge_repeats
+
+    merge_repeats.cwd = workdir
+    args = Namespace(
+        gff_file=inputs["gff3"],
+        gff_type="match_part",
+        source="all_repeats",
+        prefix="merged",
+        use_strand=False,
+        ignore_duplicate=False,
+    )
+    merge_repeats.MergeRepeats(args).run()
+
+
+def bench_compute_coverage(inputs, workdir):
+    from eirepeat.scripts.compute_coverage import ComputeCoverage
+
+    args = Namespace(
+        bed3_file=inputs["bed3"], gff_file=inputs["gff3"], gff_type="match_part"
+    )
+    ComputeCoverage(args).run()
+
+
+def bench_repeatmasker_out_to_gff(inputs, workdir):
+    from eirepeat.scripts.repeatmasker_out_to_gff import RepeatMakerOutToGFF
+
+    args = Namespace(
+        repeatmasker_out=inputs["repeatmasker_out"],
+        output_gff=os.path.join(workdir, "genome.fa.out.gff"),
+        tag="Motif",
+    )
+    RepeatMakerOutToGFF(args).run()
+
+
+def bench_repeatmasker_to_GFF3(inputs, workdir):
+    from eirepeat.scripts.repeatmasker_to_GFF3 import RepeatMakerToGFF3
+
+    with open(inputs["repeatmasker_gff"], "r") as fh:
+        args = Namespace(
+            repeatmasker_out_gff=fh,
+            output_gff=os.path.join(workdir, "genome.fa.out.gff3"),
+            source="RepeatMasker_low",
+            tag="RM_low",
+        )
+        RepeatMakerToGFF3(args).run()
+
+
+def bench_red_rpt_to_GFF3(inputs, workdir):
+    from eirepeat.scripts.red_rpt_to_GFF3 import REDToGFF3
+
+    with open(inputs["red_rpt"], "r") as fh:
+        args = Namespace(
+            red_rpk=fh,
+            output_bed=os.path.join(workdir, "genome.rpt.bed"),
+            output_gff=os.path.join(workdir, "genome.rpt.gff3"),
+            source="red_repeat",
+            tag="red_repeat",
+        )
+        REDToGFF3(args).run()
+
+
+def bench_add_directives_GFF3(inputs, workdir):
+    from eirepeat.scripts.add_directives_GFF3 import AddDirectivesGFF3
+
+    with open(inputs["gff3"], "r") as fh:
+        AddDirectivesGFF3(Namespace(gff3_file=fh, type="match", source="all")).run()
+
+
+def bench_clean_GFF3_source(inputs, workdir):
+    from eirepeat.scripts.clean_GFF3_source import CleanGFF3Source
+
+    with open(inputs["gff3"], "r") as fh:
+        CleanGFF3Source(Namespace(gff3_file=fh, source="all")).run()
+
+
+def bench_gather_hits_transposonpsi(inputs, workdir):
+    from eirepeat.scripts.gather_hits import GatherHits
+
+    args = Namespace(
+        hits=[inputs["transposonpsi"]],
+        format="transposonpsi",
+        output=os.path.join(workdir, "TPSI.allHits.bed"),
+    )
+    GatherHits(args).run()
+
+
+def bench_gather_hits_blast(inputs, workdir):
+    from eirepeat.scripts.gather_hits import GatherHits
+
+    args = Namespace(
+        hits=[inputs["blast"]],
+        format="blast",
+        output=os.path.join(workdir, "blastn.tblr.bed"),
+    )
+    GatherHits(args).run()
+
+
+def bench_fasta_stats(inputs, workdir):
+    from eirepeat.scripts.fasta_stats import FastaStats
+
+    args = Namespace(
+        fasta=inputs["fasta"],
+        output=os.path.join(workdir, "genome.fa.stats.json"),
+        fai=os.path.join(workdir, "genome.fa.fai"),
+        bed=os.path.join(workdir, "genome.fa.bed"),
+    )
+    FastaStats(args).run()
+
+
+# benchmark name to the function running the script hot path on the synthetic inputs
+BENCHMARKS = {
+    "merge_repeats": bench_merge_repeats,
+    "compute_coverage": bench_compute_coverage,
+    "repeatmasker_out_to_gff": bench_repeatmasker_out_to_gff,
+    "repeatmasker_to_GFF3": bench_repeatmasker_to_GFF3,
+    "red_rpt_to_GFF3": bench_red_rpt_to_GFF3,
+    "add_directives_GFF3": bench_add_directives_GFF3,
+    "clean_GFF3_source": bench_clean_GFF3_source,
+    "gather_hits_transposonpsi": bench_gather_hits_transposonpsi,
+    "gather_hits_blast": bench_gather_hits_blast,
+    "fasta_stats": bench_fasta_stats,
+}
+
+
+class RunBenchmarks:
+    @staticmethod
+    def compare(results, baseline, tolerance, metrics=("seconds", "peak_memory_mb")):
+        """
+        :return: List of (name, records, metric, baseline value, value) for every result metric over the baseline by more than tolerance
+        """
+        previous = {(r["name"], r["records"]): r for r in baseline["results"]}
+        regressions = list()
+        for result in results["results"]:
+            base = previous.get((result["name"], result["records"]))
+            if not base:
+                continue
+            for metric in metrics:
+                if result[metric] > base[metric] * (1 + tolerance):
+                    regressions.append(
+                        (
+                            result["name"],
+                            result["records"],
+                            metric,
+                            base[metric],
+                            result[metric],
+                        )
+                    )
+        return regressions
+
+    def __init__(self, args):
+        self.args = args
+        self.results = {
+            "version": RESULTS_VERSION,
+            "created": datetime.now().isoformat(timespec="seconds"),
+            "python": platform.python_version(),
+            "platform": platform.platform(),
+            "parameters": {
+                "scaffolds": self.args.scaffolds,
+                "scaffold_size": self.args.scaffold_size,
+                "overlap": self.args.overlap,
+                "seed": self.args.seed,
+                "repeat": self.args.repeat,
+            },
+            "results": list(),
+        }
+
+    def measure(self, function, inputs, workdir):
+        """
+        :return: Best wall clock seconds of --repeat runs, and the peak traced memory in MB of one more run
+        """
+        best = None
+        # the scripts write their main output to stdout
+        with open(os.devnull, "w") as devnull, contextlib.redirect_stdout(devnull):
+            for _ in range(self.args.repeat):
+                gc.collect()
+                start = time.perf_counter()
+                function(inputs, workdir)
+                elapsed = time.perf_counter() - start
+                best = elapsed if best is None else min(best, elapsed)
+            # memory is traced in a separate run, tracing slows the scripts down
+            gc.collect()
+            tracemalloc.start()
+            function(inputs, workdir)
+            _, peak = tracemalloc.get_traced_memory()
+            tracemalloc.stop()
+        return best, peak / 1024 / 1024
+
+    def run_benchmarks(self, records, workdir):
+        inputs = SyntheticRepeats(
+            records,
+            self.args.scaffolds,
+            self.args.scaffold_size,
+            self.args.overlap,
+            self.args.seed,
+        ).write_all(os.path.join(workdir, "inputs"))
+        for name, function in BENCHMARKS.items():
+            if self.args.only and name not in self.args.only:
+                continue
+            seconds, peak_memory_mb = self.measure(function, inputs, workdir)
+            result = {
+                "name": name,
+                "records": records,
+                "seconds": round(seconds, 6),
+                "records_per_second": round(records / seconds) if seconds else None,
+                "peak_memory_mb": round(peak_memory_mb, 2),
+            }
+            self.results["results"].append(result)
+            print(
+                f"{name:<28} {records:>10} records {result['seconds']:>10.3f}s {result['peak_memory_mb']:>10.1f} MB",
+                file=sys.stderr,
+            )
+
+    def run(self):
+        # keep the logging of the scripts out of the timings
+        logging.disable(logging.CRITICAL)
+        for records in self.args.records:
+            with tempfile.TemporaryDirectory(dir=self.args.tmpdir) as workdir:
+                self.run_benchmarks(records, workdir)
+        if self.args.output:
+            with open(self.args.output, "w") as fh:
+                json.dump(self.results, fh, indent=4)
+                fh.write("\n")
+        if not self.args.baseline:
+            return 0
+        with open(self.args.baseline, "r") as fh:
+            baseline = json.load(fh)
+        regressions = RunBenchmarks.compare(self.results, baseline, self.args.tolerance)
+        for name, records, metric, before, after in regressions:
+            print(
+                f"REGRESSION: {name} ({records} records) {metric} {before} -> {after}",
+                file=sys.stderr,
+            )
+        if not regressions:
+            print(
+                f"No regressions over the baseline '{self.args.baseline}'",
+                file=sys.stderr,
+            )
+        return 1 if regressions else 0
+
+
+def main():
+    parser = argparse.ArgumentParser(
+        description="Script to benchmark the hot paths of the eirepeat scripts on synthetic inputs",
+        formatter_class=RawTextHelpFormatter,
+        epilog="Example command:\n\t"
+        + "python -m benchmarks.run_benchmarks --records 10000 1000000 --output results.json\n\t"
+        + "python -m benchmarks.run_benchmarks --records 10000 1000000 --baseline results.json\n\nContact:"
+        + __author__
+        + "("
+        + __email__
+        + ")",
+    )
+    parser.add_argument(
+        "--records",
+        type=int,
+        nargs="+",
+        default=[10000],
+        help="Provide numbers of repeats to benchmark with (default: %(default)s)",
+    )
+    add_arguments(parser)
+    parser.add_argument(
+        "--only",
+        nargs="+",
+        choices=sorted(BENCHMARKS),
+        help="Run only these benchmarks (default: %(default)s)",
+    )
+    parser.add_argument(
+        "--repeat",
+        type=int,
+        default=3,
+        help="Report the best wall clock of this many runs (default: %(default)s)",
+    )
+    parser.add_argument(
+        "--output", help="Provide output JSON of the results (default: %(default)s)"
+    )
+    parser.add_argument(
+        "--baseline",
+        help="Provide results JSON of an earlier run to compare against, exits with 1 on regressions (default: %(default)s)",
+    )
+    parser.add_argument(
+        "--tolerance",
+        type=float,
+        default=0.2,
+        help="Report regressions slower or larger than the baseline by more than this fraction (default: %(default)s)",
+    )
+    parser.add_argument(
+        "--tmpdir",
+        help="Provide directory for the synthetic inputs and outputs (default: system temporary directory)",
+    )
+    args = parser.parse_args()
+
+    sys.exit(RunBenchmarks(args).run())
+
+
+if __name__ == "__main__":
+    main()
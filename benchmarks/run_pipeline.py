@@ -0,0 +1,382 @@
+#!/usr/bin/env python3
+# -*- coding: utf-8 -*-
+"""
+Script to benchmark the orchestration overhead of the pipeline, running the full Snakefile locally with stand-in tools
+"""
+
+# authorship
+__author__ = "Gemy George Kaithakottil"
+__maintainer__ = "Gemy George Kaithakottil"
+__email__ = "gemygk@gmail.com"
+
+# import libraries
+import argparse
+from argparse import RawTextHelpFormatter
+from datetime import datetime
+import json
+import os
+import platform
+import random
+import re
+import subprocess
+import sys
+import tempfile
+import time
+
+import yaml
+
+from benchmarks.fake_tools import (
+    TOOLS,
+    get_random_sequence,
+    write_fasta,
+    write_tools,
+)
+from benchmarks.generators import SyntheticRepeats, add_arguments
+from benchmarks.run_benchmarks import RESULTS_VERSION, RunBenchmarks
+
+# get script name
+script = os.path.basename(sys.argv[0])
+
+# pipeline mode to the inputs configured for it
+MODES = {
+    "run1": [],
+    "run2": ["--organellar_fasta"],
+    "run3": ["--close_reference"],
+    "run4": ["--close_reference", "--organellar_fasta"],
+    "run_red_repeats": ["--run_red_repeats"],
+}
+# metrics compared against the baseline
+METRICS = ("dag_seconds", "overhead_seconds")
+
+
+class RunPipeline:
+    @staticmethod
+    def get_union_seconds(intervals):
+        """
+        :return: Seconds covered by at least one of the (start, end) intervals, tools running in parallel are counted once
+        """
+        seconds = 0.0
+        current = None
+        for start, end in sorted(intervals):
+            if current and start <= current[1]:
+                current[1] = max(current[1], end)
+                continue
+            if current:
+                seconds += current[1] - current[0]
+            current = [start, end]
+        if current:
+            seconds += current[1] - current[0]
+        return seconds
+
+    @staticmethod
+    def get_tool_runs(log):
+        """
+        :return: List of (tool, start, end) of the stand-in tool runs
+        """
+        runs = list()
+        if not os.path.exists(log):
+            return runs
+        with open(log, "r") as fh:
+            for line in fh:
+                tool, start, end = line.rstrip("\n").split("\t")
+                runs.append((tool, float(start), float(end)))
+        return runs
+
+    @staticmethod
+    def get_jobs(log):
+        """
+        :return: Number of jobs Snakemake ran, from its 'N of M steps (X%) done' progress lines
+        """
+        jobs = 0
+        with open(log, "r") as fh:
+            for line in fh:
+                match = re.search(r"(\d+) of \d+ steps", line)
+                if match:
+                    jobs = max(jobs, int(match.group(1)))
+        return jobs
+
+    def __init__(self, args):
+        self.args = args
+        self.seconds = {"__default__": self.args.tool_seconds}
+        for value in self.args.seconds_per_tool or []:
+            tool, _, seconds = value.partition("=")
+            if tool not in TOOLS or not seconds:
+                raise ValueError(
+                    f"Expected TOOL=SECONDS for --seconds_per_tool, with TOOL one of {', '.join(sorted(TOOLS))}, got '{value}'"
+                )
+            self.seconds[tool] = float(seconds)
+        self.results = {
+            "version": RESULTS_VERSION,
+            "created": datetime.now().isoformat(timespec="seconds"),
+            "python": platform.python_version(),
+            "platform": platform.platform(),
+            "parameters": {
+                "scaffolds": self.args.scaffolds,
+                "scaffold_size": self.args.scaffold_size,
+                "overlap": self.args.overlap,
+                "seed": self.args.seed,
+                "close_reference_count": self.args.close_reference_count,
+                "families": self.args.families,
+                "tool_seconds": self.seconds,
+                "cores": self.args.cores,
+            },
+            "results": list(),
+        }
+
+    def write_inputs(self, input_dir):
+        """
+        :return: Dictionary of the configure option to the synthetic FASTA written for it
+        """
+        os.makedirs(input_dir, exist_ok=True)
+        inputs = {
+            "fasta": os.path.join(input_dir, "genome.fasta"),
+            "--close_reference": os.path.join(input_dir, "close_reference.cds.fasta"),
+            "--organellar_fasta": os.path.join(input_dir, "organellar.fasta"),
+        }
+        SyntheticRepeats(
+            self.args.records,
+            self.args.scaffolds,
+            self.args.scaffold_size,
+            self.args.overlap,
+            self.args.seed,
+        ).write_fasta(inputs["fasta"])
+        rng = random.Random(self.args.seed)
+        write_fasta(
+            [
+                (f"cds_{i + 1}", get_random_sequence(rng, rng.randint(300, 3000)))
+                for i in range(self.args.close_reference_count)
+            ],
+            inputs["--close_reference"],
+        )
+        write_fasta(
+            [
+                (name, get_random_sequence(rng, 20000))
+                for name in ("chloroplast", "mitochondrion")
+            ],
+            inputs["--organellar_fasta"],
+        )
+        return inputs
+
+    def configure(self, mode, inputs, run_dir):
+        """
+        Run 'eirepeat configure' for the mode, and point the tool sources of the run_config at the stand-in tools
+        :return: Path to the run_config
+        """
+        cmd = [sys.executable, "-m", "eirepeat", "configure", inputs["fasta"]]
+        cmd += ["--species", self.args.species, "-o", run_dir]
+        for option in MODES[mode]:
+            cmd += [option] + ([inputs[option]] if option in inputs else [])
+        subprocess.run(cmd, stdout=subprocess.DEVNULL, check=True)
+        tools_dir = os.path.join(run_dir, "fake_tools")
+        activate = write_tools(
+            tools_dir,
+            {
+                "seconds": self.seconds,
+                "records": self.args.records,
+                "families": self.args.families,
+                "seed": self.args.seed,
+                "log": os.path.join(run_dir, "fake_tools.log"),
+            },
+        )
+        run_config_file = os.path.join(run_dir, "run_config.yaml")
+        with open(run_config_file, "r") as fh:
+            run_config = yaml.safe_load(fh)
+        for tool in run_config["source"]:
+            run_config["source"][tool] = f"source {activate}"
+        if not os.path.exists("/usr/bin/time"):
+            time_cmd = os.path.join(tools_dir, "time")
+            run_config["params"]["time"] = f"{time_cmd} -v "
+            run_config["params"]["du"] = f"{time_cmd} -v du -sch "
+        run_config["history"] = os.path.join(run_dir, "history.sqlite")
+        with open(run_config_file, "w") as fh:
+            yaml.dump(run_config, fh, sort_keys=False)
+        return run_config_file
+
+    def run_eirepeat(self, run_config_file, run_dir, log, dry_run=False):
+        """
+        :return: Wall clock seconds of 'eirepeat run' with the local executor
+        """
+        cmd = [sys.executable, "-m", "eirepeat", "run", run_config_file]
+        cmd += ["--executor", "local", "--cores", str(self.args.cores)]
+        cmd += ["--memory", str(self.args.memory), "--latency_wait", "5"]
+        cmd += ["-np"] if dry_run else ["--no_posting"]
+        start = time.perf_counter()
+        with open(log, "w") as fh:
+            p = subprocess.run(cmd, cwd=run_dir, stdout=fh, stderr=subprocess.STDOUT)
+        seconds = time.perf_counter() - start
+        if p.returncode:
+            raise subprocess.CalledProcessError(
+                p.returncode, cmd, f"See the log '{log}'"
+            )
+        return seconds
+
+    def run_mode(self, mode, inputs, workdir):
+        run_dir = os.path.join(workdir, mode)
+        run_config_file = self.configure(mode, inputs, run_dir)
+        # Snakefile parse and DAG construction, without running a job
+        dag_seconds = self.run_eirepeat(
+            run_config_file, run_dir, os.path.join(run_dir, "dry_run.log"), True
+        )
+        log = os.path.join(run_dir, "run.log")
+        wall_seconds = self.run_eirepeat(run_config_file, run_dir, log)
+        runs = RunPipeline.get_tool_runs(os.path.join(run_dir, "fake_tools.log"))
+        tool_seconds = RunPipeline.get_union_seconds([(s, e) for _, s, e in runs])
+        jobs = RunPipeline.get_jobs(log)
+        tools = dict()
+        for tool, start, end in runs:
+            tools.setdefault(tool, {"calls": 0, "seconds": 0.0})
+            tools[tool]["calls"] += 1
+            tools[tool]["seconds"] = round(tools[tool]["seconds"] + end - start, 3)
+        overhead_seconds = wall_seconds - tool_seconds
+        result = {
+            "name": mode,
+            "records": self.args.records,
+            "jobs": jobs,
+            "dag_seconds": round(dag_seconds, 3),
+            "wall_seconds": round(wall_seconds, 3),
+            "tool_seconds": round(tool_seconds, 3),
+            "overhead_seconds": round(overhead_seconds, 3),
+            "overhead_seconds_per_job": (
+                round(overhead_seconds / jobs, 3) if jobs else None
+            ),
+            "tools": dict(sorted(tools.items())),
+        }
+        self.results["results"].append(result)
+        print(
+            f"{mode:<16} {jobs:>4} jobs {result['wall_seconds']:>9.2f}s wall = {result['tool_seconds']:>8.2f}s tools"
+            f" + {result['overhead_seconds']:>8.2f}s overhead ({result['dag_seconds']:.2f}s parse and DAG)",
+            file=sys.stderr,
+        )
+
+    def run_modes(self, workdir):
+        inputs = self.write_inputs(os.path.join(workdir, "inputs"))
+        for mode in self.args.modes:
+            self.run_mode(mode, inputs, workdir)
+
+    def run(self):
+        if self.args.workdir:
+            os.makedirs(self.args.workdir, exist_ok=True)
+            self.run_modes(os.path.abspath(self.args.workdir))
+        else:
+            with tempfile.TemporaryDirectory(dir=self.args.tmpdir) as workdir:
+                self.run_modes(workdir)
+        if self.args.output:
+            with open(self.args.output, "w") as fh:
+                json.dump(self.results, fh, indent=4)
+                fh.write("\n")
+        if not self.args.baseline:
+            return 0
+        with open(self.args.baseline, "r") as fh:
+            baseline = json.load(fh)
+        regressions = RunBenchmarks.compare(
+            self.results, baseline, self.args.tolerance, METRICS
+        )
+        for name, records, metric, before, after in regressions:
+            print(
+                f"REGRESSION: {name} ({records} records) {metric} {before} -> {after}",
+                file=sys.stderr,
+            )
+        if not regressions:
+            print(
+                f"No regressions over the baseline '{self.args.baseline}'",
+                file=sys.stderr,
+            )
+        return 1 if regressions else 0
+
+
+def main():
+    parser = argparse.ArgumentParser(
+        description="Script to benchmark the orchestration overhead of the pipeline, running the full Snakefile locally with stand-in tools",
+        formatter_class=RawTextHelpFormatter,
+        epilog="Example command:\n\t"
+        + "python -m benchmarks.run_pipeline --output pipeline.json\n\t"
+        + "python -m benchmarks.run_pipeline --modes run1 --seconds_per_tool RepeatModeler=10 --baseline pipeline.json\n\nContact:"
+        + __author__
+        + "("
+        + __email__
+        + ")",
+    )
+    parser.add_argument(
+        "--modes",
+        nargs="+",
+        choices=list(MODES),
+        default=list(MODES),
+        help="Run the pipeline in these modes (default: %(default)s)",
+    )
+    parser.add_argument(
+        "--records",
+        type=int,
+        default=2000,
+        help="Provide number of repeats each stand-in RepeatMasker and Red run reports (default: %(default)s)",
+    )
+    add_arguments(parser)
+    parser.set_defaults(scaffolds=50, scaffold_size=20000)
+    parser.add_argument(
+        "--close_reference_count",
+        type=int,
+        default=1200,
+        help="Provide number of close reference CDS sequences, chunked for transposonPSI (default: %(default)s)",
+    )
+    parser.add_argument(
+        "--families",
+        type=int,
+        default=100,
+        help="Provide number of repeat families in the stand-in RepeatModeler and RepeatMasker libraries (default: %(default)s)",
+    )
+    parser.add_argument(
+        "--species",
+        default="Insecta",
+        help="Provide species to configure the runs with (default: %(default)s)",
+    )
+    parser.add_argument(
+        "--tool_seconds",
+        type=float,
+        default=0.5,
+        help="Provide wall clock seconds of each stand-in tool run (default: %(default)s)",
+    )
+    parser.add_argument(
+        "--seconds_per_tool",
+        nargs="+",
+        metavar="TOOL=SECONDS",
+        help=f"Provide wall clock seconds of the runs of a tool, overriding --tool_seconds. TOOL is one of {', '.join(sorted(TOOLS))} (default: %(default)s)",
+    )
+    parser.add_argument(
+        "--cores",
+        type=int,
+        default=4,
+        help="Use at most N cores in parallel (default: %(default)s)",
+    )
+    parser.add_argument(
+        "--memory",
+        type=int,
+        default=10**7,
+        help="Use at most N MB memory in parallel, high enough for the cores to limit the jobs by default (default: %(default)s)",
+    )
+    parser.add_argument(
+        "--output", help="Provide output JSON of the results (default: %(default)s)"
+    )
+    parser.add_argument(
+        "--baseline",
+        help="Provide results JSON of an earlier run to compare the parse, DAG and overhead seconds against, exits with 1 on regressions (default: %(default)s)",
+    )
+    parser.add_argument(
+        "--tolerance",
+        type=float,
+        default=0.2,
+        help="Report regressions slower than the baseline by more than this fraction (default: %(default)s)",
+    )
+    parser.add_argument(
+        "--workdir",
+        help="Provide directory to run the pipeline in and keep, for inspecting the outputs and logs (default: temporary directory)",
+    )
+    parser.add_argument(
+        "--tmpdir",
+        help="Provide directory for the temporary directory (default: system temporary directory)",
+    )
+    args = parser.parse_args()
+
+    sys.exit(RunPipeline(args).run())
+
+
+if __name__ == "__main__":
+    main()
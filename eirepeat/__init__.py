@@ -1,15 +1,20 @@
-import pkg_resources
+from importlib.metadata import PackageNotFoundError, version
+from importlib.resources import files
+import os
 
 __title__ = "eirepeat"
 __author__ = "Gemy Kaithakottil (kaithakg)"
 __email__ = "Gemy.Kaithakottil@earlham.ac.uk"
 __copyright__ = "Copyright 2019-2022 Earlham Institute"
-__version__ = pkg_resources.require("eirepeat")[0].version
+try:
+    __version__ = version("eirepeat")
+except PackageNotFoundError:
+    # running from a source checkout
+    from eirepeat.version import __version__
 
-DEFAULT_CONFIG_FILE = pkg_resources.resource_filename("eirepeat.etc", "run_config.yaml")
-DEFAULT_HPC_CONFIG_FILE = pkg_resources.resource_filename(
-    "eirepeat.etc", "hpc_config.json"
-)
-FULL_SPECIES_TREE_FILE = pkg_resources.resource_filename(
-    "eirepeat.etc", "queryRepeatDatabase.tree.txt"
+DEFAULT_CONFIG_FILE = str(files("eirepeat.etc").joinpath("run_config.yaml"))
+DEFAULT_HPC_CONFIG_FILE = str(files("eirepeat.etc").joinpath("hpc_config.json"))
+FULL_SPECIES_TREE_FILE = str(
+    files("eirepeat.etc").joinpath("queryRepeatDatabase.tree.txt")
 )
+DEFAULT_HISTORY_DB = os.path.join("~", ".eirepeat", "history.sqlite")
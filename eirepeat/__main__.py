@@ -12,33 +12,31 @@ __maintainer__ = "Gemy George Kaithakottil"
 __email__ = "gemygk@gmail.com"
 
 # import libraries
+# only the standard library is imported here, so that `eirepeat -v` and `-h` start fast,
+# the subcommands import what they need
 import argparse
+from importlib.resources import files
 import os
 import sys
-import subprocess
-import yaml
-import pkg_resources
 
 from eirepeat import __version__
-from eirepeat.scripts.jiracomms import JiraInfo
-from eirepeat.scripts.eirepeat_configure import EIRepeatConfigure
 from eirepeat import (
     DEFAULT_CONFIG_FILE,
     DEFAULT_HPC_CONFIG_FILE,
     FULL_SPECIES_TREE_FILE,
 )
-
-from snakemake.utils import min_version
-
-min_version("7.0")
+from eirepeat.scripts import profiling
+from eirepeat.scripts.run_history_args import add_estimate_arguments
 
 # get script name
 script = os.path.basename(sys.argv[0])
-script_dir = pkg_resources.resource_filename("eirepeat", "workflow")
+script_dir = str(files("eirepeat").joinpath("workflow"))
 cwd = os.getcwd()
 
 
 def command_configure(args):
+    from eirepeat.scripts.eirepeat_configure import EIRepeatConfigure
+
     print("Running configure..")
     # check if we have a config file
     run_config = False
@@ -56,11 +54,53 @@ def command_configure(args):
 
 
 def command_run(args):
+    from snakemake.utils import min_version
+
+    min_version("7.0")
     EIRepeat(args).run()
 
 
+def command_species(args):
+    from eirepeat.scripts.species_index import print_matches
+
+    sys.exit(print_matches(args))
+
+
+def command_estimate(args):
+    from eirepeat.scripts.run_history import Estimate
+
+    sys.exit(Estimate(args).run())
+
+
+def command_notify(args):
+    import yaml
+    from eirepeat.scripts.jira_notifier import JiraNotifier
+
+    with open(args.run_config, "r") as fh:
+        run_config = yaml.safe_load(fh)
+    notifier = JiraNotifier(
+        run_config["jira"]["jira_id"],
+        run_config,
+        os.path.join(run_config["output"], ".jira_outbox"),
+    )
+    if not args.flush:
+        pending = notifier.get_pending()
+        print(f"{len(pending)} JIRA messages in '{notifier.outbox}'")
+        for entry in pending:
+            print(entry)
+        return
+    delivered, pending = notifier.flush()
+    print(f"Delivered {delivered} JIRA messages, {pending} left in '{notifier.outbox}'")
+    if pending:
+        sys.exit(1)
+
+
 class EIRepeat:
     def __init__(self, args):
+        import yaml
+        from eirepeat.scripts.hpc_config import HpcConfig
+        from eirepeat.scripts.jiracomms import JiraInfo
+
         print("Initialising pipeline")
         self.args = args
         self.run_config = args.run_config
@@ -71,9 +111,17 @@ class EIRepeat:
         self.verbose = args.verbose
         self.exclude_hosts = args.exclude_hosts
         self.dry_run = args.dry_run
+        self.executor = args.executor
+        self.cores = args.cores
+        self.memory = args.memory
+        self.metrics_file = args.metrics_file
+        self.metrics_interval = args.metrics_interval
         self.loaded_run_config = yaml.load(
             open(self.run_config), Loader=yaml.SafeLoader
         )
+        # rules without a retry policy of their own are restarted this many times, from the same --hpc_config
+        # the Snakefile reads the rule retries from
+        self.restart_times = HpcConfig(self.hpc_config).get_retries("__default__")
         self.jira_id = self.loaded_run_config["jira"]["jira_id"]
         self.output = self.loaded_run_config["output"]
         self.species = self.loaded_run_config["species"]
@@ -92,44 +140,82 @@ class EIRepeat:
         if self.jira_id:
             JiraInfo(self.jira_id).initialise(pap_config=self.pap_config)
 
+    def get_executor_args(self):
+        if self.executor == "local":
+            # Snakemake packs the jobs into these limits using the threads and mem_mb of each rule
+            return f" --cores {self.cores} --resources mem_mb={self.memory}"
+        cluster_log = (
+            "" if self.dry_run else f" -o {self.logs}/{{rule}}.%N.%j.cluster.log"
+        )
+        exclude = " --exclude={cluster.exclude}" if self.exclude_hosts else ""
+        return (
+            f" --jobs {self.jobs} --cluster-config {self.hpc_config}"
+            " --drmaa ' -p {cluster.partition} -c {threads} --mem={resources.mem_mb} {resources.time_option} -J {cluster.J}"
+            f"{cluster_log}{exclude}'"
+        )
+
+    def get_command(self):
+        cmd = (
+            f"snakemake --snakefile {script_dir}/Snakefile"
+            f" --configfile {self.run_config} --latency-wait {self.latency_wait}"
+            f" --config notify={self.no_posting} verbose={self.verbose}"
+            # the rule cores, memory, time and retries come from the --hpc_config of this run,
+            # as does the restart count of the rules without a retry policy of their own
+            f" hpc_config={os.path.abspath(self.hpc_config)}"
+            f" --restart-times {self.restart_times}"
+        )
+        if self.dry_run:
+            cmd += " -np --reason"
+        else:
+            cmd += " --keep-going --printshellcmds --reason"
+        return cmd + self.get_executor_args()
+
     def run(self):
+        import subprocess
+        from eirepeat.scripts.metrics_exporter import MetricsExporter
+        from eirepeat.scripts.progress_monitor import ProgressMonitor
+
         print("Running the pipeline..")
-        cmd = None
+        cmd = self.get_command()
         if self.dry_run:
             print("Enabling dry run..")
-            cmd = (
-                f"snakemake --snakefile {script_dir}/Snakefile"
-                f" --configfile {self.run_config} --latency-wait {self.latency_wait} --jobs {self.jobs} --cluster-config {self.hpc_config}"
-                f" --config notify={self.no_posting} verbose={self.verbose} -np --reason"
-            )
-            cmd += (
-                " --drmaa ' -p {cluster.partition} -c {cluster.cores} --mem={cluster.memory} -J {cluster.J} --exclude={cluster.exclude}'"
-                if self.exclude_hosts
-                else " --drmaa ' -p {cluster.partition} -c {cluster.cores} --mem={cluster.memory} -J {cluster.J}'"
-            )
             print(cmd)
 
-        else:
-            cmd = (
-                f"snakemake --snakefile {script_dir}/Snakefile"
-                f" --configfile {self.run_config} --latency-wait {self.latency_wait} --jobs {self.jobs} --cluster-config {self.hpc_config}"
-                f" --config notify={self.no_posting} verbose={self.verbose}"
-                " --keep-going --printshellcmds --reason "
-            )
-            cmd += (
-                f" --drmaa ' -p {{cluster.partition}} -c {{cluster.cores}} --mem={{cluster.memory}} -J {{cluster.J}} -o {self.logs}/{{rule}}.%N.%j.cluster.log --exclude={{cluster.exclude}}'"
-                if self.exclude_hosts
-                else f" --drmaa ' -p {{cluster.partition}} -c {{cluster.cores}} --mem={{cluster.memory}} -J {{cluster.J}} -o {self.logs}/{{rule}}.%N.%j.cluster.log'"
-            )
-
+        # stream the Snakemake log as it is written, rather than holding a multi-day run in memory
         # for universal_newlines - https://stackoverflow.com/a/4417735
         p = subprocess.Popen(
-            cmd, shell=True, stdout=subprocess.PIPE, universal_newlines=True
+            cmd,
+            shell=True,
+            stdout=subprocess.PIPE,
+            stderr=subprocess.STDOUT,
+            universal_newlines=True,
+            bufsize=1,
+        )
+        monitor = (
+            None
+            if self.dry_run
+            else ProgressMonitor(os.path.join(self.logs, "eirepeat.events.jsonl"))
         )
-        # https://www.programcreek.com/python/example/50/subprocess.Popen
-        (result, error) = p.communicate()
-        exit_code = p.returncode
-        print(f"\nRESULTS:\n{result}\n\nERRORS:\n{error}\n\nEXIT_CODE:\n{exit_code}\n")
+        exporter = None
+        if monitor and self.metrics_file:
+            exporter = MetricsExporter(
+                monitor,
+                self.metrics_file,
+                self.jira_id or os.path.basename(self.output),
+                self.output,
+                self.metrics_interval,
+            )
+            exporter.start()
+        for line in p.stdout:
+            print(line, end="", flush=True)
+            if monitor:
+                monitor.process_line(line)
+        exit_code = p.wait()
+        if exporter:
+            exporter.stop()
+        if monitor:
+            monitor.close(exit_code)
+        print(f"\nEXIT_CODE:\n{exit_code}\n")
         if exit_code:
             raise subprocess.CalledProcessError(exit_code, cmd)
 
@@ -190,6 +276,7 @@ def main():
     parser.add_argument(
         "-v", "--version", action="version", version="%(prog)s " + __version__
     )
+    profiling.add_argument(parser)
     subparsers = parser.add_subparsers()
 
     # configure
@@ -201,6 +288,11 @@ def main():
         default=None,
         help=f"Provide species name. Please use the file here to identify the species. Also, check the NCBI taxonomy to identify the correct species option - https://www.ncbi.nlm.nih.gov/taxonomy: {FULL_SPECIES_TREE_FILE} (default: %(default)s)",
     )
+    parser_configure.add_argument(
+        "--skip_species_check",
+        action="store_true",
+        help="Do not check the species against the RepeatMasker database tree, e.g. for a newer RepeatMasker database (default: %(default)s)",
+    )
     parser_configure.add_argument(
         "--run_red_repeats",
         action="store_true",
@@ -249,6 +341,24 @@ def main():
         default=100,
         help="Use at most N CPU cluster/cloud jobs in parallel (default: %(default)s)",
     )
+    parser_run.add_argument(
+        "--executor",
+        choices=["drmaa", "local"],
+        default="drmaa",
+        help="Run the jobs on the cluster through DRMAA, or on this machine (default: %(default)s)",
+    )
+    parser_run.add_argument(
+        "--cores",
+        type=int,
+        default=os.cpu_count(),
+        help="Use at most N cores in parallel with '--executor local' (default: %(default)s)",
+    )
+    parser_run.add_argument(
+        "--memory",
+        type=int,
+        default=os.sysconf("SC_PAGE_SIZE") * os.sysconf("SC_PHYS_PAGES") // 1024**2,
+        help="Use at most N MB memory in parallel with '--executor local' (default: %(default)s)",
+    )
     parser_run.add_argument(
         "--latency_wait",
         default=120,
@@ -270,14 +380,90 @@ def main():
         action="store_true",
         help="Enable excluding a specific list of hosts specified in the --hpc_config 'exclude' section (default: %(default)s)",
     )
+    parser_run.add_argument(
+        "--metrics_file",
+        help="Periodically write the queued, running, completed and failed jobs per rule, the job durations and the output directory size to this Prometheus textfile, e.g. /var/lib/node_exporter/textfile/eirepeat_PPBFX-611.prom (default: %(default)s)",
+    )
+    parser_run.add_argument(
+        "--metrics_interval",
+        type=int,
+        default=60,
+        help="Write the --metrics_file every N seconds (default: %(default)s)",
+    )
     parser_run.add_argument(
         "-np", "--dry_run", action="store_true", help="Dry run (default: %(default)s)"
     )
     parser_run.set_defaults(handler=command_run)
 
+    # estimate
+    parser_estimate = subparsers.add_parser(
+        "estimate",
+        help="see `estimate -h`",
+        description="Estimate the per-rule walltime, memory and CPU-hours of a run from the history of finished runs",
+    )
+    add_estimate_arguments(parser_estimate)
+    parser_estimate.set_defaults(handler=command_estimate)
+
+    # species
+    parser_species = subparsers.add_parser(
+        "species",
+        help="see `species -h`",
+        description="Search the species and clades of the RepeatMasker database tree, for 'configure --species'",
+    )
+    parser_species.add_argument(
+        "query", help="Provide species or clade name, or its start"
+    )
+    group = parser_species.add_mutually_exclusive_group()
+    group.add_argument(
+        "--prefix",
+        action="store_true",
+        help="Only list names starting with the query (default: %(default)s)",
+    )
+    group.add_argument(
+        "--fuzzy",
+        action="store_true",
+        help="Only list names similar to the query (default: %(default)s)",
+    )
+    parser_species.add_argument(
+        "--limit",
+        type=int,
+        default=10,
+        help="List at most this many names (default: %(default)s)",
+    )
+    parser_species.add_argument(
+        "--lineage",
+        action="store_true",
+        help="Print the lineage of each name (default: %(default)s)",
+    )
+    parser_species.add_argument(
+        "--tree",
+        default=FULL_SPECIES_TREE_FILE,
+        help="Provide queryRepeatDatabase.pl -tree output (default: %(default)s)",
+    )
+    parser_species.set_defaults(handler=command_species)
+
+    # notify
+    parser_notify = subparsers.add_parser(
+        "notify",
+        help="see `notify -h`",
+        description="List or send the JIRA messages of a run that could not be delivered",
+    )
+    parser_notify.add_argument("run_config", help="Provide run configuration YAML")
+    parser_notify.add_argument(
+        "--flush",
+        action="store_true",
+        help="Send the undelivered messages in order, instead of listing them (default: %(default)s)",
+    )
+    parser_notify.set_defaults(handler=command_notify)
+
     args = parser.parse_args()
     if hasattr(args, "handler"):
-        args.handler(args)
+        if args.profile and not profiling.get_setting():
+            # inherited by the scripts of the workflow rules
+            os.environ[profiling.PROFILE_ENV] = "1"
+        command = args.handler.__name__.replace("command_", "eirepeat_")
+        with profiling.profile(command, args):
+            args.handler(args)
     else:
         parser.print_help()
 
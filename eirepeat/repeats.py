@@ -0,0 +1,339 @@
+"""
+In-memory API to convert, merge and compute the coverage of repeat annotations, as used by the eirepeat scripts
+
+GFF records are lists of the 9 GFF columns, as strings. GFF3 features are lists of records, a match and its
+match_part, written followed by a '###' directive. The readers and converters are generators, so a chain only holds
+the intervals it merges or computes the coverage of in memory, e.g. from RepeatMasker .out to the coverage summary:
+
+    from eirepeat import repeats
+
+    with open("genome.fa.out") as out_fh, open("genome.fa.bed") as bed_fh:
+        features = repeats.repeatmasker_to_gff3(repeats.read_repeatmasker_out(out_fh))
+        intervals = repeats.group_intervals(repeats.get_records(features, "match_part"))
+        merged = repeats.merge_repeats(intervals)
+        rows = repeats.compute_coverage(intervals, repeats.read_bed(bed_fh))
+        summary = repeats.summarise_coverage(rows)
+"""
+
+from collections import defaultdict
+import logging
+import re
+
+SEQID, SOURCE, TYPE, START, END, SCORE, STRAND, PHASE, ATTRIBUTE = range(9)
+
+
+def read_gff(lines, gff_type=None):
+    """
+    Read the records of GFF/GTF lines, skipping the comments and directives
+    :param lines: Iterable of lines, like an open file
+    :param gff_type: Only read the records of this type (similarity|match_part|exon|...)
+    :return: Generator of records
+    """
+    for line in lines:
+        line = line.strip()
+        if line.startswith("#"):
+            continue
+        record = line.split("\t")
+        if len(record) < 9:
+            continue
+        if gff_type and record[TYPE] != gff_type:
+            continue
+        yield record
+
+
+def read_bed(lines):
+    """
+    Read the intervals of BED lines
+    :param lines: Iterable of lines, like an open file
+    :return: Generator of (seqid, start, end) intervals
+    """
+    for line in lines:
+        line = line.strip()
+        if line.startswith("#"):
+            continue
+        x = line.split("\t")
+        if len(x) < 3:
+            continue
+        seqid, start, end = x[0], int(x[1]), int(x[2])
+        if start > end:
+            start, end = (end, start)
+        yield seqid, start, end
+
+
+def read_repeatmasker_out(lines, tag="Motif"):
+    """
+    Convert RepeatMasker .out lines to the records of the RepeatMasker .out.gff format
+    :param tag: Prefix of the repeat name in the 'Target' attribute
+    :return: Generator of GFF2 records
+    """
+    for line in lines:
+        line = line.strip()
+        if not line or not line[0].isdigit():
+            continue
+        x = line.split()
+        start = x[11]
+        end = x[12]
+        if x[8] == "C":
+            x[8] = "-"
+            start = x[13]
+            end = x[12]
+        yield [
+            x[4],
+            "RepeatMasker",
+            "similarity",
+            x[5],
+            x[6],
+            x[1],
+            x[8],
+            ".",
+            f'Target "{tag}:{x[9]}" {start} {end}',
+        ]
+
+
+def get_target(record, name="input"):
+    """
+    :return: The repeat name of the 'Target' attribute of a RepeatMasker GFF record
+    """
+    # the attribute is 'Target "Motif:(TTAAG)n" 1 682'
+    target_search = re.search(r'Target\s+"([^"]+)', record[ATTRIBUTE])
+    if target_search:
+        return target_search.group(1)
+    raise ValueError(
+        f"Error: Cannot extract field 'Target' from the file '{name}' line below\n'{format_record(record)}'\n, exiting.."
+    )
+
+
+def repeatmasker_to_gff3(records, source=None, tag="RM", name="input"):
+    """
+    Convert RepeatMasker GFF records to GFF3 match/match_part features
+    :param source: Replace the source of the records with this source
+    :param tag: Prefix of the numbered feature IDs
+    :param name: Name of the input in the error raised for a record without a 'Target' attribute
+    :return: Generator of features
+    """
+    for counter, record in enumerate(records, 1):
+        target_id = get_target(record, name)
+        seqid, record_source = record[SEQID], source or record[SOURCE]
+        location = record[START:ATTRIBUTE]
+        yield [
+            [
+                seqid,
+                record_source,
+                "match",
+                *location,
+                f"ID={tag}_{counter};Name={target_id}",
+            ],
+            [
+                seqid,
+                record_source,
+                "match_part",
+                *location,
+                f"ID={tag}_{counter}-exon1;Parent={tag}_{counter}",
+            ],
+        ]
+
+
+def read_red_rpt(lines):
+    """
+    Read the repeats of a Red genome.rpt file, '>seqid:start-end' lines
+    :return: Generator of (seqid, start, end) BED intervals
+    """
+    for line in lines:
+        line = line.rstrip()
+        if not line.startswith(">"):
+            continue
+        # the sequence names may contain ':'
+        seqid, location = line[1:].rsplit(":", 1)
+        start, end = location.split("-")
+        yield seqid, int(start), int(end)
+
+
+def red_to_gff3(intervals, source="red_repeat", tag="red_repeat"):
+    """
+    Convert Red BED intervals to GFF3 match/match_part features
+    :param tag: Prefix of the numbered feature IDs
+    :return: Generator of features
+    """
+    for counter, (seqid, start, end) in enumerate(intervals, 1):
+        location = [seqid, source, "", str(start + 1), str(end), ".", ".", "."]
+        match = location.copy()
+        match[TYPE] = "match"
+        match.append(f"ID={tag}_{counter};Name={tag}_{counter}")
+        match_part = location.copy()
+        match_part[TYPE] = "match_part"
+        match_part.append(f"ID={tag}_{counter}.match_part;Parent={tag}_{counter}")
+        yield [match, match_part]
+
+
+def get_records(features, gff_type=None):
+    """
+    :param gff_type: Only return the records of this type, e.g. 'match_part' to merge or compute the coverage of
+    :return: Generator of the records of the features
+    """
+    for feature in features:
+        for record in feature:
+            if not gff_type or record[TYPE] == gff_type:
+                yield record
+
+
+def group_intervals(records, use_strand=False, ignore_duplicate=False, attributes=True):
+    """
+    Group the records into intervals by sequence
+    :param use_strand: Group by sequence and strand, keyed by (seqid, strand)
+    :param ignore_duplicate: Skip the records with the location of an earlier record
+    :param attributes: Keep the strand and attribute of the records, to merge them. Without, the intervals only take
+    the memory needed to compute the coverage
+    :return: Dictionary of seqid to the list of [start, end, strand, attribute] (or (start, end)) intervals, in input
+    order
+    """
+    intervals = defaultdict(list)
+    seen = set()
+    for record in records:
+        start, end = int(record[START]), int(record[END])
+        if start > end:
+            start, end = (end, start)
+        key = (record[SEQID], record[STRAND]) if use_strand else record[SEQID]
+        if ignore_duplicate:
+            if (key, start, end) in seen:
+                logging.warning(f"Ignore duplicate region '{format_record(record)}'")
+                continue
+            seen.add((key, start, end))
+        if attributes:
+            intervals[key].append([start, end, record[STRAND], record[ATTRIBUTE]])
+        else:
+            intervals[key].append((start, end))
+    return intervals
+
+
+def merge_intervals(intervals):
+    """
+    Merge the intervals sharing at least one base
+    :param intervals: List of [start, end, strand, attribute] intervals, sorted in place
+    :return: List of merged [start, end, strand, attributes] intervals, with the strand of the first interval and the
+    attributes of all the intervals merged
+    """
+    intervals.sort(key=lambda interval: interval[0])
+    merged = list()
+    for start, end, strand, attribute in intervals:
+        if merged and start <= merged[-1][1]:
+            merged[-1][1] = max(merged[-1][1], end)
+            merged[-1][3].append(attribute)
+        else:
+            merged.append([start, end, strand, [attribute]])
+    return merged
+
+
+def merge_repeats(intervals):
+    """
+    Merge the overlapping repeats of each sequence (or sequence and strand)
+    :param intervals: Grouped intervals, from group_intervals
+    :return: List of merged [seqid, start, end, strand, attributes] repeats, by sequence in input order and by start
+    """
+    merged = list()
+    for key, key_intervals in intervals.items():
+        seqid = key[0] if isinstance(key, tuple) else key
+        for start, end, strand, attributes in merge_intervals(key_intervals):
+            merged.append([seqid, start, end, strand, attributes])
+    return merged
+
+
+def merged_to_gff3(merged, source="merged", prefix="merged"):
+    """
+    Convert the merged repeats to GFF3 match/match_part features, numbered '<prefix>_1', '<prefix>_2', ...
+    :return: Generator of features
+    """
+    for counter, (seqid, start, end, strand, _) in enumerate(merged, 1):
+        new_id = f"{prefix}_{counter}"
+        location = [seqid, source, "", str(start), str(end), ".", strand, "."]
+        match = location.copy()
+        match[TYPE] = "match"
+        match.append(f"ID={new_id};Name={new_id}")
+        match_part = location.copy()
+        match_part[TYPE] = "match_part"
+        match_part.append(f"ID={new_id}-exon1;Parent={new_id}")
+        yield [match, match_part]
+
+
+def write_merged_ids(merged, fh, prefix="merged"):
+    """
+    Write the IDs of the merged GFF3 features, with the number and the attributes of the repeats merged into each
+    """
+    fh.write("\t".join(["#new_id", "#merged_count", "#merged_ids"]) + "\n")
+    for counter, (*_, attributes) in enumerate(merged, 1):
+        fh.write(f"{prefix}_{counter}\t{len(attributes)}\t{'||'.join(attributes)}\n")
+
+
+def get_covered_bases(intervals):
+    """
+    :param intervals: List of [start, end, ...] intervals, sorted in place
+    :return: Number of bases covered by the intervals
+    """
+    intervals.sort()
+    covered = 0
+    last = None
+    for interval in intervals:
+        start, end = interval[0], interval[1]
+        if last is None or start > last:
+            covered += end - start + 1
+            last = end
+        elif end > last:
+            covered += end - last
+            last = end
+    return covered
+
+
+def compute_coverage(intervals, sequences):
+    """
+    Compute the repeat coverage of each sequence
+    :param intervals: Intervals grouped by sequence (not strand), from group_intervals
+    :param sequences: BED3 (seqid, 0, length) intervals of the sequences, from read_bed
+    :return: Generator of [seqid, start, end, repeat count, covered bases, length, coverage] rows
+    """
+    seen = set()
+    for seqid, start, end in sequences:
+        if seqid in seen:
+            raise ValueError(
+                f"Error: Potential duplicate entry. '{seqid}' already processed. Please check.\n{seqid}\t{start}\t{end}\n"
+            )
+        seen.add(seqid)
+        seqid_intervals = intervals.get(seqid)
+        if not seqid_intervals:
+            yield [seqid, start, end, 0, 0, end, 0.0]
+            continue
+        covered = get_covered_bases(seqid_intervals)
+        yield [seqid, start, end, len(seqid_intervals), covered, end, covered / end]
+
+
+def summarise_coverage(rows):
+    """
+    :param rows: Coverage rows, from compute_coverage
+    :return: Dictionary of the total sequences, bases, masked bases and the percentage of bases masked
+    """
+    summary = {"sequences": 0, "bases": 0, "masked_bases": 0}
+    for _, _, _, _, covered, length, _ in rows:
+        summary["sequences"] += 1
+        summary["bases"] += length
+        summary["masked_bases"] += covered
+    summary["masked_percentage"] = (
+        summary["masked_bases"] / summary["bases"] * 100 if summary["bases"] else 0
+    )
+    return summary
+
+
+def format_record(record):
+    return "\t".join(record)
+
+
+def write_records(records, fh):
+    for record in records:
+        fh.write("\t".join(record) + "\n")
+
+
+def write_features(features, fh):
+    """
+    Write the GFF3 features, each followed by a '###' directive
+    """
+    for feature in features:
+        for record in feature:
+            fh.write("\t".join(record) + "\n")
+        fh.write("###\n")
@@ -14,6 +14,8 @@ import argparse
 import os
 import sys
 
+from eirepeat.scripts import profiling
+
 # get script name
 script = os.path.basename(sys.argv[0])
 
@@ -70,9 +72,11 @@ def main():
         "--source", help="Provide new source for GFF3 (default: '%(default)s')",
     )
 
+    profiling.add_argument(parser)
     args = parser.parse_args()
 
-    AddDirectivesGFF3(args).run()
+    with profiling.profile(script, args):
+        AddDirectivesGFF3(args).run()
 
 
 if __name__ == "__main__":
@@ -0,0 +1,210 @@
+#!/usr/bin/env python3
+# -*- coding: utf-8 -*-
+"""
+Script to cache expensive pipeline outputs, keyed by the content of their inputs and the tool parameters
+"""
+
+# authorship
+__author__ = "Gemy George Kaithakottil"
+__maintainer__ = "Gemy George Kaithakottil"
+__email__ = "gemygk@gmail.com"
+
+# import libraries
+import argparse
+from argparse import RawTextHelpFormatter
+import hashlib
+import os
+import shutil
+import sys
+import tempfile
+import time
+
+from eirepeat.scripts import profiling
+
+# get script name
+script = os.path.basename(sys.argv[0])
+
+# hash in chunks of 16 MB
+BUFFER_SIZE = 16 * 1024 * 1024
+
+
+class ArtifactCache:
+    @staticmethod
+    def get_key(inputs, params):
+        """
+        Content address of an artifact
+        :param inputs: Input files, hashed by content so that renamed or copied inputs still match
+        :param params: Tool version and parameters, e.g. the tool 'source' command and its options
+        :return: SHA-256 hex digest
+        """
+        key = hashlib.sha256()
+        for input_file in inputs:
+            digest = hashlib.sha256()
+            with open(input_file, "rb") as fh:
+                for chunk in iter(lambda: fh.read(BUFFER_SIZE), b""):
+                    digest.update(chunk)
+            key.update(digest.digest())
+        key.update(" ".join(params.split()).encode())
+        return key.hexdigest()
+
+    @staticmethod
+    def get_size(path):
+        size = 0
+        for root, dirs, files in os.walk(path):
+            for name in files:
+                size += os.lstat(os.path.join(root, name)).st_size
+        return size
+
+    def __init__(self, args):
+        self.args = args
+
+    def get_entry(self, key):
+        return os.path.join(self.args.cache, key[:2], key)
+
+    def restore(self):
+        entry = self.get_entry(self.args.key)
+        if not os.path.isdir(entry):
+            print(f"Cache miss for '{self.args.key}'", file=sys.stderr)
+            return 1
+        os.makedirs(self.args.output_dir, exist_ok=True)
+        for name in os.listdir(entry):
+            dest = os.path.join(self.args.output_dir, name)
+            if os.path.lexists(dest):
+                os.remove(dest)
+            # copy rather than link, a later in-place write to an output must not change the cached file
+            shutil.copyfile(os.path.join(entry, name), dest)
+        # the entry modification time marks its last use for the eviction
+        os.utime(entry)
+        print(
+            f"Restored '{self.args.key}' from cache to '{self.args.output_dir}'",
+            file=sys.stderr,
+        )
+        return 0
+
+    def store(self):
+        entry = self.get_entry(self.args.key)
+        if not os.path.isdir(entry):
+            os.makedirs(os.path.dirname(entry), exist_ok=True)
+            # copy to a temporary entry and rename it, so a partly written entry is never restored
+            tmp_entry = tempfile.mkdtemp(prefix=".tmp.", dir=os.path.dirname(entry))
+            for name in self.args.files:
+                # copy rather than link, the pipeline must not be able to change a cached file
+                shutil.copyfile(
+                    os.path.join(self.args.output_dir, name),
+                    os.path.join(tmp_entry, os.path.basename(name)),
+                )
+            try:
+                os.rename(tmp_entry, entry)
+                print(f"Stored '{self.args.key}' in cache", file=sys.stderr)
+            except OSError:
+                # stored by a concurrent run in the meantime
+                shutil.rmtree(tmp_entry, ignore_errors=True)
+        return self.evict()
+
+    def evict(self):
+        """
+        Remove the least recently used entries until the cache fits in --max_size
+        """
+        max_size = self.args.max_size * 1024**3
+        entries = list()
+        for prefix in os.listdir(self.args.cache):
+            prefix_dir = os.path.join(self.args.cache, prefix)
+            if not os.path.isdir(prefix_dir):
+                continue
+            for key in os.listdir(prefix_dir):
+                # skip temporary entries of a store in progress
+                if key.startswith("."):
+                    continue
+                entry = os.path.join(prefix_dir, key)
+                entries.append(
+                    (os.stat(entry).st_mtime, ArtifactCache.get_size(entry), entry)
+                )
+        total = sum(size for _, size, _ in entries)
+        for last_used, size, entry in sorted(entries):
+            if total <= max_size:
+                break
+            print(
+                f"Evicting '{os.path.basename(entry)}' from cache, last used {time.ctime(last_used)}",
+                file=sys.stderr,
+            )
+            shutil.rmtree(entry, ignore_errors=True)
+            total -= size
+        return 0
+
+    def run(self):
+        if self.args.command == "key":
+            print(ArtifactCache.get_key(self.args.inputs, self.args.params))
+            return 0
+        if self.args.command == "restore":
+            return self.restore()
+        if self.args.command == "store":
+            return self.store()
+        return self.evict()
+
+
+def main():
+    parser = argparse.ArgumentParser(
+        description="Script to cache expensive pipeline outputs, keyed by the content of their inputs and the tool parameters",
+        formatter_class=RawTextHelpFormatter,
+        epilog="Example command:\n\t"
+        + script
+        + " key --inputs genome.fa --params 'source repeatmodeler-1.0.11_CBG -engine ncbi -srand 7'\n\t"
+        + script
+        + " restore --cache /path/to/cache --output_dir index KEY\n\t"
+        + script
+        + " store --cache /path/to/cache --output_dir index KEY genome.fa-families.fa genome.fa-families.stk\n\nContact:"
+        + __author__
+        + "("
+        + __email__
+        + ")",
+    )
+    subparsers = parser.add_subparsers(dest="command", required=True)
+
+    parser_key = subparsers.add_parser("key", help="Print the cache key of an artifact")
+    parser_key.add_argument(
+        "--inputs",
+        nargs="*",
+        default=list(),
+        help="Provide input files (default: %(default)s)",
+    )
+    parser_key.add_argument(
+        "--params",
+        default="",
+        help="Provide tool version and parameters (default: %(default)s)",
+    )
+
+    parser_restore = subparsers.add_parser(
+        "restore", help="Restore an artifact from the cache, fails on a cache miss"
+    )
+    parser_store = subparsers.add_parser("store", help="Store an artifact in the cache")
+    for subparser in [parser_restore, parser_store]:
+        subparser.add_argument("key", help="Provide cache key")
+        subparser.add_argument(
+            "--output_dir",
+            required=True,
+            help="Provide directory to restore the files to, or to store them from",
+        )
+    parser_store.add_argument("files", nargs="+", help="Provide files to store")
+
+    parser_evict = subparsers.add_parser(
+        "evict", help="Evict the least recently used artifacts"
+    )
+    for subparser in [parser_restore, parser_store, parser_evict]:
+        subparser.add_argument("--cache", required=True, help="Provide cache directory")
+    for subparser in [parser_store, parser_evict]:
+        subparser.add_argument(
+            "--max_size",
+            type=float,
+            default=500,
+            help="Provide maximum cache size in GB (default: %(default)s)",
+        )
+    profiling.add_argument(parser)
+    args = parser.parse_args()
+
+    with profiling.profile(script, args):
+        exit_code = ArtifactCache(args).run()
+    sys.exit(exit_code)
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,146 @@
+#!/usr/bin/env python3
+# -*- coding: utf-8 -*-
+"""
+Script to classify failed rule attempts so that only resource failures are retried
+"""
+
+# authorship
+__author__ = "Gemy George Kaithakottil"
+__maintainer__ = "Gemy George Kaithakottil"
+__email__ = "gemygk@gmail.com"
+
+# import libraries
+import argparse
+from argparse import RawTextHelpFormatter
+import os
+import re
+import sys
+
+from eirepeat.scripts import profiling
+
+# get script name
+script = os.path.basename(sys.argv[0])
+
+# failure classes
+MEMORY, TIME, TOOL = "memory", "time", "tool"
+
+# exit codes of a tool killed by the OOM killer (SIGKILL) or at the walltime (SIGTERM/SIGUSR2)
+EXIT_CODES = {137: MEMORY, 143: TIME, 140: TIME}
+# log messages of a tool or scheduler hitting a resource limit
+PATTERNS = [
+    (
+        re.compile(
+            r"oom[-_]kill|out of memory|cannot allocate memory|std::bad_alloc|MemoryError",
+            re.IGNORECASE,
+        ),
+        MEMORY,
+    ),
+    (re.compile(r"Command terminated by signal 9"), MEMORY),
+    (re.compile(r"DUE TO TIME LIMIT|Command terminated by signal 15"), TIME),
+]
+
+
+class ClassifyFailure:
+    @staticmethod
+    def classify(exit_code, log):
+        """
+        Classify a failed attempt from its exit code and its log
+        :param exit_code: Exit code of the failed rule shell command
+        :param log: The rule log file
+        :return: One of 'memory', 'time' or 'tool'
+        """
+        if exit_code in EXIT_CODES:
+            return EXIT_CODES[exit_code]
+        if os.path.exists(log):
+            with open(log, "r", errors="replace") as fh:
+                for line in fh:
+                    for pattern, failure in PATTERNS:
+                        if pattern.search(line):
+                            return failure
+        return TOOL
+
+    def __init__(self, args):
+        self.args = args
+        self.failure_file = f"{self.args.log}.failure"
+
+    def check(self):
+        # the first attempt of a run starts clean
+        if self.args.attempt <= 1:
+            if os.path.exists(self.failure_file):
+                os.remove(self.failure_file)
+            return 0
+        # an attempt killed by the scheduler leaves no record, which is a resource failure too
+        failure = None
+        if os.path.exists(self.failure_file):
+            with open(self.failure_file, "r") as fh:
+                failure = fh.read().strip()
+        if failure == TOOL:
+            print(
+                f"Not retrying attempt {self.args.attempt}, previous attempt failed with a tool error. Please check '{self.args.log}'",
+                file=sys.stderr,
+            )
+            return 1
+        return 0
+
+    def record(self):
+        failure = ClassifyFailure.classify(self.args.exit_code, self.args.log)
+        with open(self.failure_file, "w") as fh:
+            fh.write(f"{failure}\n")
+        print(
+            f"Attempt failed with exit code {self.args.exit_code}, classified as '{failure}' failure",
+            file=sys.stderr,
+        )
+        # always fail, so that Snakemake sees the original error
+        return 1
+
+    def run(self):
+        return self.check() if self.args.command == "check" else self.record()
+
+
+def main():
+    parser = argparse.ArgumentParser(
+        description="Script to classify failed rule attempts so that only resource failures are retried",
+        formatter_class=RawTextHelpFormatter,
+        epilog="Example command:\n\t"
+        + script
+        + " check --attempt 2 logs/RepeatModeler.log\n\t"
+        + script
+        + " record --exit_code 137 logs/RepeatModeler.log\n\nContact:"
+        + __author__
+        + "("
+        + __email__
+        + ")",
+    )
+    subparsers = parser.add_subparsers(dest="command", required=True)
+
+    parser_check = subparsers.add_parser(
+        "check", help="Fail if the previous attempt was a tool error"
+    )
+    parser_check.add_argument("log", help="Provide rule log file")
+    parser_check.add_argument(
+        "--attempt",
+        type=int,
+        default=1,
+        help="Provide Snakemake attempt number (default: %(default)s)",
+    )
+
+    parser_record = subparsers.add_parser(
+        "record", help="Record the failure class of the current attempt"
+    )
+    parser_record.add_argument("log", help="Provide rule log file")
+    parser_record.add_argument(
+        "--exit_code",
+        type=int,
+        required=True,
+        help="Provide exit code of the failed command",
+    )
+    profiling.add_argument(parser)
+    args = parser.parse_args()
+
+    with profiling.profile(script, args):
+        exit_code = ClassifyFailure(args).run()
+    sys.exit(exit_code)
+
+
+if __name__ == "__main__":
+    main()
@@ -13,6 +13,8 @@ import argparse
 import os
 import sys
 
+from eirepeat.scripts import profiling
+
 # get script name
 script = os.path.basename(sys.argv[0])
 
@@ -52,9 +54,11 @@ def main():
         "--source", help="Provide new source for GFF3 (default: '%(default)s')",
     )
 
+    profiling.add_argument(parser)
     args = parser.parse_args()
 
-    CleanGFF3Source(args).run()
+    with profiling.profile(script, args):
+        CleanGFF3Source(args).run()
 
 
 if __name__ == "__main__":
@@ -0,0 +1,278 @@
+#!/usr/bin/env python3
+# -*- coding: utf-8 -*-
+"""
+Script to remove near-duplicate consensus sequences from a repeat library using MinHash sketches
+"""
+
+# authorship
+__author__ = "Gemy George Kaithakottil"
+__maintainer__ = "Gemy George Kaithakottil"
+__email__ = "gemygk@gmail.com"
+
+# import libraries
+import argparse
+from argparse import RawTextHelpFormatter
+from collections import Counter
+import heapq
+import math
+import multiprocessing
+import os
+import sys
+import logging
+
+from eirepeat.scripts import profiling
+
+# get script name
+script = os.path.basename(sys.argv[0])
+
+logging.basicConfig(
+    format="%(asctime)s - %(process)d - %(name)s - %(levelname)s - %(message)s",
+    datefmt="%d-%b-%y %H:%M:%S",
+    level=logging.DEBUG,
+)
+
+# 2-bit codes, other bases (N from hardmasking, IUPAC codes) break the k-mers
+CODES = {"A": 0, "C": 1, "G": 2, "T": 3, "a": 0, "c": 1, "g": 2, "t": 3}
+MASK64 = (1 << 64) - 1
+
+# sketches and their inverted index, shared with the worker processes
+SKETCHES = list()
+INDEX = dict()
+
+
+def mix(x):
+    # splitmix64 finaliser, the same in every process unlike the salted built-in hash()
+    x = (x + 0x9E3779B97F4A7C15) & MASK64
+    x = ((x ^ (x >> 30)) * 0xBF58476D1CE4E5B9) & MASK64
+    x = ((x ^ (x >> 27)) * 0x94D049BB133111EB) & MASK64
+    return x ^ (x >> 31)
+
+
+def get_sketch(task):
+    """
+    Bottom-s MinHash sketch of the canonical k-mers of a sequence
+    :param task: Tuple of sequence, k-mer size and sketch size
+    :return: Sorted list of the smallest k-mer hashes
+    """
+    seq, kmer_size, sketch_size = task
+    mask = (1 << (2 * kmer_size)) - 1
+    shift = 2 * (kmer_size - 1)
+    forward = reverse = valid = 0
+    hashes = set()
+    for base in seq:
+        code = CODES.get(base)
+        if code is None:
+            forward = reverse = valid = 0
+            continue
+        forward = ((forward << 2) | code) & mask
+        reverse = (reverse >> 2) | ((3 - code) << shift)
+        valid += 1
+        if valid >= kmer_size:
+            hashes.add(mix(min(forward, reverse)))
+    return heapq.nsmallest(sketch_size, hashes)
+
+
+def get_jaccard(sketch_a, sketch_b, sketch_size):
+    # estimated on the bottom-s sketch of the union
+    union = heapq.nsmallest(sketch_size, set(sketch_a) | set(sketch_b))
+    shared = set(sketch_a) & set(sketch_b)
+    return sum(1 for h in union if h in shared) / len(union)
+
+
+def init_worker(sketches, index):
+    global SKETCHES, INDEX
+    SKETCHES = sketches
+    INDEX = index
+
+
+def find_neighbours(task):
+    """
+    Find the sequences after sequence i whose estimated Jaccard similarity reaches the threshold
+    :param task: Tuple of sequence number, minimum Jaccard similarity and sketch size
+    :return: List of (i, j, jaccard)
+    """
+    i, min_jaccard, sketch_size = task
+    sketch = SKETCHES[i]
+    counts = Counter(j for h in sketch for j in INDEX[h] if j > i)
+    neighbours = list()
+    for j, count in counts.items():
+        # the shared hashes in the union sketch are at most the shared hashes of both sketches,
+        # and the union sketch is at least as long as either sketch
+        if count < min_jaccard * max(len(sketch), len(SKETCHES[j])):
+            continue
+        jaccard = get_jaccard(sketch, SKETCHES[j], sketch_size)
+        if jaccard >= min_jaccard:
+            neighbours.append((i, j, jaccard))
+    return neighbours
+
+
+class CompactLibrary:
+    @staticmethod
+    def identity_to_jaccard(identity, kmer_size):
+        # inverse of the Mash distance D = -1/k * ln(2J / (1 + J)), with D = 1 - identity
+        x = math.exp(-kmer_size * (1 - identity))
+        return x / (2 - x)
+
+    @staticmethod
+    def jaccard_to_identity(jaccard, kmer_size):
+        if jaccard <= 0:
+            return 0
+        return 1 + math.log(2 * jaccard / (1 + jaccard)) / kmer_size
+
+    @staticmethod
+    def get_class(name):
+        # RepeatModeler names carry the class after '#', like rnd-1_family-5#LINE/L1
+        return name.partition("#")[2]
+
+    def __init__(self, args):
+        self.args = args
+        self.records = list()
+        self.min_jaccard = CompactLibrary.identity_to_jaccard(
+            self.args.min_identity, self.args.kmer_size
+        )
+
+    def process_fasta(self):
+        with open(self.args.fasta, "r") as fh:
+            for line in fh:
+                if line.startswith(">"):
+                    name = line[1:].split()[0] if line[1:].split() else ""
+                    self.records.append([name, line, list()])
+                elif self.records:
+                    self.records[-1][2].append(line)
+
+    def get_clusters(self, neighbours):
+        """
+        Greedy clustering, the longest sequence becomes the representative and takes all its unassigned neighbours
+        of the same class. Members are only collapsed into a representative they are similar to, so clusters do not
+        chain, and a neighbour of another class is kept, as its masked hits would be reported under the wrong class.
+        :return: Dictionary of removed sequence number to (representative number, jaccard)
+        """
+        lengths = [
+            sum(len(line.strip()) for line in record[2]) for record in self.records
+        ]
+        classes = [CompactLibrary.get_class(record[0]) for record in self.records]
+        removed = dict()
+        for i in sorted(range(len(self.records)), key=lambda n: (-lengths[n], n)):
+            if i in removed:
+                continue
+            for j, jaccard in sorted(neighbours[i].items()):
+                if j not in removed and classes[j] == classes[i]:
+                    removed[j] = (i, jaccard)
+        return removed
+
+    def run(self):
+        with profiling.phase("process_fasta"):
+            self.process_fasta()
+        logging.info(
+            f"Sketching {len(self.records)} sequences with {self.args.processes} processes"
+        )
+        tasks = (
+            (
+                "".join(line.strip() for line in record[2]),
+                self.args.kmer_size,
+                self.args.sketch_size,
+            )
+            for record in self.records
+        )
+        with profiling.phase("sketch"), multiprocessing.Pool(
+            self.args.processes
+        ) as pool:
+            sketches = pool.map(get_sketch, tasks, chunksize=16)
+        index = dict()
+        for i, sketch in enumerate(sketches):
+            for h in sketch:
+                index.setdefault(h, list()).append(i)
+
+        logging.info(
+            f"Comparing sketches, minimum identity {self.args.min_identity} (Jaccard {self.min_jaccard:.4f})"
+        )
+        neighbours = [dict() for _ in self.records]
+        tasks = (
+            (i, self.min_jaccard, self.args.sketch_size) for i in range(len(sketches))
+        )
+        with profiling.phase("find_neighbours"), multiprocessing.Pool(
+            self.args.processes, initializer=init_worker, initargs=(sketches, index)
+        ) as pool:
+            for pairs in pool.imap_unordered(find_neighbours, tasks, chunksize=16):
+                for i, j, jaccard in pairs:
+                    neighbours[i][j] = jaccard
+                    neighbours[j][i] = jaccard
+
+        with profiling.phase("get_clusters"):
+            removed = self.get_clusters(neighbours)
+        with open(self.args.output, "w") as fh:
+            for i, record in enumerate(self.records):
+                if i not in removed:
+                    fh.write(record[1])
+                    fh.writelines(record[2])
+        with open(self.args.report, "w") as fh:
+            print("#removed\trepresentative\tidentity\tjaccard", file=fh)
+            for j, (i, jaccard) in sorted(removed.items()):
+                identity = CompactLibrary.jaccard_to_identity(
+                    jaccard, self.args.kmer_size
+                )
+                print(
+                    f"{self.records[j][0]}\t{self.records[i][0]}\t{identity:.4f}\t{jaccard:.4f}",
+                    file=fh,
+                )
+        logging.info(
+            f"Collapsed {len(removed)} of {len(self.records)} sequences, kept {len(self.records) - len(removed)}"
+        )
+
+
+def main():
+    parser = argparse.ArgumentParser(
+        description="Script to remove near-duplicate consensus sequences from a repeat library using MinHash sketches",
+        formatter_class=RawTextHelpFormatter,
+        epilog="Example command:\n\t"
+        + script
+        + " genome.fa-families.fa --output genome.fa-families.compact.fa --report genome.fa-families.collapsed.tsv --processes 8\n\nContact:"
+        + __author__
+        + "("
+        + __email__
+        + ")",
+    )
+    parser.add_argument("fasta", help="Provide repeat library FASTA")
+    parser.add_argument(
+        "--output", required=True, help="Provide output compacted library FASTA"
+    )
+    parser.add_argument(
+        "--report",
+        required=True,
+        help="Provide output TSV of the collapsed sequences and their representative",
+    )
+    parser.add_argument(
+        "--min_identity",
+        type=float,
+        default=0.98,
+        help="Provide minimum estimated identity to collapse two sequences (default: %(default)s)",
+    )
+    parser.add_argument(
+        "--kmer_size",
+        type=int,
+        default=15,
+        help="Provide k-mer size, at most 31 (default: %(default)s)",
+    )
+    parser.add_argument(
+        "--sketch_size",
+        type=int,
+        default=512,
+        help="Provide number of hashes per sketch (default: %(default)s)",
+    )
+    parser.add_argument(
+        "--processes",
+        type=int,
+        default=1,
+        help="Provide number of processes (default: %(default)s)",
+    )
+    profiling.add_argument(parser)
+    args = parser.parse_args()
+    if not 1 <= args.kmer_size <= 31:
+        parser.error("--kmer_size must be between 1 and 31")
+
+    with profiling.profile(script, args):
+        CompactLibrary(args).run()
+
+
+if __name__ == "__main__":
+    main()
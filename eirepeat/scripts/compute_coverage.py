@@ -14,89 +14,29 @@ import argparse
 from argparse import RawTextHelpFormatter
 import os
 import sys
-from collections import defaultdict
+
+from eirepeat import repeats
+from eirepeat.scripts import profiling
 
 # get script name
 script = os.path.basename(sys.argv[0])
 
 
 class ComputeCoverage:
-    @staticmethod
-    def merge_intervals(intervals):
-        intervals.sort(key=lambda interval: interval[0])
-        merged = [intervals[0]]
-        for current in intervals:
-            previous = merged[-1]
-            if current[0] <= previous[1]:
-                previous[1] = max(previous[1], current[1])
-            else:
-                merged.append(current)
-        return merged
-
     def __init__(self, args):
         self.args = args
-        self.genome_info = defaultdict()
-        self.gff_info = defaultdict(list)
-        self.gff_merged_info = defaultdict(list)
-        self.covered_bases_info = defaultdict()
+        self.gff_info = dict()
 
     def process_gff(self):
         with open(self.args.gff_file, "r") as fh:
-            for line in fh:
-                line = line.strip()
-                if line.startswith("#"):
-                    continue
-                x = line.split("\t")
-                if len(x) < 9:
-                    continue
-                gxf_type = x[2]
-                if self.args.gff_type and gxf_type != self.args.gff_type:
-                    continue
-                uid, start, end = x[0], int(x[3]), int(x[4])
-                if start > end:
-                    (start, end) = (end, start)
-                self.gff_info[uid].append([start, end])
-
-    def normalise_coverage(self):
-        for uid in self.gff_info:
-            self.gff_merged_info[uid] = ComputeCoverage.merge_intervals(
-                self.gff_info[uid]
+            self.gff_info = repeats.group_intervals(
+                repeats.read_gff(fh, self.args.gff_type), attributes=False
             )
 
-    def calc_bases_coverage(self):
-        for uid in self.gff_merged_info:
-            if uid not in self.covered_bases_info:
-                self.covered_bases_info[uid] = 0
-            for x, y in self.gff_merged_info[uid]:
-                self.covered_bases_info[uid] += (y - x) + 1
-
     def process_bed(self):
         with open(self.args.bed3_file, "r") as fh:
-            for line in fh:
-                line = line.strip()
-                if line.startswith("#"):
-                    continue
-                x = line.split("\t")
-                if len(x) < 2:
-                    continue
-                uid, start, end = x[0], int(x[1]), int(x[2])
-                if start > end:
-                    (start, end) = (end, start)
-                if uid in self.genome_info:
-                    raise ValueError(
-                        f"Error: Potential duplicate entry. '{uid}' already processed. Please check.\n{line}\n"
-                    )
-                cov = 0
-                cov_bases = 0
-                if uid in self.covered_bases_info:
-                    cov_bases = self.covered_bases_info[uid]
-                    cov = cov_bases / end
-                    cov = f"{cov:.7f}"
-                    self.genome_info[uid] = cov
-                else:
-                    self.genome_info[uid] = cov
-                    cov_bases = 0
-
+            rows = repeats.compute_coverage(self.gff_info, repeats.read_bed(fh))
+            for uid, start, end, count, cov_bases, length, cov in rows:
                 # print summary
                 print(
                     "\t".join(
@@ -104,19 +44,19 @@ class ComputeCoverage:
                             uid,
                             str(start),
                             str(end),
-                            str(len(self.gff_info.get(uid, []))),
+                            str(count),
                             str(cov_bases),
-                            str(end),
-                            str(cov),
+                            str(length),
+                            f"{cov:.7f}" if count else "0",
                         ]
                     )
                 )
 
     def run(self):
-        self.process_gff()
-        self.normalise_coverage()
-        self.calc_bases_coverage()
-        self.process_bed()
+        with profiling.phase("process_gff"):
+            self.process_gff()
+        with profiling.phase("process_bed"):
+            self.process_bed()
 
 
 def main():
@@ -146,9 +86,11 @@ def main():
         type=str,
         help="Provide GFF/GTF type (similarity|match_part|exon|...) to extact the feature from the input to compute coverage if input has top level (gene|mRNA|match) features (default: %(default)s)",
     )
+    profiling.add_argument(parser)
     args = parser.parse_args()
 
-    ComputeCoverage(args).run()
+    with profiling.profile(script, args):
+        ComputeCoverage(args).run()
 
 
 if __name__ == "__main__":
@@ -0,0 +1,239 @@
+#!/usr/bin/env python3
+# -*- coding: utf-8 -*-
+"""
+Script to record the content hashes of rule inputs and outputs, and restore the outputs of unchanged inputs
+"""
+
+# authorship
+__author__ = "Gemy George Kaithakottil"
+__maintainer__ = "Gemy George Kaithakottil"
+__email__ = "gemygk@gmail.com"
+
+# import libraries
+import argparse
+from argparse import RawTextHelpFormatter
+from contextlib import contextmanager
+import fcntl
+import hashlib
+import json
+import os
+import shutil
+import sys
+
+from eirepeat.scripts import profiling
+
+# get script name
+script = os.path.basename(sys.argv[0])
+
+# hash in chunks of 16 MB
+BUFFER_SIZE = 16 * 1024 * 1024
+# files up to 1 MB, like the empty .completed markers, are copied rather than hardlinked. Identical small outputs of
+# different rules would otherwise share one inode, and touching one would change the mtime of all of them
+LINK_MIN_SIZE = 1024 * 1024
+
+
+class ContentManifest:
+    @staticmethod
+    def get_hash(path):
+        digest = hashlib.sha256()
+        with open(path, "rb") as fh:
+            for chunk in iter(lambda: fh.read(BUFFER_SIZE), b""):
+                digest.update(chunk)
+        return digest.hexdigest()
+
+    def __init__(self, args):
+        self.args = args
+        self.objects_dir = os.path.join(self.args.manifest_dir, "objects")
+        # one manifest per set of outputs, so that concurrent rules never write the same file
+        name = hashlib.sha1(
+            "\n".join(sorted(os.path.abspath(f) for f in self.args.outputs)).encode()
+        ).hexdigest()
+        self.manifest_file = os.path.join(self.args.manifest_dir, f"{name}.json")
+        self.lock_file = os.path.join(self.args.manifest_dir, ".lock")
+        self.manifest = dict()
+        if os.path.exists(self.manifest_file):
+            with open(self.manifest_file, "r") as fh:
+                self.manifest = json.load(fh)
+
+    @contextmanager
+    def locked(self):
+        """
+        Hold the lock of the manifest directory, shared by the concurrent rules of a run
+        """
+        os.makedirs(self.args.manifest_dir, exist_ok=True)
+        with open(self.lock_file, "a") as lock:
+            fcntl.flock(lock, fcntl.LOCK_EX)
+            yield
+
+    @staticmethod
+    def link_or_copy(src, dest, size):
+        if size >= LINK_MIN_SIZE:
+            try:
+                os.link(src, dest)
+                return
+            except OSError:
+                # the objects are on a different filesystem
+                pass
+        shutil.copyfile(src, dest)
+
+    def get_record(self, path, known):
+        """
+        :param known: Previous records of the files, the hash is reused while the file size and mtime are unchanged
+        :return: Dictionary of sha256, size and mtime_ns of the file
+        """
+        stat = os.stat(path)
+        record = known.get(os.path.abspath(path))
+        if (
+            record
+            and record["size"] == stat.st_size
+            and record["mtime_ns"] == stat.st_mtime_ns
+        ):
+            return record
+        return {
+            "sha256": ContentManifest.get_hash(path),
+            "size": stat.st_size,
+            "mtime_ns": stat.st_mtime_ns,
+        }
+
+    def get_input_hashes(self):
+        known = self.manifest.get("inputs", dict())
+        return {
+            os.path.abspath(f): self.get_record(f, known)["sha256"]
+            for f in self.args.inputs
+        }
+
+    def restore(self):
+        if not self.manifest:
+            return 1
+        if self.manifest.get("params") != self.args.params:
+            print("Rule parameters changed, running the rule", file=sys.stderr)
+            return 1
+        recorded = {f: r["sha256"] for f, r in self.manifest["inputs"].items()}
+        if self.get_input_hashes() != recorded:
+            print("Input content changed, running the rule", file=sys.stderr)
+            return 1
+        outputs = self.manifest["outputs"]
+        if sorted(outputs) != sorted(os.path.abspath(f) for f in self.args.outputs):
+            return 1
+        # the objects are not pruned while they are restored
+        with self.locked():
+            if not all(
+                os.path.exists(os.path.join(self.objects_dir, r["sha256"]))
+                for r in outputs.values()
+            ):
+                return 1
+            for path, record in outputs.items():
+                if os.path.lexists(path):
+                    os.remove(path)
+                os.makedirs(os.path.dirname(path), exist_ok=True)
+                ContentManifest.link_or_copy(
+                    os.path.join(self.objects_dir, record["sha256"]),
+                    path,
+                    record["size"],
+                )
+                # restored outputs are new to Snakemake
+                os.utime(path)
+        print(
+            "Input content unchanged, restored the outputs of the previous run",
+            file=sys.stderr,
+        )
+        return 0
+
+    def record(self):
+        known = self.manifest.get("outputs", dict())
+        outputs = {
+            os.path.abspath(f): self.get_record(f, known) for f in self.args.outputs
+        }
+        known_inputs = self.manifest.get("inputs", dict())
+        self.manifest = {
+            "params": self.args.params,
+            "inputs": {
+                os.path.abspath(f): self.get_record(f, known_inputs)
+                for f in self.args.inputs
+            },
+            "outputs": outputs,
+        }
+        # from adding the objects to writing the manifest referring to them, no other rule prunes
+        with self.locked():
+            os.makedirs(self.objects_dir, exist_ok=True)
+            for path, record in outputs.items():
+                # keep the content alive, Snakemake removes the outputs before rerunning a rule
+                obj = os.path.join(self.objects_dir, record["sha256"])
+                if not os.path.exists(obj):
+                    ContentManifest.link_or_copy(path, obj, record["size"])
+            tmp_file = f"{self.manifest_file}.tmp"
+            with open(tmp_file, "w") as fh:
+                json.dump(self.manifest, fh, indent=4)
+            os.rename(tmp_file, self.manifest_file)
+            self.prune()
+        return 0
+
+    def prune(self):
+        # remove the objects of outputs no manifest refers to anymore, called under the lock so that no object is
+        # removed between a concurrent record adding it and writing its manifest
+        referenced = set()
+        for name in os.listdir(self.args.manifest_dir):
+            if not name.endswith(".json"):
+                continue
+            try:
+                with open(os.path.join(self.args.manifest_dir, name), "r") as fh:
+                    manifest = json.load(fh)
+            except (OSError, ValueError):
+                # unreadable, keep everything
+                return
+            referenced.update(r["sha256"] for r in manifest["outputs"].values())
+        for name in os.listdir(self.objects_dir):
+            if name not in referenced:
+                os.remove(os.path.join(self.objects_dir, name))
+
+    def run(self):
+        return self.restore() if self.args.command == "restore" else self.record()
+
+
+def main():
+    parser = argparse.ArgumentParser(
+        description="Script to record the content hashes of rule inputs and outputs, and restore the outputs of unchanged inputs",
+        formatter_class=RawTextHelpFormatter,
+        epilog="Example command:\n\t"
+        + script
+        + " restore --manifest_dir output/.manifest --inputs a.gff b.gff --outputs all.gff\n\t"
+        + script
+        + " record --manifest_dir output/.manifest --inputs a.gff b.gff --outputs all.gff\n\nContact:"
+        + __author__
+        + "("
+        + __email__
+        + ")",
+    )
+    subparsers = parser.add_subparsers(dest="command", required=True)
+    parser_restore = subparsers.add_parser(
+        "restore",
+        help="Restore the outputs recorded for the same input content, fails if anything changed",
+    )
+    parser_record = subparsers.add_parser(
+        "record", help="Record the input and output content of a rule"
+    )
+    for subparser in [parser_restore, parser_record]:
+        subparser.add_argument(
+            "--manifest_dir", required=True, help="Provide manifest directory"
+        )
+        subparser.add_argument(
+            "--inputs", nargs="*", default=list(), help="Provide rule input files"
+        )
+        subparser.add_argument(
+            "--outputs", nargs="+", required=True, help="Provide rule output files"
+        )
+        subparser.add_argument(
+            "--params",
+            default="",
+            help="Provide rule parameters, a change reruns the rule (default: %(default)s)",
+        )
+    profiling.add_argument(parser)
+    args = parser.parse_args()
+
+    with profiling.profile(script, args):
+        exit_code = ContentManifest(args).run()
+    sys.exit(exit_code)
+
+
+if __name__ == "__main__":
+    main()
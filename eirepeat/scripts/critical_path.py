@@ -0,0 +1,74 @@
+import json
+import os
+
+
+class CriticalPath:
+    @staticmethod
+    def load_runtimes(runtimes_file):
+        """
+        Load historical runtimes of a previous run
+        :param runtimes_file: JSON file of rule name to wall clock seconds, either as a number or
+        as an eirepeat.telemetry.json record. The jobs of a rule with several, like the transposonpsi chunks, run
+        in parallel, so its 'max_job_wall_clock_seconds' is used if present, else its 'wall_clock_seconds'
+        :return: Dictionary of rule name to runtime in hours
+        """
+        runtimes = dict()
+        if not runtimes_file or not os.path.exists(runtimes_file):
+            return runtimes
+        with open(runtimes_file, "r") as fh:
+            for rulename, runtime in json.load(fh).items():
+                if isinstance(runtime, dict):
+                    runtime = runtime.get(
+                        "max_job_wall_clock_seconds", runtime.get("wall_clock_seconds")
+                    )
+                if runtime is not None:
+                    runtimes[rulename] = float(runtime) / 3600
+        return runtimes
+
+    def __init__(self, graph, costs):
+        """
+        :param graph: Dictionary of rule name to the set of rule names it depends on
+        :param costs: Dictionary of rule name to its estimated cost in hours
+        """
+        self.costs = costs
+        self.downstream = {rulename: set() for rulename in graph}
+        for rulename, upstream in graph.items():
+            for dependency in upstream:
+                self.downstream.setdefault(dependency, set()).add(rulename)
+        self.__path_lengths = dict()
+
+    def get_path_length(self, rulename):
+        """
+        :return: Cost of the longest chain starting at this rule, down to the end of the workflow
+        """
+        if rulename not in self.__path_lengths:
+            following = [self.get_path_length(r) for r in self.downstream[rulename]]
+            self.__path_lengths[rulename] = self.costs.get(rulename, 0) + max(
+                following, default=0
+            )
+        return self.__path_lengths[rulename]
+
+    def get_priorities(self):
+        """
+        :return: Dictionary of rule name to Snakemake priority, the remaining chain in minutes, so that rules
+        shorter than an hour are still ordered
+        """
+        return {
+            rulename: int(round(self.get_path_length(rulename) * 60))
+            for rulename in self.downstream
+        }
+
+    def get_critical_path(self):
+        """
+        :return: List of rule names on the longest chain of the workflow
+        """
+        path = list()
+        candidates = [r for r in self.downstream if not self.__get_upstream(r)]
+        while candidates:
+            rulename = max(candidates, key=self.get_path_length)
+            path.append(rulename)
+            candidates = self.downstream[rulename]
+        return path
+
+    def __get_upstream(self, rulename):
+        return [r for r in self.downstream if rulename in self.downstream[r]]
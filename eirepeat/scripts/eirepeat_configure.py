@@ -21,16 +21,24 @@ from eirepeat import (
     DEFAULT_HPC_CONFIG_FILE,
     FULL_SPECIES_TREE_FILE,
 )
+from eirepeat.scripts.fasta_stats import FastaStats
+from eirepeat.scripts.species_index import SpeciesIndex
+from eirepeat.scripts import profiling
 
 # get script name
 script = Path(sys.argv[0]).name
 
 cwd = os.getcwd()
 
+# RepeatModeler BuildDatabase fails on longer sequence identifiers
+MAX_HEADER_LENGTH = 50
+
 
 class EIRepeatConfigure:
     def __init__(self, args):
         self.args = args
+        if not getattr(self.args, "skip_species_check", False):
+            self.check_species()
         if not Path(self.args.fasta).exists():
             raise FileNotFoundError(f"File not found: '{self.args.fasta}'")
         self.args.fasta = str(Path(self.args.fasta).resolve())
@@ -51,6 +59,19 @@ class EIRepeatConfigure:
         self.run_config = dict()
         self.run_config_file = str()
 
+    def check_species(self):
+        # a misspelt species only fails once RepeatMasker runs on the cluster, so check it up front
+        index = SpeciesIndex.load()
+        species = index.get(self.args.species)
+        if species is None:
+            suggestions = [name for name, _ in index.search_fuzzy(self.args.species, 5)]
+            raise ValueError(
+                f"Species '{self.args.species}' not found in the RepeatMasker database tree '{FULL_SPECIES_TREE_FILE}'."
+                + (f" Did you mean: {', '.join(suggestions)}?" if suggestions else "")
+                + " Search the tree with 'eirepeat species <name>', or set --skip_species_check to use it anyway"
+            )
+        self.args.species = species
+
     def process_run_config(self):
         with open(DEFAULT_CONFIG_FILE, "r") as fh:
             try:
@@ -62,6 +83,38 @@ class EIRepeatConfigure:
                 f"No information processed from run_config file - '{self.args.run_config}'"
             )
 
+    def scan_fasta(self):
+        """
+        Scan the input FASTA files once, to catch header problems here rather than on the cluster. The stats are
+        written to the run_config 'stats' block, for the pipeline to plan the run without reading the FASTA again
+        """
+        preflight_dir = Path(self.args.output) / "preflight"
+        preflight_dir.mkdir(parents=True, exist_ok=True)
+        self.run_config["stats"] = dict()
+        for key in ("fasta", "close_reference", "organellar_fasta"):
+            fasta = getattr(self.args, key)
+            if not fasta:
+                continue
+            fasta_stats = FastaStats(argparse.Namespace(fasta=fasta))
+            fasta_stats.process_fasta()
+            fai = str(preflight_dir / f"{key}.fai")
+            fasta_stats.write_fai(fai)
+            stats = fasta_stats.get_stats()
+            stats["file_size"] = Path(fasta).stat().st_size
+            stats["fai"] = fai
+            self.run_config["stats"][key] = stats
+            print(
+                f"{key}: {stats['sequence_count']} sequences, total length {stats['total_length']}, N50 {stats['n50']}"
+            )
+            if stats["duplicate_id_count"]:
+                raise ValueError(
+                    f"{stats['duplicate_id_count']} duplicate sequence IDs in '{fasta}', for example: {', '.join(stats['duplicate_ids'])}"
+                )
+            if key == "fasta" and stats["max_header_length"] > MAX_HEADER_LENGTH:
+                print(
+                    f"WARNING: Sequence IDs in '{fasta}' are up to {stats['max_header_length']} characters long, RepeatModeler fails on IDs longer than {MAX_HEADER_LENGTH} characters"
+                )
+
     def write_run_config(self):
         # output directory
         self.run_config["fasta"] = self.args.fasta
@@ -82,6 +135,7 @@ class EIRepeatConfigure:
 
     def run(self):
         self.process_run_config()
+        self.scan_fasta()
         self.run_config_file = os.path.join(self.args.output, "run_config.yaml")
         self.write_run_config()
         print(f"\nGreat! Created run_config file: '{self.run_config_file}'\n")
@@ -97,6 +151,11 @@ def main():
         default=None,
         help=f"Provide species name. Please use the file here to identify the species. Also, check the NCBI taxonomy to identify the correct species option - https://www.ncbi.nlm.nih.gov/taxonomy: {FULL_SPECIES_TREE_FILE} (default: %(default)s)",
     )
+    parser.add_argument(
+        "--skip_species_check",
+        action="store_true",
+        help="Do not check the species against the RepeatMasker database tree, e.g. for a newer RepeatMasker database (default: %(default)s)",
+    )
     parser.add_argument(
         "--run_red_repeats",
         action="store_true",
@@ -120,8 +179,10 @@ def main():
         default=os.path.join(cwd, "output"),
         help="Provide output directory (default: %(default)s)",
     )
+    profiling.add_argument(parser)
     args = parser.parse_args()
-    EIRepeatConfigure(args).run()
+    with profiling.profile(script, args):
+        EIRepeatConfigure(args).run()
 
 
 if __name__ == "__main__":
@@ -0,0 +1,254 @@
+#!/usr/bin/env python3
+# -*- coding: utf-8 -*-
+"""
+Script to compute genome statistics from a FASTA file
+"""
+
+# authorship
+__author__ = "Gemy George Kaithakottil"
+__maintainer__ = "Gemy George Kaithakottil"
+__email__ = "gemygk@gmail.com"
+
+# import libraries
+import argparse
+from argparse import RawTextHelpFormatter
+import gzip
+import json
+import mmap
+import os
+import sys
+
+from eirepeat.scripts import profiling
+
+# get script name
+script = os.path.basename(sys.argv[0])
+
+# read the FASTA in blocks of 16 MB
+BLOCK_SIZE = 16 * 1024 * 1024
+# duplicate IDs listed in the stats, the count covers all of them
+MAX_DUPLICATE_IDS = 10
+
+
+class FastaStats:
+    @staticmethod
+    def compute_n50(lengths, total_length):
+        half = total_length / 2
+        running = 0
+        for length in sorted(lengths, reverse=True):
+            running += length
+            if running >= half:
+                return length
+        return 0
+
+    @staticmethod
+    def get_blocks(fasta):
+        """
+        :return: Generator of the FASTA (plain, mmapped, or gzip compressed) content in blocks of BLOCK_SIZE bytes
+        """
+        with open(fasta, "rb") as fh:
+            if fh.read(2) == b"\x1f\x8b":
+                fh.seek(0)
+                with gzip.GzipFile(fileobj=fh) as gz:
+                    for block in iter(lambda: gz.read(BLOCK_SIZE), b""):
+                        yield block
+                return
+            if os.fstat(fh.fileno()).st_size == 0:
+                return
+            with mmap.mmap(fh.fileno(), 0, access=mmap.ACCESS_READ) as mm:
+                for start in range(0, len(mm), BLOCK_SIZE):
+                    yield mm[start : start + BLOCK_SIZE]
+
+    @staticmethod
+    def get_name(header):
+        words = header.split(maxsplit=1)
+        return words[0].decode() if words else ""
+
+    def __init__(self, args):
+        self.args = args
+        # .fai records of name, length, offset, line bases and line width
+        self.records = list()
+        self.lengths = list()
+        self.max_header_length = 0
+        self.duplicate_ids = list()
+        self.duplicate_id_count = 0
+
+    def process_fasta(self):
+        """
+        Scan the FASTA block by block, finding the headers and counting the sequence bytes without splitting it into lines
+        """
+        offset = 0
+        header = None
+        record = None
+        # bases and bytes of the first sequence line of the record, until its newline is found
+        first_line = None
+        at_line_start = True
+        for block in FastaStats.get_blocks(self.args.fasta):
+            pos = 0
+            size = len(block)
+            while pos < size:
+                if header is not None:
+                    end = block.find(b"\n", pos)
+                    header += block[pos : size if end == -1 else end]
+                    if end == -1:
+                        break
+                    pos = end + 1
+                    record = [FastaStats.get_name(header), 0, offset + pos, 0, 0]
+                    self.records.append(record)
+                    first_line = [0, 0]
+                    header = None
+                    at_line_start = True
+                    continue
+                if at_line_start and block[pos] == 62:  # '>'
+                    header = bytearray()
+                    pos += 1
+                    continue
+                end = block.find(b"\n>", pos)
+                end = size if end == -1 else end + 1
+                if record is not None:
+                    chunk = block[pos:end]
+                    newlines = chunk.count(b"\n")
+                    bases = len(chunk) - newlines - chunk.count(b"\r")
+                    record[1] += bases
+                    if first_line is not None:
+                        line_end = chunk.find(b"\n")
+                        line = chunk if line_end == -1 else chunk[: line_end + 1]
+                        first_line[1] += len(line)
+                        first_line[0] += len(line.rstrip(b"\r\n"))
+                        if line_end != -1:
+                            record[3], record[4] = first_line
+                            first_line = None
+                at_line_start = block[end - 1] == 10  # '\n'
+                pos = end
+            offset += size
+        if header is not None:
+            # header without a final newline
+            self.records.append([FastaStats.get_name(header), 0, offset, 0, 0])
+        elif record is not None and first_line is not None:
+            # sequence without a final newline
+            record[3], record[4] = first_line
+        self.lengths = [record[1] for record in self.records]
+        seen = set()
+        for name, *_ in self.records:
+            self.max_header_length = max(self.max_header_length, len(name))
+            if name in seen:
+                self.duplicate_id_count += 1
+                if len(self.duplicate_ids) < MAX_DUPLICATE_IDS:
+                    self.duplicate_ids.append(name)
+            seen.add(name)
+
+    def get_stats(self):
+        total_length = sum(self.lengths)
+        return {
+            "fasta": str(self.args.fasta),
+            "total_length": total_length,
+            "sequence_count": len(self.lengths),
+            "n50": FastaStats.compute_n50(self.lengths, total_length),
+            "max_length": max(self.lengths) if self.lengths else 0,
+            "max_header_length": self.max_header_length,
+            "duplicate_ids": self.duplicate_ids,
+            "duplicate_id_count": self.duplicate_id_count,
+        }
+
+    def write_fai(self, fai):
+        """
+        Write a samtools faidx style index. The offsets are in the uncompressed FASTA for a gzip compressed one
+        """
+        with open(fai, "w") as fh:
+            for record in self.records:
+                print(*record, sep="\t", file=fh)
+
+    def write_bed(self, bed):
+        """
+        Write the sequence lengths as BED3
+        """
+        with open(bed, "w") as fh:
+            for name, length, *_ in self.records:
+                print(name, 0, length, sep="\t", file=fh)
+
+    def run(self):
+        with profiling.phase("process_fasta"):
+            self.process_fasta()
+        stats = self.get_stats()
+        with profiling.phase("write_index"):
+            if getattr(self.args, "fai", None):
+                self.write_fai(self.args.fai)
+            if getattr(self.args, "bed", None):
+                self.write_bed(self.args.bed)
+        if self.args.output:
+            with open(self.args.output, "w") as fh:
+                json.dump(stats, fh, indent=4)
+                fh.write("\n")
+        else:
+            print(json.dumps(stats, indent=4))
+
+
+def main():
+    parser = argparse.ArgumentParser(
+        description="Script to compute genome statistics from a FASTA file",
+        formatter_class=RawTextHelpFormatter,
+        epilog="Example command:\n\t"
+        + script
+        + " genome.fa --output genome.fa.stats.json --fai genome.fa.fai --bed genome.fa.bed\n\nContact:"
+        + __author__
+        + "("
+        + __email__
+        + ")",
+    )
+    parser.add_argument("fasta", help="Provide FASTA file, optionally gzip compressed")
+    parser.add_argument(
+        "--output",
+        help="Provide output JSON filename. Statistics are printed to stdout if not set (default: %(default)s)",
+    )
+    parser.add_argument(
+        "--fai",
+        help="Provide output .fai index filename, in the samtools faidx format (default: %(default)s)",
+    )
+    parser.add_argument(
+        "--bed",
+        help="Provide output BED3 filename of the sequence lengths (default: %(default)s)",
+    )
+    profiling.add_argument(parser)
+    args = parser.parse_args()
+
+    with profiling.profile(script, args):
+        FastaStats(args).run()
+
+
+if __name__ == "__main__":
+    try:
+        main()
+    except BrokenPipeError:
+        # Python flushes standard streams on exit; redirect remaining output
+        # to devnull to avoid another BrokenPipeError at shutdown
+        devnull = os.open(os.devnull, os.O_WRONLY)
+        os.dup2(devnull, sys.stdout.fileno())
+        sys.exit(1)  # Python exits with error code 1 on EPIPE
+
+"""
+# input, without a newline after the last line
+==> genome.fa <==
+>scaffold1
+ACGTACGTAC
+>scaffold2
+ACGTA
+
+# output
+{
+    "fasta": "genome.fa",
+    "total_length": 15,
+    "sequence_count": 2,
+    "n50": 10,
+    "max_length": 10,
+    "max_header_length": 9,
+    "duplicate_ids": [],
+    "duplicate_id_count": 0
+}
+
+# --fai genome.fa.fai
+scaffold1	10	11	10	11
+scaffold2	5	33	5	5
+
+# --bed genome.fa.bed
+scaffold1	0	10
+scaffold2	0	5
+"""
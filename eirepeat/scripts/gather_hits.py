@@ -0,0 +1,130 @@
+#!/usr/bin/env python3
+# -*- coding: utf-8 -*-
+"""
+Script to gather transposonPSI or BLAST hits from chunk outputs into a merged, sorted BED
+"""
+
+# authorship
+__author__ = "Gemy George Kaithakottil"
+__maintainer__ = "Gemy George Kaithakottil"
+__email__ = "gemygk@gmail.com"
+
+# import libraries
+import argparse
+from argparse import RawTextHelpFormatter
+import bisect
+from collections import defaultdict
+import os
+import sys
+import logging
+
+from eirepeat.scripts import profiling
+
+# get script name
+script = os.path.basename(sys.argv[0])
+
+logging.basicConfig(
+    format="%(asctime)s - %(process)d - %(name)s - %(levelname)s - %(message)s",
+    datefmt="%d-%b-%y %H:%M:%S",
+    level=logging.DEBUG,
+)
+
+# 0-based columns of the sequence id and the two 1-based hit coordinates
+FORMATS = {
+    # transposonPSI *.TPSI.allHits, the hit on the query sequence
+    "transposonpsi": (5, 8, 9),
+    # BLAST tabular '-outfmt 6 qseqid sseqid pident qstart qend ...', the hit on the query sequence
+    "blast": (0, 3, 4),
+}
+
+
+class GatherHits:
+    def __init__(self, args):
+        self.args = args
+        self.seq_column, self.first_column, self.second_column = FORMATS[
+            self.args.format
+        ]
+        self.hit_count = 0
+        self.interval_count = 0
+        # the merged intervals of each sequence, as sorted lists of their starts and of their ends, so only the
+        # merged intervals are held in memory, not the hits
+        self.intervals = defaultdict(lambda: (list(), list()))
+
+    def add_hit(self, seqid, start, end):
+        """
+        Merge a hit into the intervals of its sequence, with the intervals it overlaps or is book-ended with
+        """
+        starts, ends = self.intervals[seqid]
+        # the first interval ending at or after the hit start, the intervals do not overlap so the ends are sorted too
+        first = bisect.bisect_left(starts, start)
+        if first and ends[first - 1] >= start:
+            first -= 1
+        # past the last interval starting at or before the hit end
+        last = bisect.bisect_right(starts, end)
+        if first < last:
+            start = min(start, starts[first])
+            end = max(end, ends[last - 1])
+        starts[first:last] = [start]
+        ends[first:last] = [end]
+
+    def write_intervals(self, fh):
+        for seqid in sorted(self.intervals):
+            starts, ends = self.intervals[seqid]
+            for start, end in zip(starts, ends):
+                fh.write(f"{seqid}\t{start}\t{end}\n")
+            self.interval_count += len(starts)
+
+    def process_hits(self, hits_file):
+        with open(hits_file, "r") as hits_fh:
+            for line in hits_fh:
+                if not line.strip() or line.startswith("#"):
+                    continue
+                x = line.rstrip("\n").split("\t")
+                first, second = int(x[self.first_column]), int(x[self.second_column])
+                # hits on the reverse strand have their coordinates swapped
+                start, end = min(first, second), max(first, second)
+                self.add_hit(x[self.seq_column], start - 1, end)
+                self.hit_count += 1
+
+    def run(self):
+        with profiling.phase("process_hits"):
+            for hits_file in self.args.hits:
+                self.process_hits(hits_file)
+        with profiling.phase("write_intervals"), open(self.args.output, "w") as fh:
+            self.write_intervals(fh)
+        logging.info(
+            f"Gathered {self.hit_count} hits from {len(self.args.hits)} files into {self.interval_count} intervals"
+        )
+
+
+def main():
+    parser = argparse.ArgumentParser(
+        description="Script to gather transposonPSI or BLAST hits from chunk outputs into a merged, sorted BED",
+        formatter_class=RawTextHelpFormatter,
+        epilog="Example command:\n\t"
+        + script
+        + " --format transposonpsi output_chunks/chunk-*/chunk-*.txt.TPSI.allHits --output close_reference.cds.fa.TPSI.allHits.bed\n\t"
+        + script
+        + " --format blast genome.fa.unknown.fasta-vs-organellar.blastn.tblr --output genome.fa.unknown.fasta-vs-organellar.blastn.tblr.bed\n\nContact:"
+        + __author__
+        + "("
+        + __email__
+        + ")",
+    )
+    parser.add_argument("hits", nargs="+", help="Provide hit files")
+    parser.add_argument(
+        "--format",
+        choices=sorted(FORMATS),
+        required=True,
+        help="Provide format of the hit files",
+    )
+    parser.add_argument("--output", required=True, help="Provide output BED")
+    profiling.add_argument(parser)
+    args = parser.parse_args()
+
+    with profiling.profile(script, args):
+        GatherHits(args).run()
+
+
+if __name__ == "__main__":
+    main()
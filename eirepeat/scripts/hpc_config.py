@@ -1,26 +1,115 @@
 import json
+import math
+import os
 
 
 class HpcConfig:
-    def __init__(self, cfg):
+    def __init__(self, cfg, default_stats=None):
+        """
+        :param default_stats: Genome stats to scale with until the genome stats file exists, like the stats written by
+        'eirepeat configure' into the run_config
+        """
         self.__records = json.load(open(cfg))
         self.default_cfg = self.__records["__default__"]
+        # maximum cores/memory per partition, used to cap the scaled resources
+        self.partitions = self.__records.get("__partitions__", dict())
+        self.__genome_stats = dict()
+        self.default_stats = default_stats
 
     def __get_resource(self, rulename, resource):
-        return self.__records.get(rulename, dict()).get(
-            resource, self.default_cfg[resource]
-        )
+        rule_cfg = self.__records.get(rulename, dict())
+        if resource in rule_cfg:
+            return rule_cfg[resource]
+        if resource not in self.default_cfg:
+            raise KeyError(
+                f"No '{resource}' for the rule '{rulename}' in the HPC config, add it to the rule or to '__default__'"
+            )
+        return self.default_cfg[resource]
 
-    def get_cores(self, rulename):
-        return int(self.__get_resource(rulename, "cores"))
+    def __load_genome_stats(self, genome_stats):
+        # genome stats are written once by the genome_index rule, so cache them per file
+        if genome_stats not in self.__genome_stats:
+            with open(genome_stats, "r") as fh:
+                self.__genome_stats[genome_stats] = json.load(fh)
+        return self.__genome_stats[genome_stats]
 
-    def get_memory(self, rulename):
-        return int(self.__get_resource(rulename, "memory"))
+    def __scale(self, value, genome_stats):
+        """
+        Evaluate a resource against the genome statistics
+        :param value: Either a fixed number or a scaling expression like
+        {"base": 10240, "per_gb": 8192, "per_1k_sequences": 10}
+        :param genome_stats: JSON file written by fasta_stats, or None to use the base value only
+        :return: The scaled resource value
+        """
+        if not isinstance(value, dict):
+            return value
+        scaled = value.get("base", 0)
+        # the stats do not exist yet while Snakemake builds the DAG (or during a dry run),
+        # resources are evaluated again once the job is ready to run
+        stats = None
+        if genome_stats and os.path.exists(genome_stats):
+            stats = self.__load_genome_stats(genome_stats)
+        elif genome_stats:
+            stats = self.default_stats
+        if stats:
+            scaled += value.get("per_gb", 0) * stats["total_length"] / 1e9
+            scaled += value.get("per_1k_sequences", 0) * stats["sequence_count"] / 1e3
+        return scaled
 
-    def get_time(self, rulename):
-        return self.__get_resource(rulename, "time")
+    def __cap(self, rulename, resource, value):
+        partition = self.__get_resource(rulename, "partition")
+        limit = self.partitions.get(partition, dict()).get(resource)
+        return min(value, limit) if limit else value
+
+    def __escalate(self, rulename, resource, value, attempt):
+        """
+        Escalate a resource for a retried attempt
+        :param value: The resource value of the first attempt
+        :param attempt: Snakemake attempt number, starting from 1
+        :return: value * multiplier ^ (attempt - 1), capped by the retry policy maximum
+        """
+        policy = self.get_retry_policy(rulename)
+        value *= policy.get("multiplier", 1) ** (max(attempt, 1) - 1)
+        maximum = policy.get(f"max_{resource}")
+        return min(value, maximum) if maximum else value
+
+    def get_retry_policy(self, rulename):
+        try:
+            return self.__get_resource(rulename, "retry")
+        except KeyError:
+            return dict()
+
+    def get_retries(self, rulename):
+        return int(self.get_retry_policy(rulename).get("attempts", 0))
+
+    def get_cores(self, rulename, genome_stats=None):
+        cores = self.__scale(self.__get_resource(rulename, "cores"), genome_stats)
+        return self.__cap(rulename, "cores", int(math.ceil(cores)))
+
+    def get_memory(self, rulename, genome_stats=None, attempt=1):
+        memory = self.__scale(self.__get_resource(rulename, "memory"), genome_stats)
+        memory = self.__escalate(rulename, "memory", memory, attempt)
+        return self.__cap(rulename, "memory", int(math.ceil(memory)))
+
+    def get_time(self, rulename, genome_stats=None, attempt=1):
+        """
+        :return: Walltime in minutes, or None for a rule without a 'time' (nor a '__default__' one), which is submitted
+        without a walltime
+        """
+        try:
+            time = self.__get_resource(rulename, "time")
+        except KeyError:
+            return None
+        time = self.__scale(time, genome_stats)
+        time = self.__escalate(rulename, "time", time, attempt)
+        return self.__cap(rulename, "time", int(math.ceil(time)))
+
+    def get_cost(self, rulename):
+        """
+        :return: Estimated runtime of the rule in hours, used to find the critical path
+        """
+        return float(self.__get_resource(rulename, "cost"))
 
     def get_exclude_list(self, rulename):
         exclude = self.__get_resource(rulename, "exclude")
         return "-x {}".format(exclude) if exclude else ""
-
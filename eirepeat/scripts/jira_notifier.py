@@ -0,0 +1,151 @@
+#!/usr/bin/env python3
+# -*- coding: utf-8 -*-
+"""
+Script to post JIRA comments and attachments in the background through an outbox, to replay them later if undelivered
+"""
+
+# authorship
+__author__ = "Gemy George Kaithakottil"
+__maintainer__ = "Gemy George Kaithakottil"
+__email__ = "gemygk@gmail.com"
+
+# import libraries
+import json
+import os
+import queue
+import shutil
+import threading
+import time
+
+from eirepeat.scripts.jiracomms import post_to_jira, post_attachment_to_jira
+
+
+class JiraNotifier:
+    def __init__(self, jira_id, jira_config, outbox):
+        """
+        Post JIRA comments and attachments from a background thread. Every message is written to the
+        outbox directory first, and only removed from there once JIRA accepted it, so that undelivered
+        messages survive the pipeline and can be replayed with `eirepeat notify --flush`
+        :param jira_config: Run configuration, with the 'jira' section
+        :param outbox: Outbox directory
+        """
+        self.jira_id = jira_id
+        self.jira_config = jira_config
+        self.outbox = outbox
+        self.queue = queue.Queue()
+        self.thread = None
+        # once JIRA is unreachable, the remaining messages are left in the outbox rather than retried one by one
+        self.failed = False
+
+    def write_entry(self, message, attachment=None, jira_filename=None, suffix=None):
+        os.makedirs(self.outbox, exist_ok=True)
+        # nanoseconds keep the entries in submission order
+        name = f"{time.time_ns()}-{os.getpid()}"
+        # messages given as a file are posted with its content, as the file may change before a replay
+        if os.path.isfile(message):
+            with open(message, "r") as fh:
+                message = fh.read()
+        if attachment:
+            jira_filename = jira_filename or os.path.basename(attachment)
+            copy = os.path.join(self.outbox, f"{name}.{os.path.basename(attachment)}")
+            shutil.copyfile(attachment, copy)
+            attachment = copy
+        entry = os.path.join(self.outbox, f"{name}.json")
+        with open(f"{entry}.tmp", "w") as fh:
+            json.dump(
+                {
+                    "jira_id": self.jira_id,
+                    "message": message,
+                    "attachment": attachment,
+                    "jira_filename": jira_filename,
+                    "suffix": suffix,
+                },
+                fh,
+                indent=4,
+            )
+        os.rename(f"{entry}.tmp", entry)
+        return entry
+
+    def get_pending(self):
+        if not os.path.isdir(self.outbox):
+            return list()
+        return [
+            os.path.join(self.outbox, name)
+            for name in sorted(os.listdir(self.outbox))
+            if name.endswith(".json")
+        ]
+
+    def deliver(self, entry):
+        """
+        :return: True if JIRA accepted the message, which is then removed from the outbox
+        """
+        with open(entry, "r") as fh:
+            message = json.load(fh)
+        try:
+            if message["attachment"]:
+                delivered = post_attachment_to_jira(
+                    message["jira_id"],
+                    message["message"],
+                    message["attachment"],
+                    name=message["jira_filename"],
+                    suffix=message["suffix"],
+                    jira_config=self.jira_config,
+                )
+            else:
+                delivered = post_to_jira(
+                    message["jira_id"], message["message"], jira_config=self.jira_config
+                )
+        except (OSError, ValueError) as err:
+            print(f"Failed to POST to JIRA ticket: {message['jira_id']}; {err}")
+            delivered = False
+        if delivered:
+            if message["attachment"] and os.path.exists(message["attachment"]):
+                os.remove(message["attachment"])
+            os.remove(entry)
+        return delivered
+
+    def __run(self):
+        while True:
+            entry = self.queue.get()
+            if entry is None:
+                return
+            if not self.failed and not self.deliver(entry):
+                self.failed = True
+                print(
+                    f"JIRA notification failed, messages are kept in '{self.outbox}'. Run 'eirepeat notify --flush' to send them later"
+                )
+
+    def submit(self, message, attachment=None, jira_filename=None, suffix=None):
+        entry = self.write_entry(message, attachment, jira_filename, suffix)
+        if self.thread is None:
+            self.thread = threading.Thread(target=self.__run, daemon=True)
+            self.thread.start()
+        self.queue.put(entry)
+
+    def close(self, timeout=None):
+        """
+        Wait up to timeout seconds for the queued messages to be sent
+        :return: Number of messages left in the outbox
+        """
+        if self.thread is not None:
+            self.queue.put(None)
+            self.thread.join(timeout)
+        pending = len(self.get_pending())
+        if pending:
+            print(
+                f"{pending} JIRA messages left in '{self.outbox}'. Run 'eirepeat notify --flush' to send them"
+            )
+        return pending
+
+    def flush(self):
+        """
+        Replay the outbox in order, stopping at the first message JIRA does not accept
+        :return: Number of messages delivered and left in the outbox
+        """
+        pending = self.get_pending()
+        delivered = 0
+        for entry in pending:
+            if not self.deliver(entry):
+                break
+            delivered += 1
+        return delivered, len(pending) - delivered
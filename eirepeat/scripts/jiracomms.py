@@ -7,17 +7,41 @@ Script to post to jira
 # import libraries
 import os
 import requests
+from requests.adapters import HTTPAdapter
 from requests.auth import HTTPBasicAuth
+from urllib3.util.retry import Retry
 import json
 
 # Header for HTTP request, make sure it knows a JSON object is coming
 head = {"Content-type": "application/json"}
 
 
+class JiraRetry(Retry):
+    """
+    Retry the idempotent requests on server errors, and POST requests only when JIRA turned them away. A POST that
+    failed or timed out while waiting for the response may have been accepted already, and would be posted twice
+    """
+
+    POST_STATUS_FORCELIST = frozenset([429, 503])
+
+    def is_retry(self, method, status_code, has_retry_after=False):
+        # connect errors are retried for every method, POST is not in the default allowed methods for read errors
+        if method and method.upper() == "POST":
+            return status_code in JiraRetry.POST_STATUS_FORCELIST
+        return super().is_retry(method, status_code, has_retry_after)
+
+
 class JiraInfo:
     # Base address for JIRA
     SITE = None
     CREDENTIALS = None
+    # seconds to connect and to wait for a response, per attempt
+    TIMEOUT = 60
+    # attempts after the first, waiting BACKOFF * 2^(attempt - 1) seconds in between
+    RETRIES = 5
+    BACKOFF = 2
+    # one pooled session per process, so that attaching and commenting reuse the connection
+    SESSION = None
 
     def __init__(self, jira):
         self.jira = jira
@@ -35,9 +59,42 @@ class JiraInfo:
                 jira_username if jira_username else pap_config["jira"]["username"],
                 jira_password,
             )
+            JiraInfo.TIMEOUT = pap_config["jira"].get("timeout", JiraInfo.TIMEOUT)
+            JiraInfo.RETRIES = pap_config["jira"].get("retries", JiraInfo.RETRIES)
+            JiraInfo.BACKOFF = pap_config["jira"].get("backoff", JiraInfo.BACKOFF)
         else:
             JiraInfo.SITE = JiraInfo.CREDENTIALS = None
 
+    @staticmethod
+    def get_session():
+        if JiraInfo.SESSION is None:
+            retry = JiraRetry(
+                total=JiraInfo.RETRIES,
+                backoff_factor=JiraInfo.BACKOFF,
+                # JIRA rate limiting and server side errors
+                status_forcelist=[429, 500, 502, 503, 504],
+                respect_retry_after_header=True,
+                raise_on_status=False,
+            )
+            adapter = HTTPAdapter(max_retries=retry, pool_connections=1, pool_maxsize=4)
+            JiraInfo.SESSION = requests.Session()
+            JiraInfo.SESSION.mount("https://", adapter)
+            JiraInfo.SESSION.mount("http://", adapter)
+        return JiraInfo.SESSION
+
+    @staticmethod
+    def post(url, **kwargs):
+        """
+        :return: Response of the POST request, or None if the server could not be reached after all retries
+        """
+        try:
+            return JiraInfo.get_session().post(
+                url, auth=JiraInfo.CREDENTIALS, timeout=JiraInfo.TIMEOUT, **kwargs
+            )
+        except requests.RequestException as err:
+            print(f"Failed to reach JIRA at '{url}': {err}")
+            return None
+
     def post_comment(self, comment):
         """
         This method posts a payload to this jira ticket as a comment
@@ -80,9 +137,9 @@ class JiraInfo:
         url = JiraInfo.SITE + "/rest/api/3/issue/" + str(self.jira) + "/comment"
 
         # Post the payload to jira
-        response = requests.request(
-            "POST", url, data=payload, headers=headers, auth=JiraInfo.CREDENTIALS
-        )
+        response = JiraInfo.post(url, data=payload, headers=headers)
+        if response is None:
+            return False
 
         # Capture JIRA Cloud API response
         print_jira_api_response(response)
@@ -128,13 +185,14 @@ class JiraInfo:
         else:
             raise ValueError("File has an unsupported extension: " + file_to_attach)
 
-        files = {
-            "file": (
-                name if name and name != "" else os.path.basename(file_to_attach),
-                open(file_to_attach, "rb"),
-                filetype,
-            )
-        }
+        with open(file_to_attach, "rb") as fh:
+            files = {
+                "file": (
+                    name if name and name != "" else os.path.basename(file_to_attach),
+                    fh.read(),
+                    filetype,
+                )
+            }
 
         header = {"Accept": "application/json", "X-Atlassian-Token": "nocheck"}
 
@@ -142,9 +200,9 @@ class JiraInfo:
         url = JiraInfo.SITE + "/rest/api/3/issue/" + str(self.jira) + "/attachments"
 
         # Post the payload to jira
-        response = requests.request(
-            "POST", url, headers=header, auth=JiraInfo.CREDENTIALS, files=files
-        )
+        response = JiraInfo.post(url, headers=header, files=files)
+        if response is None:
+            return False
 
         # Capture JIRA Cloud API response
         print_jira_api_response(response)
@@ -197,13 +255,9 @@ class JiraInfo:
             )
 
             # Post the payload to jira
-            response = requests.request(
-                "POST",
-                url,
-                data=payload,
-                headers=comment_headers,
-                auth=JiraInfo.CREDENTIALS,
-            )
+            response = JiraInfo.post(url, data=payload, headers=comment_headers)
+            if response is None:
+                return False
 
             # Capture JIRA Cloud API response
             print_jira_api_response(response)
@@ -249,8 +303,15 @@ def print_jira_api_response(response):
     Returns the JIRA Clould API response directory associated withy the given JIRA ticket
     :param response: Requests return response
     """
-    print(
-        json.dumps(
-            json.loads(response.text), sort_keys=True, indent=4, separators=(",", ": ")
+    try:
+        print(
+            json.dumps(
+                json.loads(response.text),
+                sort_keys=True,
+                indent=4,
+                separators=(",", ": "),
+            )
         )
-    )
+    except ValueError:
+        # not JSON, e.g. the error page of a proxy
+        print(f"{response.status_code} {response.reason}\n{response.text}")
@@ -14,15 +14,17 @@ import argparse
 from argparse import RawTextHelpFormatter
 import os
 import sys
-from collections import defaultdict
 import secrets
 import string
 import logging
 
+from eirepeat import repeats
+from eirepeat.scripts import profiling
+
 # get script name
 script = os.path.basename(sys.argv[0])
 
-# create a random delimiter string of length 10
+# create a random string of length 10 for the merged id information file name
 alphabet = string.ascii_letters + string.digits
 delimiter = "".join(secrets.choice(alphabet) for i in range(10))
 
@@ -37,126 +39,46 @@ logging.basicConfig(
 
 
 class MergeRepeats:
-    @staticmethod
-    def merge_intervals(intervals):
-        intervals.sort(key=lambda interval: interval[0])
-        merged = [intervals[0]]
-        skip = True
-        for current in intervals:
-            previous = merged[-1]
-            attrib = current[3]
-            if current[0] <= previous[1]:
-                previous[1] = max(previous[1], current[1])
-                if not skip:
-                    previous[3] = f"{previous[3]}{delimiter}{attrib}"
-                skip = False
-            else:
-                merged.append(current)
-        return merged
-
     def __init__(self, args):
         self.args = args
-        self.gff_info = defaultdict(list)
-        self.gff_merged_info = defaultdict(list)
-        self.gff_seen = defaultdict(int)
+        self.gff_info = dict()
+        self.gff_merged_info = list()
         self.merge_id_file = os.path.join(cwd, f"{self.args.source}.{delimiter}.info.txt")
 
     def process_gff(self):
         with open(self.args.gff_file, "r") as fh:
-            for line in fh:
-                line = line.strip()
-                if line.startswith("#"):
-                    continue
-                x = line.split("\t")
-                if len(x) < 9:
-                    continue
-                gxf_type = x[2]
-                if self.args.gff_type and gxf_type != self.args.gff_type:
-                    continue
-                # extract scaffold name, start, end, strand and ID
-                uid, start, end, strand, attrib = x[0], int(x[3]), int(x[4]), x[6], x[8]
-                if start > end:
-                    (start, end) = (end, start)
-                uid_seen = f"{uid}{delimiter}{start}{delimiter}{end}"
-                if self.args.use_strand:
-                    uid = f"{uid}{delimiter}{strand}"
-                    uid_seen = f"{uid_seen}{delimiter}{strand}"
-                # create a non-redundant list of intervals if requested
-                if self.args.ignore_duplicate:
-                    if uid_seen not in self.gff_seen:
-                        self.gff_seen[uid_seen] = 1
-                        self.gff_info[uid].append([start, end, strand, attrib])
-                    else:
-                        logging.warning(f"Ignore duplicate region '{line}'")
-                else:
-                    self.gff_info[uid].append([start, end, strand, attrib])
+            self.gff_info = repeats.group_intervals(
+                repeats.read_gff(fh, self.args.gff_type),
+                self.args.use_strand,
+                self.args.ignore_duplicate,
+            )
 
     def normalise_coverage(self):
-        for uid in self.gff_info:
-            self.gff_merged_info[uid] = self.merge_intervals(self.gff_info[uid])
+        self.gff_merged_info = repeats.merge_repeats(self.gff_info)
 
     # print gff
     # - also, create new ID and store new id and old ids into a text file for reference
     def print_gff(self):
         with open(self.merge_id_file, "w") as fh:
-            # add header
-            fh.write("\t".join(["#new_id", "#merged_count", "#merged_ids"]) + "\n")
-            print("##gff-version 3")
-            counter = 1
-            for uid in self.gff_merged_info:
-                for start, end, strand, attrib in self.gff_merged_info[uid]:
-                    new_id = f"{self.args.prefix}_{counter}"
-                    merged_repeat_count = len(attrib.split(delimiter))
-                    fh.write(
-                        "\t".join(
-                            [
-                                new_id,
-                                str(merged_repeat_count),
-                                attrib.replace(delimiter, "||"),
-                            ]
-                        )
-                        + "\n"
-                    )
-                    print(
-                        "\t".join(
-                            [
-                                uid.split(delimiter)[0],
-                                self.args.source,
-                                "match",
-                                str(start),
-                                str(end),
-                                ".",
-                                strand,
-                                ".",
-                                f"ID={new_id};Name={new_id}",
-                            ]
-                        )
-                    )
-                    print(
-                        "\t".join(
-                            [
-                                uid.split(delimiter)[0],
-                                self.args.source,
-                                "match_part",
-                                str(start),
-                                str(end),
-                                ".",
-                                strand,
-                                ".",
-                                f"ID={new_id}-exon1;Parent={new_id}",
-                            ]
-                        )
-                    )
-                    counter += 1
-                    print("###")
+            repeats.write_merged_ids(self.gff_merged_info, fh, self.args.prefix)
+        print("##gff-version 3")
+        repeats.write_features(
+            repeats.merged_to_gff3(
+                self.gff_merged_info, self.args.source, self.args.prefix
+            ),
+            sys.stdout,
+        )
 
     def run(self):
         logging.info(f"Processing input file '{self.args.gff_file}'")
-        self.process_gff()
+        with profiling.phase("process_gff"):
+            self.process_gff()
         logging.info(f"Computing overlap ... ")
-        self.normalise_coverage()
+        with profiling.phase("normalise_coverage"):
+            self.normalise_coverage()
         logging.info(f"Generating output ... ")
-        self.print_gff()
+        with profiling.phase("print_gff"):
+            self.print_gff()
         logging.info(f"Merged id information file : '{self.merge_id_file}'")
 
 
@@ -207,9 +129,11 @@ def main():
         action="store_true",
         help="Ignore duplicate regions before merging. column (default: %(default)s)",
     )
+    profiling.add_argument(parser)
     args = parser.parse_args()
 
-    MergeRepeats(args).run()
+    with profiling.profile(script, args):
+        MergeRepeats(args).run()
 
 
 if __name__ == "__main__":
@@ -0,0 +1,136 @@
+#!/usr/bin/env python3
+# -*- coding: utf-8 -*-
+"""
+Script to export the progress of a run as a Prometheus textfile
+"""
+
+# authorship
+__author__ = "Gemy George Kaithakottil"
+__maintainer__ = "Gemy George Kaithakottil"
+__email__ = "gemygk@gmail.com"
+
+# import libraries
+import os
+import threading
+import time
+
+
+class MetricsExporter:
+    @staticmethod
+    def escape(value):
+        return str(value).replace("\\", "\\\\").replace('"', '\\"').replace("\n", "\\n")
+
+    @staticmethod
+    def get_size(path):
+        """
+        :return: Bytes on disk under the directory, hardlinked files are counted once
+        """
+        size = 0
+        seen = set()
+        for root, dirs, files in os.walk(path):
+            for name in files:
+                try:
+                    stat = os.lstat(os.path.join(root, name))
+                except OSError:
+                    # removed while walking
+                    continue
+                if (stat.st_dev, stat.st_ino) in seen:
+                    continue
+                seen.add((stat.st_dev, stat.st_ino))
+                size += stat.st_size
+        return size
+
+    def __init__(self, monitor, metrics_file, project, output, interval=60):
+        """
+        Write the ProgressMonitor state as a Prometheus textfile, for the node-exporter textfile collector
+        :param monitor: ProgressMonitor of the run
+        :param metrics_file: Output file, ending in .prom
+        :param project: Value of the 'project' label
+        :param output: Output directory of the run, its size is reported
+        :param interval: Seconds between writes
+        """
+        self.monitor = monitor
+        self.metrics_file = metrics_file
+        self.project = MetricsExporter.escape(project)
+        self.output = output
+        self.interval = interval
+        self.__stop = threading.Event()
+        self.__thread = threading.Thread(target=self.__run, daemon=True)
+
+    def get_metrics(self, running=True):
+        labels = f'project="{self.project}"'
+        lines = [
+            "# HELP eirepeat_jobs Jobs of the run per rule and state.",
+            "# TYPE eirepeat_jobs gauge",
+        ]
+        with self.monitor.lock:
+            rules = self.monitor.get_rules()
+            counts = {r: self.monitor.get_rule_counts(r) for r in rules}
+            durations = dict(self.monitor.durations)
+            elapsed = time.time() - self.monitor.start_time
+            eta = self.monitor.get_eta()
+        for rulename in rules:
+            done, running_jobs, pending, failed = counts[rulename]
+            rule_labels = f'{labels},rule="{MetricsExporter.escape(rulename)}"'
+            # jobs Snakemake has submitted are 'running', including those still waiting in the cluster queue
+            for state, count in [
+                ("queued", pending),
+                ("running", running_jobs),
+                ("completed", done),
+                ("failed", failed),
+            ]:
+                lines.append(f'eirepeat_jobs{{{rule_labels},state="{state}"}} {count}')
+        lines.extend(
+            [
+                "# HELP eirepeat_job_duration_seconds Wall clock seconds of the completed jobs per rule.",
+                "# TYPE eirepeat_job_duration_seconds summary",
+            ]
+        )
+        for rulename in rules:
+            rule_labels = f'{labels},rule="{MetricsExporter.escape(rulename)}"'
+            lines.append(
+                f"eirepeat_job_duration_seconds_sum{{{rule_labels}}} {durations.get(rulename, 0):.1f}"
+            )
+            lines.append(
+                f"eirepeat_job_duration_seconds_count{{{rule_labels}}} {counts[rulename][0]}"
+            )
+        lines.extend(
+            [
+                "# HELP eirepeat_output_bytes Bytes written to the output directory.",
+                "# TYPE eirepeat_output_bytes gauge",
+                f"eirepeat_output_bytes{{{labels}}} {MetricsExporter.get_size(self.output)}",
+                "# HELP eirepeat_run_elapsed_seconds Seconds since the run started.",
+                "# TYPE eirepeat_run_elapsed_seconds gauge",
+                f"eirepeat_run_elapsed_seconds{{{labels}}} {elapsed:.0f}",
+                "# HELP eirepeat_run_eta_seconds Estimated seconds to completion, NaN before the first job is done.",
+                "# TYPE eirepeat_run_eta_seconds gauge",
+                f"eirepeat_run_eta_seconds{{{labels}}} {'NaN' if eta is None else f'{eta:.0f}'}",
+                "# HELP eirepeat_run_running Whether the run is still going.",
+                "# TYPE eirepeat_run_running gauge",
+                f"eirepeat_run_running{{{labels}}} {int(running)}",
+            ]
+        )
+        return "\n".join(lines) + "\n"
+
+    def write(self, running=True):
+        # the collector must never read a half written file
+        tmp_file = f"{self.metrics_file}.{os.getpid()}.tmp"
+        with open(tmp_file, "w") as fh:
+            fh.write(self.get_metrics(running))
+        os.replace(tmp_file, self.metrics_file)
+
+    def __run(self):
+        while not self.__stop.wait(self.interval):
+            try:
+                self.write()
+            except OSError as err:
+                print(f"Could not write metrics file '{self.metrics_file}': {err}")
+
+    def start(self):
+        self.write()
+        self.__thread.start()
+
+    def stop(self):
+        self.__stop.set()
+        self.__thread.join()
+        self.write(running=False)
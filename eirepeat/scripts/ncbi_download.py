@@ -4,6 +4,7 @@
 """
 Script to download data from NCBI
 """
+
 # authorship
 __author__ = "Gemy George Kaithakottil"
 __maintainer__ = "Gemy George Kaithakottil"
@@ -18,81 +19,282 @@ except AssertionError:
     sys.exit("Error: Python3 required, please 'source biopython-1.79_CBG'")
 import argparse
 from argparse import RawTextHelpFormatter
-
-# from Bio import SeqIO
-from Bio import Entrez
+from concurrent.futures import ThreadPoolExecutor, as_completed
+import gzip
+import json
 import os
+import shutil
+import threading
+import time
+
+import requests
+from requests.adapters import HTTPAdapter
+
+from eirepeat.scripts import profiling
 
 # get script name
 script = os.path.basename(sys.argv[0])
 
+EUTILS_URL = "https://eutils.ncbi.nlm.nih.gov/entrez/eutils"
+# stream the batches in chunks of 1 MB
+CHUNK_SIZE = 1024 * 1024
+
+
+class RateLimiter:
+    def __init__(self, requests_per_second):
+        """
+        Space out requests from all threads to at most requests_per_second
+        """
+        self.interval = 1 / requests_per_second
+        self.lock = threading.Lock()
+        self.next_time = 0
+
+    def wait(self):
+        with self.lock:
+            now = time.monotonic()
+            start = max(now, self.next_time)
+            self.next_time = start + self.interval
+        time.sleep(start - now)
+
 
 class NCBIDownload(object):
+    @staticmethod
+    def count_records(chunk, previous):
+        """
+        :param previous: Last byte of the previous chunk, records start on a '>' following a newline
+        """
+        count = chunk.count(b"\n>")
+        if chunk.startswith(b">") and previous in (b"", b"\n"):
+            count += 1
+        return count
+
     def __init__(self, args):
         self.args = args
+        if self.args.gzip and not self.args.output_fasta.endswith(".gz"):
+            self.args.output_fasta += ".gz"
+            print(f"Writing gzip compressed output to {self.args.output_fasta}")
+        self.checkpoint_file = f"{self.args.output_fasta}.checkpoint.json"
+        self.parts_dir = f"{self.args.output_fasta}.parts"
+        self.checkpoint = dict()
+        self.lock = threading.Lock()
+        requests_per_second = self.args.requests_per_second or (
+            10 if self.args.api_key else 3
+        )
+        self.rate_limiter = RateLimiter(requests_per_second)
+        self.session = requests.Session()
+        adapter = HTTPAdapter(pool_maxsize=self.args.threads)
+        self.session.mount("https://", adapter)
+        self.session.mount("http://", adapter)
 
-    def ncbi_download(self):
-        print(f"query:{self.args.query}")
-        print(f"output_fasta:{self.args.output_fasta}")
-        print(f"email:{self.args.email}")
-        print(f"batch_size:{self.args.batch_size}")
-        # query = " ".join(self.args.query)
-        query = self.args.query
-        # print(query)
+    def get(self, utility, params, stream=False):
+        params = dict(params, tool="eirepeat", email=self.args.email)
+        if self.args.api_key:
+            params["api_key"] = self.args.api_key
+        self.rate_limiter.wait()
+        response = self.session.get(
+            f"{self.args.base_url}/{utility}.fcgi",
+            params=params,
+            stream=stream,
+            timeout=(30, 300),
+        )
+        response.raise_for_status()
+        return response
 
-        # timeformat esearch -db nuccore -query '"eudicotyledons"[Organism] AND (mitochondrion[filter] OR chloroplast[filter])' | timeformat efetch -format fasta > eudicotyledons.genetic_compartments.845006.22Nov2021.eutils.fasta
-        Entrez.email = self.args.email
+    def with_retries(self, function, *args):
+        for attempt in range(self.args.retries + 1):
+            try:
+                return function(*args)
+            except (requests.RequestException, ValueError) as err:
+                if attempt == self.args.retries:
+                    raise
+                wait = 2**attempt
+                print(f"{err}, retrying in {wait}s")
+                time.sleep(wait)
 
+    def search(self):
         # http://biopython.org/DIST/docs/tutorial/Tutorial.html#sec%3Aentrez-webenv
-        # 9.16.1 Searching for and downloading sequences using the history
+        # 9.16.1 Searching for and downloading sequences using the history
+        response = self.get(
+            "esearch",
+            {
+                "db": "nuccore",
+                "term": self.args.query,
+                "usehistory": "y",
+                "idtype": "acc",
+                "retmax": 0,
+                "retmode": "json",
+            },
+        )
+        results = response.json()["esearchresult"]
+        if "ERROR" in results:
+            raise ValueError(f"esearch failed: {results['ERROR']}")
+        return int(results["count"]), results["webenv"], results["querykey"]
+
+    def get_uid(self, start, webenv, query_key):
+        """
+        :return: Accession of the record at this offset of the search results
+        """
+        response = self.get(
+            "efetch",
+            {
+                "db": "nuccore",
+                "rettype": "acc",
+                "retmode": "text",
+                "retstart": start,
+                "retmax": 1,
+                "webenv": webenv,
+                "query_key": query_key,
+                "idtype": "acc",
+            },
+        )
+        return response.text.strip()
 
-        # http://biopython.org/DIST/docs/tutorial/Tutorial.html
-        # "9.4 EPost: Uploading a list of identifiers"
-        # webenv = search_results["WebEnv"]
-        # query_key = search_results["QueryKey"]
+    def load_checkpoint(self, count, uids):
+        """
+        Resume from the checkpoint of an interrupted download of the same query
+        :param uids: First and last accessions of the search results, a resumed search can return the same number of
+        records in another order
+        """
+        expected = {
+            "query": self.args.query,
+            "batch_size": self.args.batch_size,
+            "count": count,
+            "uids": uids,
+        }
+        if os.path.exists(self.checkpoint_file):
+            with open(self.checkpoint_file, "r") as fh:
+                checkpoint = json.load(fh)
+            if all(checkpoint.get(k) == v for k, v in expected.items()):
+                self.checkpoint = checkpoint
+                print(
+                    f"Resuming, {len(checkpoint['completed'])} batches already downloaded"
+                )
+                return
+            # the record offsets are only valid for the same search results
+            print("Query or search results changed since the checkpoint, starting over")
+        shutil.rmtree(self.parts_dir, ignore_errors=True)
+        self.checkpoint = dict(expected, completed=list())
+        self.save_checkpoint()
 
-        # without usehistory="y"
-        # search_results
-        # {'Count': '849423', 'RetMax': '20', 'RetStart': '0', 'IdList': ['2158816248', '2158816247', '2158816246', '2158816245', '2158816244', '2158816243', '2158816242', '2158816241', '2158816240', '2158816239', '2158816238', '2158816237', '2158816236', '2158816235', '2158816234', '2158816233', '2158816232', '2158816231', '2158816230', '2158816229'], 'TranslationSet': [{'From': '"eudicotyledons"[Organism]', 'To': '"eudicotyledons"[Organism]'}], 'TranslationStack': [{'Term': '"eudicotyledons"[Organism]', 'Field': 'Organism', 'Count': '52989988', 'Explode': 'Y'}, {'Term': 'mitochondrion[filter]', 'Field': 'filter', 'Count': '6544329', 'Explode': 'N'}, {'Term': 'chloroplast[filter]', 'Field': 'filter', 'Count': '1440864', 'Explode': 'N'}, 'OR', 'GROUP', 'AND'], 'QueryTranslation': '"eudicotyledons"[Organism] AND (mitochondrion[filter] OR chloroplast[filter])'}
+    def save_checkpoint(self):
+        tmp_file = f"{self.checkpoint_file}.tmp"
+        with open(tmp_file, "w") as fh:
+            json.dump(self.checkpoint, fh)
+        os.replace(tmp_file, self.checkpoint_file)
 
-        #  with usehistory="y"
-        # {'Count': '849434', 'RetMax': '20', 'RetStart': '0', 'QueryKey': '1', 'WebEnv': 'MCID_61afc1065de7b131ae187939', 'IdList': ['LC656805.1', 'LC656804.1', 'LC656803.1', 'LC656802.1', 'LC656801.1', 'LC656800.1', 'LC656799.1', 'LC656798.1', 'LC656797.1', 'LC656796.1', 'LC656795.1', 'LC656794.1', 'LC656793.1', 'LC656792.1', 'LC656791.1', 'LC656790.1', 'LC656789.1', 'LC656788.1', 'LC656787.1', 'LC656786.1'], 'TranslationSet': [{'From': '"eudicotyledons"[Organism]', 'To': '"eudicotyledons"[Organism]'}], 'TranslationStack': [{'Term': '"eudicotyledons"[Organism]', 'Field': 'Organism', 'Count': '52990018', 'Explode': 'Y'}, {'Term': 'mitochondrion[filter]', 'Field': 'filter', 'Count': '6545970', 'Explode': 'N'}, {'Term': 'chloroplast[filter]', 'Field': 'filter', 'Count': '1440864', 'Explode': 'N'}, 'OR', 'GROUP', 'AND'], 'QueryTranslation': '"eudicotyledons"[Organism] AND (mitochondrion[filter] OR chloroplast[filter])'}
-        search_handle = Entrez.esearch(
-            db="nuccore", term=query, usehistory="y", idtype="acc"
+    def get_part(self, start):
+        return os.path.join(self.parts_dir, f"batch_{start:012d}.fasta")
+
+    def fetch_batch(self, start, expected, webenv, query_key):
+        response = self.get(
+            "efetch",
+            {
+                "db": "nuccore",
+                "rettype": "fasta",
+                "retmode": "text",
+                "retstart": start,
+                "retmax": self.args.batch_size,
+                "webenv": webenv,
+                "query_key": query_key,
+                "idtype": "acc",
+            },
+            stream=True,
         )
-        search_results = Entrez.read(search_handle)
-        search_handle.close()
-        acc_list = search_results["IdList"]
-        count = int(search_results["Count"])
-        webenv = search_results["WebEnv"]
-        query_key = search_results["QueryKey"]
-        print(f"search_results:{search_results}")
-        # print(f"len(acc_list):{len(acc_list)}") # the default is 20, RetMax': '20'
+        part = self.get_part(start)
+        records, previous = 0, b""
+        with response, open(f"{part}.tmp", "wb") as fh:
+            for chunk in response.iter_content(CHUNK_SIZE):
+                records += NCBIDownload.count_records(chunk, previous)
+                previous = chunk[-1:]
+                fh.write(chunk)
+        # NCBI can end a batch early, or answer with an error message, without an HTTP error
+        if records != expected:
+            raise ValueError(
+                f"Batch at record {start + 1} has {records} records, expected {expected}"
+            )
+        os.replace(f"{part}.tmp", part)
+
+    def download_batch(self, start, count, webenv, query_key):
+        expected = min(count, start + self.args.batch_size) - start
+        print(f"Going to download record {start + 1} to {start + expected}")
+        self.with_retries(self.fetch_batch, start, expected, webenv, query_key)
+        with self.lock:
+            self.checkpoint["completed"].append(start)
+            self.save_checkpoint()
+
+    def write_output(self, count):
+        """
+        Join the batches in order into the output FASTA, optionally keeping only the first record of each accession
+        """
+        seen = set()
+        duplicates = 0
+        tmp_file = f"{self.args.output_fasta}.tmp"
+        opener = gzip.open if self.args.gzip else open
+        with opener(tmp_file, "wt") as out:
+            for start in range(0, count, self.args.batch_size):
+                keep = True
+                with open(self.get_part(start), "r") as fh:
+                    for line in fh:
+                        if self.args.dedupe and line.startswith(">"):
+                            accession = line[1:].split(maxsplit=1)[0]
+                            keep = accession not in seen
+                            seen.add(accession)
+                            duplicates += not keep
+                        if keep:
+                            out.write(line)
+        os.replace(tmp_file, self.args.output_fasta)
+        if self.args.dedupe:
+            print(f"Removed {duplicates} duplicate records")
+
+    def ncbi_download(self):
+        print(f"query:{self.args.query}")
+        print(f"output_fasta:{self.args.output_fasta}")
+        print(f"email:{self.args.email}")
+        print(f"batch_size:{self.args.batch_size}")
+
+        # timeformat esearch -db nuccore -query '"eudicotyledons"[Organism] AND (mitochondrion[filter] OR chloroplast[filter])' | timeformat efetch -format fasta > eudicotyledons.genetic_compartments.845006.22Nov2021.eutils.fasta
+        count, webenv, query_key = self.with_retries(self.search)
         print(f"count:{count}")
         print(f"webenv:{webenv}")
         print(f"query_key:{query_key}")
-        # for gi in search_results['IdList']:
-        #     print(gi)
-
-        batch_size = self.args.batch_size
-        out_handle = open(self.args.output_fasta, "w")
-        for start in range(0, count, batch_size):
-            end = min(count, start + batch_size)
-            print("Going to download record %i to %i" % (start + 1, end))
-            fetch_handle = Entrez.efetch(
-                db="nucleotide",
-                rettype="fasta",
-                retmode="text",
-                retstart=start,
-                retmax=batch_size,
-                webenv=webenv,
-                query_key=query_key,
-                idtype="acc",
+
+        uids = (
+            [
+                self.with_retries(self.get_uid, start, webenv, query_key)
+                for start in sorted({0, count - 1})
+            ]
+            if count
+            else list()
+        )
+        print(f"uids:{','.join(uids)}")
+
+        self.load_checkpoint(count, uids)
+        os.makedirs(self.parts_dir, exist_ok=True)
+        completed = set(self.checkpoint["completed"])
+        pending = [
+            start
+            for start in range(0, count, self.args.batch_size)
+            if start not in completed
+        ]
+        failed = 0
+        with ThreadPoolExecutor(max_workers=self.args.threads) as executor:
+            futures = [
+                executor.submit(self.download_batch, start, count, webenv, query_key)
+                for start in pending
+            ]
+            for future in as_completed(futures):
+                try:
+                    future.result()
+                except (requests.RequestException, ValueError) as err:
+                    print(f"Failed: {err}")
+                    failed += 1
+        if failed:
+            sys.exit(
+                f"Error: {failed} batches failed, rerun the same command to resume the download"
             )
-            data = fetch_handle.read()
-            fetch_handle.close()
-            out_handle.write(data)
-        out_handle.close()
+        self.write_output(count)
+        shutil.rmtree(self.parts_dir)
+        os.remove(self.checkpoint_file)
 
     def run(self):
         self.ncbi_download()
@@ -121,9 +323,48 @@ def main():
         type=int,
         help="Download in batches of this much at a time (default: %(default)s)",
     )
+    parser.add_argument(
+        "-t",
+        "--threads",
+        default=3,
+        type=int,
+        help="Download this many batches at a time (default: %(default)s)",
+    )
+    parser.add_argument(
+        "--api_key",
+        help="Provide NCBI API key, allowing 10 instead of 3 requests per second (default: %(default)s)",
+    )
+    parser.add_argument(
+        "--requests_per_second",
+        type=float,
+        help="Send at most this many requests per second (default: 3, or 10 with --api_key)",
+    )
+    parser.add_argument(
+        "--retries",
+        default=5,
+        type=int,
+        help="Retry failed requests and incomplete batches this many times, with exponential backoff (default: %(default)s)",
+    )
+    parser.add_argument(
+        "--dedupe",
+        action="store_true",
+        help="Keep only the first record of each accession (default: %(default)s)",
+    )
+    parser.add_argument(
+        "--gzip",
+        action="store_true",
+        help="Write gzip compressed output FASTA, adding '.gz' to its name if missing (default: %(default)s)",
+    )
+    parser.add_argument(
+        "--base_url",
+        default=EUTILS_URL,
+        help="Provide E-utilities base URL (default: %(default)s)",
+    )
+    profiling.add_argument(parser)
     args = parser.parse_args()
 
-    NCBIDownload(args).run()
+    with profiling.profile(script, args):
+        NCBIDownload(args).run()
 
 
 if __name__ == "__main__":
@@ -0,0 +1,129 @@
+import contextlib
+import os
+import sys
+import time
+
+# set to 1 to write the profiles next to the rule log, or to a directory to write them to.
+# Inherited by the rules of 'eirepeat run'
+PROFILE_ENV = "EIREPEAT_PROFILE"
+# functions and allocations listed in the report
+TOP = 30
+
+NULL_CONTEXT = contextlib.nullcontext()
+# phase name to [seconds, calls] of the running profile, None while profiling is disabled
+phases = None
+
+
+def add_argument(parser):
+    parser.add_argument(
+        "--profile",
+        action="store_true",
+        help=f"Write cProfile stats, the top memory allocations and per-phase timings next to the rule log. Also enabled by setting the {PROFILE_ENV} environment variable to 1, or to a directory to write them to (default: %(default)s)",
+    )
+
+
+def get_setting(args=None):
+    """
+    :return: '1' to write next to the rule log, a directory, or None while profiling is disabled
+    """
+    value = os.environ.get(PROFILE_ENV)
+    if value in (None, "", "0"):
+        value = None
+    if getattr(args, "profile", False):
+        value = value or "1"
+    return value
+
+
+def get_prefix(name, setting):
+    """
+    :return: Path prefix of the profile files, '<rule log>.<name>' when stderr is redirected to the rule log
+    """
+    if setting != "1":
+        os.makedirs(setting, exist_ok=True)
+        return os.path.join(setting, name)
+    try:
+        log = os.readlink(f"/proc/self/fd/{sys.stderr.fileno()}")
+    except (OSError, ValueError):
+        log = None
+    if log and os.path.isfile(log):
+        return f"{log}.{name}"
+    return os.path.join(os.getcwd(), name)
+
+
+def phase(name):
+    """
+    Time a phase of the script, for the profile report
+    """
+    if phases is None:
+        return NULL_CONTEXT
+    return timed(name)
+
+
+@contextlib.contextmanager
+def timed(name):
+    start = time.perf_counter()
+    try:
+        yield
+    finally:
+        if phases is not None:
+            timing = phases.setdefault(name, [0.0, 0])
+            timing[0] += time.perf_counter() - start
+            timing[1] += 1
+
+
+def profile(name, args=None):
+    """
+    Profile the script with cProfile and tracemalloc while --profile or the environment variable is set
+    :param name: Name of the script, in the profile file names
+    """
+    setting = get_setting(args)
+    if not setting:
+        return NULL_CONTEXT
+    return profiled(name, get_prefix(name, setting))
+
+
+@contextlib.contextmanager
+def profiled(name, prefix):
+    global phases
+    # only imported when profiling
+    import cProfile
+    import tracemalloc
+
+    phases = dict()
+    tracemalloc.start()
+    profiler = cProfile.Profile()
+    start = time.perf_counter()
+    profiler.enable()
+    try:
+        yield
+    finally:
+        profiler.disable()
+        seconds = time.perf_counter() - start
+        snapshot = tracemalloc.take_snapshot()
+        _, peak = tracemalloc.get_traced_memory()
+        tracemalloc.stop()
+        write_report(name, prefix, profiler, snapshot, peak, seconds)
+        phases = None
+
+
+def write_report(name, prefix, profiler, snapshot, peak, seconds):
+    """
+    Write the cProfile stats to '<prefix>.prof', for pstats or snakeviz, and the report to '<prefix>.profile.txt'
+    """
+    import pstats
+
+    profiler.dump_stats(f"{prefix}.prof")
+    with open(f"{prefix}.profile.txt", "w") as fh:
+        fh.write(f"Profile of: {' '.join([name] + sys.argv[1:])}\n")
+        fh.write(f"Wall clock (seconds): {seconds:.3f}\n")
+        fh.write(f"Peak traced memory (MB): {peak / 1024**2:.1f}\n")
+        fh.write("\nPhase timings:\n")
+        fh.write(f"{'phase':<32}\t{'seconds':>10}\t{'calls':>6}\n")
+        for phase_name, (phase_seconds, calls) in phases.items():
+            fh.write(f"{phase_name:<32}\t{phase_seconds:>10.3f}\t{calls:>6}\n")
+        fh.write(f"\nTop {TOP} memory allocations, by line:\n")
+        for stat in snapshot.statistics("lineno")[:TOP]:
+            fh.write(f"{stat}\n")
+        fh.write(f"\nTop {TOP} functions, by cumulative time:\n")
+        pstats.Stats(profiler, stream=fh).sort_stats("cumulative").print_stats(TOP)
+    print(f"Profile written to '{prefix}.profile.txt'", file=sys.stderr)
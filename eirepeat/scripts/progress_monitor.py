@@ -0,0 +1,205 @@
+#!/usr/bin/env python3
+# -*- coding: utf-8 -*-
+"""
+Script to follow the Snakemake log of a run and report the progress of its jobs
+"""
+
+# authorship
+__author__ = "Gemy George Kaithakottil"
+__maintainer__ = "Gemy George Kaithakottil"
+__email__ = "gemygk@gmail.com"
+
+# import libraries
+import json
+import re
+import sys
+import threading
+import time
+from collections import Counter
+from datetime import datetime, timedelta
+
+from tabulate import tabulate
+
+# Snakemake 7 log lines
+JOB_STATS = re.compile(r"^Job stats:$")
+JOB_INFO = re.compile(r"^(?:local)?(?:rule|checkpoint) (\S+):$")
+JOB_ERROR = re.compile(r"^Error in rule (\S+):$")
+JOB_ID = re.compile(r"^\s+jobid: (\d+)$")
+JOB_FINISHED = re.compile(r"^Finished job (\d+)\.$")
+JOB_RESTART = re.compile(r"^Trying to restart job (\d+)\.$")
+STEPS_DONE = re.compile(r"^(\d+) of (\d+) steps \(.*\) done$")
+
+
+class ProgressMonitor:
+    @staticmethod
+    def format_duration(seconds):
+        return str(timedelta(seconds=int(seconds)))
+
+    def __init__(self, events_file, out=sys.stdout):
+        """
+        Follow the Snakemake log line by line, keeping only the jobs currently running,
+        so that memory does not grow with the length of the run
+        :param events_file: JSONL file the job start, finish and failure events are appended to
+        """
+        self.events = open(events_file, "a")
+        self.out = out
+        self.start_time = time.time()
+        self.totals = Counter()
+        self.done = Counter()
+        self.failed = Counter()
+        # wall clock seconds of the finished jobs per rule
+        self.durations = Counter()
+        # held while the state is updated, for the readers on other threads
+        self.lock = threading.Lock()
+        # jobid to rule name of the failed jobs, until Snakemake restarts them
+        self.failed_jobs = dict()
+        # jobid to (rule name, start time)
+        self.running = dict()
+        self.steps_done = 0
+        self.steps_total = 0
+        self.__job_stats = None
+        self.__block = None
+        self.__last_rule = None
+        self.write_event("run_start")
+
+    def write_event(self, event, **fields):
+        record = {"time": datetime.now().isoformat(timespec="seconds"), "event": event}
+        record.update(fields)
+        self.events.write(json.dumps(record) + "\n")
+        self.events.flush()
+
+    def __process_job_stats(self, line):
+        # 'job  count' table, ended by an empty line
+        fields = line.split()
+        if not fields:
+            self.__job_stats = None
+            return
+        if len(fields) == 2 and fields[1].isdigit() and fields[0] != "total":
+            self.__job_stats[fields[0]] = int(fields[1])
+
+    def process_line(self, line):
+        with self.lock:
+            self.__process_line(line.rstrip("\n"))
+
+    def __process_line(self, line):
+        if self.__job_stats is not None:
+            self.__process_job_stats(line)
+            return
+        if JOB_STATS.match(line):
+            self.__job_stats = self.totals = Counter()
+            return
+        match = JOB_INFO.match(line)
+        if match:
+            self.__block = ("start", match.group(1))
+            return
+        match = JOB_ERROR.match(line)
+        if match:
+            self.__block = ("error", match.group(1))
+            return
+        match = JOB_ID.match(line)
+        if match and self.__block:
+            self.__process_job(*self.__block, match.group(1))
+            self.__block = None
+            return
+        match = JOB_FINISHED.match(line)
+        if match:
+            self.__finish_job(match.group(1))
+            return
+        match = JOB_RESTART.match(line)
+        if match:
+            self.__restart_job(match.group(1))
+            return
+        match = STEPS_DONE.match(line)
+        if match:
+            self.steps_done, self.steps_total = int(match.group(1)), int(match.group(2))
+            self.print_progress()
+
+    def __process_job(self, kind, rulename, jobid):
+        if kind == "start":
+            self.running[jobid] = (rulename, time.time())
+            self.write_event("start", rule=rulename, jobid=int(jobid))
+            return
+        _, start = self.running.pop(jobid, (rulename, None))
+        self.failed[rulename] += 1
+        self.failed_jobs[jobid] = rulename
+        self.write_event(
+            "error",
+            rule=rulename,
+            jobid=int(jobid),
+            duration_seconds=round(time.time() - start, 1) if start else None,
+        )
+        self.print_progress(rulename)
+
+    def __finish_job(self, jobid):
+        if jobid not in self.running:
+            return
+        rulename, start = self.running.pop(jobid)
+        self.done[rulename] += 1
+        self.durations[rulename] += time.time() - start
+        self.write_event(
+            "finish",
+            rule=rulename,
+            jobid=int(jobid),
+            duration_seconds=round(time.time() - start, 1),
+        )
+        self.__last_rule = rulename
+
+    def __restart_job(self, jobid):
+        # the job is pending again
+        rulename = self.failed_jobs.pop(jobid, None)
+        if rulename:
+            self.failed[rulename] -= 1
+        self.write_event("restart", rule=rulename, jobid=int(jobid))
+
+    def get_rule_counts(self, rulename):
+        running = sum(1 for r, _ in self.running.values() if r == rulename)
+        done, failed = self.done[rulename], self.failed[rulename]
+        pending = max(self.totals[rulename] - done - running - failed, 0)
+        return done, running, pending, failed
+
+    def get_eta(self):
+        """
+        :return: Estimated seconds to completion from the rate of jobs done so far, or None before the first job
+        """
+        if not (self.steps_done and self.steps_total):
+            return None
+        elapsed = time.time() - self.start_time
+        return elapsed * (self.steps_total - self.steps_done) / self.steps_done
+
+    def get_rules(self):
+        return sorted(set(self.totals) | set(self.done) | set(self.failed))
+
+    def print_progress(self, rulename=None):
+        rulename = rulename or self.__last_rule
+        elapsed = time.time() - self.start_time
+        eta = self.get_eta()
+        eta = "unknown" if eta is None else ProgressMonitor.format_duration(eta)
+        print(
+            f"[eirepeat] {self.steps_done} of {self.steps_total} jobs done, {len(self.running)} running, "
+            f"{sum(self.failed.values())} failed | elapsed {ProgressMonitor.format_duration(elapsed)} | ETA {eta}",
+            file=self.out,
+        )
+        if rulename:
+            done, running, pending, failed = self.get_rule_counts(rulename)
+            print(
+                f"[eirepeat]   {rulename}: {done} done, {running} running, {pending} pending, {failed} failed",
+                file=self.out,
+            )
+        self.out.flush()
+
+    def get_summary(self):
+        rows = [
+            [rulename, *self.get_rule_counts(rulename)] for rulename in self.get_rules()
+        ]
+        return tabulate(rows, headers=["Rule", "Done", "Running", "Pending", "Failed"])
+
+    def close(self, exit_code):
+        elapsed = time.time() - self.start_time
+        self.write_event(
+            "run_end", exit_code=exit_code, duration_seconds=round(elapsed, 1)
+        )
+        self.events.close()
+        print(
+            f"\nJobs per rule after {ProgressMonitor.format_duration(elapsed)}:\n{self.get_summary()}\n",
+            file=self.out,
+        )
@@ -15,65 +15,33 @@ from argparse import RawTextHelpFormatter
 import os
 import sys
 
+from eirepeat import repeats
+from eirepeat.scripts import profiling
+
 # get script name
 script = os.path.basename(sys.argv[0])
 
 
 class REDToGFF3:
-    @staticmethod
-    def stripstart(s, suffix):
-        if suffix and s.startswith(suffix):
-            return s[1:]
-        return s
-
     def __init__(self, args):
         self.args = args
 
+    def get_intervals(self, output_bed):
+        # create BED3 format output
+        for seqid, start, end in repeats.read_red_rpt(self.args.red_rpk):
+            output_bed.write(f"{seqid}\t{start}\t{end}\n")
+            yield seqid, start, end
+
     def red_rpt_to_GFF3(self):
         with open(self.args.output_bed, "w") as output_bed, open(
             self.args.output_gff, "w"
         ) as output_gff:
-            counter = 1
-            for line in self.args.red_rpk:
-                line = line.rstrip()
-                if line.startswith(">"):
-                    nline = REDToGFF3.stripstart(line, ">")
-                    # create BED3 format output
-                    x = nline.split(":")
-                    xbedline = ":".join(x[:-1]) + "\t" + x[-1].replace("-", "\t")
-                    output_bed.write(f"{xbedline}\n")
-
-                    # create GFF3 format output
-                    y = xbedline.split("\t")
-                    output_gff.write(f"##gff-version 3\n")
-                    y_match = [
-                        y[0],
-                        self.args.source,
-                        "match",
-                        str(int(y[1]) + 1),
-                        y[2],
-                        ".",
-                        ".",
-                        ".",
-                        f"ID={self.args.tag}_{counter};Name={self.args.tag}_{counter}",
-                    ]
-                    y_match_part = [
-                        y[0],
-                        self.args.source,
-                        "match_part",
-                        str(int(y[1]) + 1),
-                        y[2],
-                        ".",
-                        ".",
-                        ".",
-                        f"ID={self.args.tag}_{counter}.match_part;Parent={self.args.tag}_{counter}",
-                    ]
-                    output_gff.write("\t".join(y_match) + "\n")
-                    output_gff.write("\t".join(y_match_part) + "\n")
-                    output_gff.write("###\n")
-                    counter += 1
-                else:
-                    continue
+            # create GFF3 format output
+            for feature in repeats.red_to_gff3(
+                self.get_intervals(output_bed), self.args.source, self.args.tag
+            ):
+                output_gff.write(f"##gff-version 3\n")
+                repeats.write_features([feature], output_gff)
 
     def run(self):
         self.red_rpt_to_GFF3()
@@ -122,9 +90,11 @@ def main():
         type=str,
         help="Provide tag for the ID field (default: %(default)s)",
     )
+    profiling.add_argument(parser)
     args = parser.parse_args()
 
-    REDToGFF3(args).run()
+    with profiling.profile(script, args):
+        REDToGFF3(args).run()
 
 
 if __name__ == "__main__":
@@ -16,9 +16,11 @@ import os
 import sys
 from datetime import datetime
 
+from eirepeat import repeats
+from eirepeat.scripts import profiling
+
 # get script name
 script = os.path.basename(sys.argv[0])
-SEQID, SOURCE, TYPE, START, END, SCORE, STRAND, PHASE, ATTRIBUTE = range(9)
 
 # ##date 2023-03-01
 date = datetime.now().strftime("%Y-%m-%d")
@@ -35,32 +37,9 @@ class RepeatMakerOutToGFF:
             output_gff.write(f"##date {date}\n")
             output_gff.write(f"##sequence-region {self.region}\n")
             with open(self.args.repeatmasker_out, "r") as input_fh:
-                for line in input_fh:
-                    line = line.strip()
-                    if not line or not line[0].isdigit():
-                        continue
-                    x = line.split()
-                    start = x[11]
-                    end = x[12]
-                    if x[8] == "C":
-                        x[8] = "-"
-                        start = x[13]
-                        end = x[12]
-                    xline = "\t".join(
-                        [
-                            x[4],
-                            "RepeatMasker",
-                            "similarity",
-                            x[5],
-                            x[6],
-                            x[1],
-                            x[8],
-                            ".",
-                            f'Target "{self.args.tag}:{x[9]}" {start} {end}',
-                        ]
-                    )
-                    # print(xline)
-                    output_gff.write(f"{xline}\n")
+                repeats.write_records(
+                    repeats.read_repeatmasker_out(input_fh, self.args.tag), output_gff
+                )
 
     def run(self):
         self.rm_out_to_gff()
@@ -93,9 +72,11 @@ def main():
         type=str,
         help="Provide tag for the ID field (default: %(default)s)",
     )
+    profiling.add_argument(parser)
     args = parser.parse_args()
 
-    RepeatMakerOutToGFF(args).run()
+    with profiling.profile(script, args):
+        RepeatMakerOutToGFF(args).run()
 
 
 if __name__ == "__main__":
@@ -14,64 +14,28 @@ import argparse
 from argparse import RawTextHelpFormatter
 import os
 import sys
-import re
+
+from eirepeat import repeats
+from eirepeat.scripts import profiling
 
 # get script name
 script = os.path.basename(sys.argv[0])
-SEQID, SOURCE, TYPE, START, END, SCORE, STRAND, PHASE, ATTRIBUTE = range(9)
 
 
 class RepeatMakerToGFF3:
-    @staticmethod
-    def get_field(input_file, line, attribute, field):
-        """
-        Extract query from GFF3 attribute column
-        """
-        pattern = field + '\s+"([^"]+)'
-        # Check for GFF3 file
-        id_search = re.search(pattern, attribute)
-        id_field = None
-        if id_search:
-            id_field = id_search.group(1)
-        else:
-            id_field = None
-        if not id_field:
-            raise ValueError(
-                f"Error: Cannot extract field '{field}' from the file '{input_file.name}' line below\n'{line}'\n, exiting.."
-            )
-        return id_field
-
     def __init__(self, args):
         self.args = args
 
     def red_rpt_to_GFF3(self):
+        features = repeats.repeatmasker_to_gff3(
+            repeats.read_gff(self.args.repeatmasker_out_gff),
+            self.args.source,
+            self.args.tag,
+            self.args.repeatmasker_out_gff.name,
+        )
         with open(self.args.output_gff, "w") as output_gff:
-            counter = 1
             output_gff.write(f"##gff-version 3\n")
-            for line in self.args.repeatmasker_out_gff:
-                line = line.rstrip()
-                if line.startswith("#"):
-                    continue
-                x = line.split("\t")
-                if not len(x) == 9:
-                    continue
-                if self.args.source:
-                    x[SOURCE] = self.args.source
-                target_id = RepeatMakerToGFF3.get_field(
-                    self.args.repeatmasker_out_gff, line, x[ATTRIBUTE], "Target"
-                )
-                # print match
-                m_attrib = f"ID={self.args.tag}_{counter};Name={target_id}"
-                # print(*x[:2], "match", *x[3:8], m_attrib, sep="\t")
-                output_gff.write("\t".join([*x[:2], "match", *x[3:8], m_attrib]) + "\n")
-                # print match_part
-                mp_attrib = f"ID={self.args.tag}_{counter}-exon1;Parent={self.args.tag}_{counter}"
-                # print(*x[:2], "match_part", *x[3:8], mp_attrib, sep="\t")
-                output_gff.write(
-                    "\t".join([*x[:2], "match_part", *x[3:8], mp_attrib]) + "\n"
-                )
-                output_gff.write("###\n")
-                counter += 1
+            repeats.write_features(features, output_gff)
 
     def run(self):
         self.red_rpt_to_GFF3()
@@ -114,9 +78,11 @@ def main():
         type=str,
         help="Provide tag for the ID field (default: %(default)s)",
     )
+    profiling.add_argument(parser)
     args = parser.parse_args()
 
-    RepeatMakerToGFF3(args).run()
+    with profiling.profile(script, args):
+        RepeatMakerToGFF3(args).run()
 
 
 if __name__ == "__main__":
@@ -0,0 +1,271 @@
+#!/usr/bin/env python3
+# -*- coding: utf-8 -*-
+"""
+Script to report the resources used per rule from the /usr/bin/time -v blocks in the rule logs
+"""
+
+# authorship
+__author__ = "Gemy George Kaithakottil"
+__maintainer__ = "Gemy George Kaithakottil"
+__email__ = "gemygk@gmail.com"
+
+# import libraries
+import argparse
+from argparse import RawTextHelpFormatter
+import json
+import os
+import re
+import shlex
+import sys
+from tabulate import tabulate
+
+from eirepeat.scripts import profiling
+
+# get script name
+script = os.path.basename(sys.argv[0])
+
+# /usr/bin/time -v fields to keep
+FIELDS = {
+    "User time (seconds)": "user_seconds",
+    "System time (seconds)": "system_seconds",
+    "Percent of CPU this job got": "cpu_percent",
+    "Elapsed (wall clock) time (h:mm:ss or m:ss)": "wall_clock_seconds",
+    "Maximum resident set size (kbytes)": "max_rss_kb",
+    "File system inputs": "fs_inputs",
+    "File system outputs": "fs_outputs",
+    "Exit status": "exit_status",
+}
+# echoed to a rule log before a pipe of timed commands, which run concurrently
+PIPELINE_MARKER = re.compile(r"^Timed pipeline: (\d+) commands$")
+TSV_COLUMNS = [
+    "rule",
+    "commands",
+    "wall_clock_seconds",
+    "cpu_seconds",
+    "cpu_percent",
+    "max_rss_mb",
+    "fs_inputs",
+    "fs_outputs",
+    "failed_commands",
+]
+
+
+class ResourceTelemetry:
+    @staticmethod
+    def parse_elapsed(value):
+        # h:mm:ss or m:ss.ss
+        seconds = 0.0
+        for part in value.split(":"):
+            seconds = seconds * 60 + float(part)
+        return seconds
+
+    @staticmethod
+    def parse_log(log):
+        """
+        :return: List of the /usr/bin/time -v records in a log, in order. The records of the commands of a pipe have
+        the same 'pipeline' number
+        """
+        records = list()
+        record = None
+        pipelines = 0
+        piped = 0
+        with open(log, "r", errors="replace") as fh:
+            for line in fh:
+                line = line.strip()
+                marker = PIPELINE_MARKER.match(line)
+                if marker:
+                    pipelines += 1
+                    piped = int(marker.group(1))
+                    continue
+                if line.startswith("Command being timed:"):
+                    command = line.split(":", 1)[1].strip().strip('"')
+                    try:
+                        program = shlex.split(command)[0]
+                    except (ValueError, IndexError):
+                        program = command.split()[0] if command.split() else ""
+                    record = {"command": command, "program": os.path.basename(program)}
+                    if piped:
+                        record["pipeline"] = pipelines
+                        piped -= 1
+                    records.append(record)
+                    continue
+                if record is None or ": " not in line:
+                    continue
+                # the elapsed time label itself has colons
+                key, value = line.rsplit(": ", 1)
+                if key not in FIELDS:
+                    continue
+                if FIELDS[key] == "wall_clock_seconds":
+                    value = ResourceTelemetry.parse_elapsed(value)
+                elif FIELDS[key] == "cpu_percent":
+                    value = (
+                        float(value.rstrip("%")) if value.rstrip("%") != "?" else 0.0
+                    )
+                else:
+                    value = float(value)
+                record[FIELDS[key]] = value
+        return records
+
+    @staticmethod
+    def get_rulename(logs_dir, log):
+        """
+        Rule logs are '<rule>.log', rules with wildcards log to '<rule>/<wildcards>.log'
+        """
+        relative = os.path.relpath(log, logs_dir)
+        parts = relative.split(os.sep)
+        if len(parts) > 1:
+            return parts[0]
+        return re.sub(r"\.log$", "", parts[0])
+
+    def __init__(self, args):
+        self.args = args
+        self.rules = dict()
+
+    def process_logs(self):
+        for root, dirs, files in os.walk(self.args.logs):
+            for name in sorted(files):
+                # skip the cluster logs, the rule logs hold the timings
+                if not name.endswith(".log") or name.endswith(".cluster.log"):
+                    continue
+                log = os.path.join(root, name)
+                records = ResourceTelemetry.parse_log(log)
+                if not records:
+                    continue
+                rulename = ResourceTelemetry.get_rulename(self.args.logs, log)
+                rule = self.rules.setdefault(
+                    rulename, {"logs": list(), "commands": list()}
+                )
+                rule["logs"].append(log)
+                for record in records:
+                    record["log"] = log
+                rule["commands"].extend(records)
+
+    @staticmethod
+    def get_wall_clock(commands):
+        """
+        :return: Wall clock seconds of a list of commands. The commands of a pipe run concurrently, so each pipe
+        counts for its longest command
+        """
+        steps = dict()
+        for index, command in enumerate(commands):
+            if "pipeline" in command:
+                key = (command.get("log"), "pipeline", command["pipeline"])
+            else:
+                key = (command.get("log"), "command", index)
+            steps[key] = max(steps.get(key, 0), command.get("wall_clock_seconds", 0))
+        return sum(steps.values())
+
+    @staticmethod
+    def get_totals(commands):
+        """
+        :return: Dictionary of the resources used by a list of commands
+        """
+        wall_clock = ResourceTelemetry.get_wall_clock(commands)
+        cpu = sum(
+            c.get("user_seconds", 0) + c.get("system_seconds", 0) for c in commands
+        )
+        return {
+            "wall_clock_seconds": round(wall_clock, 2),
+            "cpu_seconds": round(cpu, 2),
+            "cpu_percent": round(100 * cpu / wall_clock, 1) if wall_clock else 0.0,
+            "max_rss_mb": round(
+                max((c.get("max_rss_kb", 0) for c in commands), default=0) / 1024, 1
+            ),
+            "fs_inputs": int(sum(c.get("fs_inputs", 0) for c in commands)),
+            "fs_outputs": int(sum(c.get("fs_outputs", 0) for c in commands)),
+            "failed_commands": sum(1 for c in commands if c.get("exit_status", 0) != 0),
+        }
+
+    def summarise(self):
+        for rule in self.rules.values():
+            rule.update(ResourceTelemetry.get_totals(rule["commands"]))
+            # rules with one log per job, like the transposonpsi chunks, run several jobs
+            jobs = dict()
+            for command in rule["commands"]:
+                jobs.setdefault(command["log"], list()).append(command)
+            rule["jobs"] = len(jobs)
+            rule["max_job_wall_clock_seconds"] = round(
+                max(ResourceTelemetry.get_wall_clock(c) for c in jobs.values()), 2
+            )
+            # the same totals per sub-command of the rule
+            programs = dict()
+            for command in rule["commands"]:
+                programs.setdefault(command["program"], list()).append(command)
+            rule["programs"] = {
+                program: ResourceTelemetry.get_totals(commands)
+                for program, commands in sorted(programs.items())
+            }
+
+    def get_summary(self):
+        rows = list()
+        for rulename, rule in sorted(
+            self.rules.items(), key=lambda x: -x[1]["wall_clock_seconds"]
+        ):
+            rows.append(
+                [
+                    rulename,
+                    f"{rule['wall_clock_seconds'] / 3600:.2f}",
+                    f"{rule['cpu_seconds'] / 3600:.2f}",
+                    f"{rule['max_rss_mb'] / 1024:.2f}",
+                ]
+            )
+        return tabulate(
+            rows,
+            headers=["Rule", "Wall clock (h)", "CPU (h)", "Peak memory (GB)"],
+            tablefmt="tsv",
+            disable_numparse=True,
+        )
+
+    def run(self):
+        self.process_logs()
+        self.summarise()
+        with open(self.args.json, "w") as fh:
+            json.dump(self.rules, fh, indent=4)
+            fh.write("\n")
+        with open(self.args.tsv, "w") as fh:
+            print("\t".join(TSV_COLUMNS), file=fh)
+            for rulename, rule in sorted(self.rules.items()):
+                row = [rulename, len(rule["commands"])]
+                row.extend(rule[column] for column in TSV_COLUMNS[2:])
+                print("\t".join(str(v) for v in row), file=fh)
+        if self.args.summary:
+            with open(self.args.summary, "w") as fh:
+                fh.write("\nResource usage per rule:\n")
+                fh.write(self.get_summary())
+                fh.write("\n")
+
+
+def main():
+    parser = argparse.ArgumentParser(
+        description="Script to report the resources used per rule from the /usr/bin/time -v blocks in the rule logs",
+        formatter_class=RawTextHelpFormatter,
+        epilog="Example command:\n\t"
+        + script
+        + " output/logs --json output/eirepeat.telemetry.json --tsv output/eirepeat.telemetry.tsv\n\nContact:"
+        + __author__
+        + "("
+        + __email__
+        + ")",
+    )
+    parser.add_argument("logs", help="Provide logs directory")
+    parser.add_argument(
+        "--json",
+        required=True,
+        help="Provide output JSON of the resources per rule and per command",
+    )
+    parser.add_argument(
+        "--tsv", required=True, help="Provide output TSV of the resources per rule"
+    )
+    parser.add_argument(
+        "--summary",
+        help="Provide output text summary, as appended to eirepeat.completed.txt (default: %(default)s)",
+    )
+    profiling.add_argument(parser)
+    args = parser.parse_args()
+
+    with profiling.profile(script, args):
+        ResourceTelemetry(args).run()
+
+
+if __name__ == "__main__":
+    main()
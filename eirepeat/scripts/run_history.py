@@ -0,0 +1,375 @@
+#!/usr/bin/env python3
+# -*- coding: utf-8 -*-
+"""
+Script to record the per-rule resource usage of finished runs in a SQLite history database,
+and estimate the resources of a new run from it
+"""
+
+# authorship
+__author__ = "Gemy George Kaithakottil"
+__maintainer__ = "Gemy George Kaithakottil"
+__email__ = "gemygk@gmail.com"
+
+# import libraries
+import argparse
+from argparse import Namespace, RawTextHelpFormatter
+from datetime import datetime
+import json
+import math
+import os
+import sqlite3
+import sys
+import yaml
+from tabulate import tabulate
+
+from eirepeat import DEFAULT_HISTORY_DB
+from eirepeat.scripts.fasta_stats import FastaStats
+from eirepeat.scripts import profiling
+from eirepeat.scripts.run_history_args import add_estimate_arguments
+
+# get script name
+script = os.path.basename(sys.argv[0])
+
+SCHEMA = """
+CREATE TABLE IF NOT EXISTS runs (
+    run_id TEXT PRIMARY KEY,
+    recorded TEXT NOT NULL,
+    species TEXT,
+    total_length INTEGER NOT NULL,
+    sequence_count INTEGER NOT NULL,
+    n50 INTEGER NOT NULL,
+    options TEXT NOT NULL
+);
+CREATE TABLE IF NOT EXISTS rule_usage (
+    run_id TEXT NOT NULL REFERENCES runs(run_id) ON DELETE CASCADE,
+    rule TEXT NOT NULL,
+    jobs INTEGER NOT NULL,
+    wall_clock_seconds REAL NOT NULL,
+    max_job_wall_clock_seconds REAL NOT NULL,
+    cpu_seconds REAL NOT NULL,
+    max_rss_mb REAL NOT NULL,
+    PRIMARY KEY (run_id, rule)
+);
+CREATE INDEX IF NOT EXISTS runs_total_length ON runs(total_length);
+"""
+
+# resources predicted per rule
+METRICS = ["max_job_wall_clock_seconds", "cpu_seconds", "max_rss_mb", "jobs"]
+# the runs of the same species are only used on their own from this many, fewer cannot fit a trend with genome size
+MIN_SPECIES_RUNS = 3
+
+
+class RunHistory:
+    @staticmethod
+    def get_options(run_config):
+        """
+        :return: Dictionary of the run_config.yaml options that change which rules run, or how much they do
+        """
+        return {
+            "run_red_repeats": bool(run_config.get("run_red_repeats")),
+            "close_reference": bool(run_config.get("close_reference")),
+            "organellar_fasta": bool(run_config.get("organellar_fasta")),
+            "library_compaction": bool(
+                (run_config.get("library_compaction") or dict()).get("enabled")
+            ),
+            "subsample": bool((run_config.get("subsample") or dict()).get("enabled")),
+        }
+
+    @staticmethod
+    def fit(sizes, values):
+        """
+        Fit value = a * size^b by least squares on the log scale, the exponent is kept within [0, 2]
+        so that a few runs of similar size cannot extrapolate wildly
+        :return: Function of genome size to the predicted value
+        """
+        points = [
+            (math.log(s), math.log(v)) for s, v in zip(sizes, values) if s > 0 and v > 0
+        ]
+        if not points:
+            return lambda size: 0.0
+        xs, ys = [p[0] for p in points], [p[1] for p in points]
+        mean_x, mean_y = sum(xs) / len(xs), sum(ys) / len(ys)
+        variance = sum((x - mean_x) ** 2 for x in xs)
+        # with a single genome size, assume the resources scale linearly with it
+        slope = (
+            sum((x - mean_x) * (y - mean_y) for x, y in points) / variance
+            if variance > 1e-9
+            else 1.0
+        )
+        slope = min(max(slope, 0.0), 2.0)
+        intercept = mean_y - slope * mean_x
+        return lambda size: math.exp(intercept + slope * math.log(size))
+
+    def __init__(self, db):
+        self.db = os.path.expanduser(os.path.expandvars(db))
+        os.makedirs(os.path.dirname(os.path.abspath(self.db)), exist_ok=True)
+        self.connection = sqlite3.connect(self.db, timeout=60)
+        self.connection.execute("PRAGMA foreign_keys = ON")
+        self.connection.executescript(SCHEMA)
+
+    def record(self, run_id, species, genome_stats, options, telemetry):
+        """
+        Record a finished run, replacing an earlier record of the same run
+        :param genome_stats: Dictionary as written by fasta_stats
+        :param telemetry: Dictionary of rule name to resources as written by resource_telemetry
+        """
+        with self.connection:
+            self.connection.execute("DELETE FROM runs WHERE run_id = ?", (run_id,))
+            self.connection.execute(
+                "INSERT INTO runs VALUES (?, ?, ?, ?, ?, ?, ?)",
+                (
+                    run_id,
+                    datetime.now().isoformat(timespec="seconds"),
+                    species,
+                    genome_stats["total_length"],
+                    genome_stats["sequence_count"],
+                    genome_stats["n50"],
+                    json.dumps(options, sort_keys=True),
+                ),
+            )
+            self.connection.executemany(
+                "INSERT INTO rule_usage VALUES (?, ?, ?, ?, ?, ?, ?)",
+                [
+                    (
+                        run_id,
+                        rulename,
+                        usage.get("jobs", 1),
+                        usage["wall_clock_seconds"],
+                        usage.get(
+                            "max_job_wall_clock_seconds", usage["wall_clock_seconds"]
+                        ),
+                        usage["cpu_seconds"],
+                        usage["max_rss_mb"],
+                    )
+                    for rulename, usage in telemetry.items()
+                ],
+            )
+
+    def get_usage(self, options=None, species=None):
+        """
+        :param options: Only use the runs with these options, or all runs if none match
+        :param species: Then only use the runs of this species, or all of them if fewer than MIN_SPECIES_RUNS match
+        :return: Dictionary of rule name to list of (genome size, usage dictionary), the number of runs used,
+        whether they matched the options and whether they matched the species
+        """
+        query = "SELECT run_id, total_length, options, species FROM runs"
+        runs = self.connection.execute(query).fetchall()
+        matched = False
+        if options is not None:
+            matching = [r for r in runs if json.loads(r[2]) == options]
+            matched = bool(matching)
+            runs = matching or runs
+        matched_species = False
+        if species is not None:
+            matching = [r for r in runs if r[3] == species]
+            matched_species = len(matching) >= MIN_SPECIES_RUNS
+            runs = matching if matched_species else runs
+        sizes = {run[0]: run[1] for run in runs}
+        usage = dict()
+        for row in self.connection.execute(
+            f"SELECT run_id, rule, {', '.join(METRICS)} FROM rule_usage"
+        ):
+            if row[0] not in sizes:
+                continue
+            usage.setdefault(row[1], list()).append(
+                (sizes[row[0]], dict(zip(METRICS, row[2:])))
+            )
+        return usage, len(sizes), matched, matched_species
+
+    def estimate(self, total_length, options=None, species=None):
+        """
+        :return: Dictionary of rule name to predicted resources for a genome of this size, the number of runs used,
+        whether they matched the options and whether they matched the species
+        """
+        usage, run_count, matched, matched_species = self.get_usage(options, species)
+        estimates = dict()
+        for rulename, records in sorted(usage.items()):
+            sizes = [size for size, _ in records]
+            estimates[rulename] = {
+                metric: RunHistory.fit(sizes, [r[metric] for _, r in records])(
+                    total_length
+                )
+                for metric in METRICS
+            }
+            estimates[rulename]["runs"] = len(records)
+        return estimates, run_count, matched, matched_species
+
+    @staticmethod
+    def get_hpc_overrides(estimates, headroom):
+        """
+        :return: Dictionary of --hpc_config JSON overrides of memory (MB), time (minutes) and cost (hours) per rule
+        """
+        overrides = dict()
+        for rulename, estimate in estimates.items():
+            memory = estimate["max_rss_mb"] * headroom
+            overrides[rulename] = {
+                # whole GB, and at least 1 GB
+                "memory": max(1024, int(math.ceil(memory / 1024) * 1024)),
+                "time": max(
+                    10,
+                    int(
+                        math.ceil(
+                            estimate["max_job_wall_clock_seconds"] * headroom / 60
+                        )
+                    ),
+                ),
+                "cost": round(estimate["max_job_wall_clock_seconds"] / 3600, 2),
+            }
+        return overrides
+
+
+class Estimate:
+    def __init__(self, args):
+        self.args = args
+        self.species = self.args.species
+        self.options = None
+        self.genome_stats = dict()
+        self.db = self.args.db or DEFAULT_HISTORY_DB
+
+    def load_input(self):
+        if self.args.input.endswith((".yaml", ".yml")):
+            with open(self.args.input, "r") as fh:
+                run_config = yaml.safe_load(fh)
+            self.db = self.args.db or run_config.get("history") or DEFAULT_HISTORY_DB
+            self.species = self.species or run_config.get("species")
+            self.options = RunHistory.get_options(run_config)
+            # reuse the genome stats of a run already started
+            stats_file = os.path.join(
+                run_config["output"], run_config["prefix"]["index_name"] + ".stats.json"
+            )
+            if os.path.exists(stats_file):
+                with open(stats_file, "r") as fh:
+                    self.genome_stats = json.load(fh)
+                return
+            # or the stats written by 'eirepeat configure'
+            if run_config.get("stats", dict()).get("fasta"):
+                self.genome_stats = run_config["stats"]["fasta"]
+                return
+            fasta = run_config["fasta"]
+        else:
+            fasta = self.args.input
+        fasta_stats = FastaStats(Namespace(fasta=fasta))
+        fasta_stats.process_fasta()
+        self.genome_stats = fasta_stats.get_stats()
+
+    def run(self):
+        self.load_input()
+        history = RunHistory(self.db)
+        estimates, run_count, matched, matched_species = history.estimate(
+            self.genome_stats["total_length"], self.options, self.species
+        )
+        if not estimates:
+            print(f"No runs recorded in the history database '{history.db}' yet")
+            return 1
+        print(
+            f"Genome: {self.genome_stats['fasta']}\n"
+            f"Total length: {self.genome_stats['total_length']}, sequences: {self.genome_stats['sequence_count']}, N50: {self.genome_stats['n50']}\n"
+            f"Estimated from {run_count} recorded runs{' with the same options' if matched else ''}"
+            f"{f' of {self.species}' if matched_species else ''}\n"
+        )
+        rows = list()
+        for rulename, estimate in estimates.items():
+            rows.append(
+                [
+                    rulename,
+                    estimate["runs"],
+                    int(round(estimate["jobs"])),
+                    f"{estimate['max_job_wall_clock_seconds'] / 3600:.2f}",
+                    f"{estimate['max_rss_mb'] / 1024:.2f}",
+                    f"{estimate['cpu_seconds'] / 3600:.2f}",
+                ]
+            )
+        print(
+            tabulate(
+                rows,
+                headers=[
+                    "Rule",
+                    "Runs",
+                    "Jobs",
+                    "Walltime per job (h)",
+                    "Peak memory (GB)",
+                    "CPU (h)",
+                ],
+                disable_numparse=True,
+            )
+        )
+        total = sum(e["cpu_seconds"] for e in estimates.values()) / 3600
+        print(f"\nTotal CPU-hours: {total:.2f}\n")
+        overrides = RunHistory.get_hpc_overrides(estimates, self.args.headroom)
+        print(
+            f"Suggested --hpc_config overrides (memory in MB and time in minutes, with {self.args.headroom}x headroom):"
+        )
+        print(json.dumps(overrides, indent=4))
+        return 0
+
+
+class Record:
+    def __init__(self, args):
+        self.args = args
+
+    def run(self):
+        with open(self.args.genome_stats, "r") as fh:
+            genome_stats = json.load(fh)
+        with open(self.args.telemetry, "r") as fh:
+            telemetry = json.load(fh)
+        RunHistory(self.args.db).record(
+            self.args.run_id,
+            self.args.species,
+            genome_stats,
+            json.loads(self.args.options),
+            telemetry,
+        )
+        return 0
+
+
+def main():
+    parser = argparse.ArgumentParser(
+        description="Script to record the per-rule resource usage of finished runs in a SQLite history database,\nand estimate the resources of a new run from it",
+        formatter_class=RawTextHelpFormatter,
+        epilog="Example command:\n\t"
+        + script
+        + " record --db ~/.eirepeat/history.sqlite --run_id /path/to/output --species Insecta --genome_stats output/genome.fa.stats.json --telemetry output/eirepeat.telemetry.json\n\t"
+        + script
+        + " estimate genome.fa\n\nContact:"
+        + __author__
+        + "("
+        + __email__
+        + ")",
+    )
+    subparsers = parser.add_subparsers(dest="command", required=True)
+    parser_record = subparsers.add_parser(
+        "record", help="Record the resource usage of a finished run"
+    )
+    parser_record.add_argument(
+        "--run_id", required=True, help="Provide run id, the output directory"
+    )
+    parser_record.add_argument("--species", help="Provide species name")
+    parser_record.add_argument(
+        "--options",
+        default="{}",
+        help="Provide JSON of the run options (default: %(default)s)",
+    )
+    parser_record.add_argument("--db", required=True, help="Provide history database")
+    parser_record.add_argument(
+        "--genome_stats", required=True, help="Provide genome stats JSON"
+    )
+    parser_record.add_argument(
+        "--telemetry", required=True, help="Provide resource telemetry JSON"
+    )
+    parser_estimate = subparsers.add_parser(
+        "estimate", help="Estimate the resource usage of a run"
+    )
+    add_estimate_arguments(parser_estimate)
+    profiling.add_argument(parser)
+    args = parser.parse_args()
+
+    with profiling.profile(script, args):
+        if args.command == "record":
+            exit_code = Record(args).run()
+        else:
+            exit_code = Estimate(args).run()
+    sys.exit(exit_code)
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,24 @@
+from eirepeat import DEFAULT_HISTORY_DB
+
+
+# shared by 'eirepeat estimate' and 'run_history estimate', and kept apart from run_history so that
+# building the eirepeat parser does not import yaml and tabulate
+def add_estimate_arguments(parser):
+    parser.add_argument(
+        "input",
+        help="Provide genome FASTA, or run configuration YAML to also match the run options",
+    )
+    parser.add_argument(
+        "--headroom",
+        type=float,
+        default=1.25,
+        help="Multiply the estimated memory and time by this for the suggested --hpc_config overrides (default: %(default)s)",
+    )
+    parser.add_argument(
+        "--db",
+        help=f"Provide history database (default: the run configuration 'history', or {DEFAULT_HISTORY_DB})",
+    )
+    parser.add_argument(
+        "--species",
+        help="Provide species name, to estimate from the runs of this species if enough are recorded (default: the run configuration 'species')",
+    )
@@ -0,0 +1,167 @@
+#!/usr/bin/env python3
+# -*- coding: utf-8 -*-
+"""
+Script to run a tool on node-local scratch and copy back only its outputs
+"""
+
+# authorship
+__author__ = "Gemy George Kaithakottil"
+__maintainer__ = "Gemy George Kaithakottil"
+__email__ = "gemygk@gmail.com"
+
+# import libraries
+import argparse
+from argparse import RawTextHelpFormatter
+import gzip
+import os
+import shutil
+import signal
+import subprocess
+import sys
+import tempfile
+import logging
+
+from eirepeat.scripts import profiling
+
+# get script name
+script = os.path.basename(sys.argv[0])
+
+# copy in chunks of 16 MB
+BUFFER_SIZE = 16 * 1024 * 1024
+
+logging.basicConfig(
+    format="%(asctime)s - %(process)d - %(name)s - %(levelname)s - %(message)s",
+    datefmt="%d-%b-%y %H:%M:%S",
+    level=logging.DEBUG,
+)
+
+
+class ScratchRun:
+    @staticmethod
+    def terminate(signum, frame):
+        # turn scheduler signals (walltime, scancel) into an exit, so that scratch is cleaned up
+        sys.exit(128 + signum)
+
+    def __init__(self, args):
+        self.args = args
+        self.output_dir = os.path.abspath(self.args.output_dir)
+        self.scratch_dir = None
+        # directories whose files are staged, paths into them are rewritten to the local copy
+        self.staged_dirs = {self.output_dir}
+
+    def stage_inputs(self):
+        for input_file in self.args.inputs:
+            local_file = os.path.join(self.scratch_dir, os.path.basename(input_file))
+            logging.info(f"Staging '{input_file}' to '{local_file}'")
+            # follow symlinks, the inputs are often links to the shared filesystem
+            shutil.copyfile(input_file, local_file)
+            self.staged_dirs.add(os.path.dirname(os.path.abspath(input_file)))
+
+    def localise_command(self):
+        command = list()
+        for token in self.args.command:
+            if os.path.isabs(token) and os.path.abspath(token) == self.output_dir:
+                command.append(".")
+            elif os.path.isabs(token) and os.path.dirname(token) in self.staged_dirs:
+                command.append(os.path.basename(token))
+            else:
+                command.append(token)
+        return command
+
+    def copy_back(self):
+        for name in self.args.keep:
+            local_file = os.path.join(self.scratch_dir, name)
+            if not os.path.exists(local_file):
+                logging.warning(f"Output '{name}' not found on scratch, skipping")
+                continue
+            with open(local_file, "rb") as src, open(
+                os.path.join(self.output_dir, name), "wb"
+            ) as dst:
+                shutil.copyfileobj(src, dst, BUFFER_SIZE)
+        for name in self.args.compress:
+            local_file = os.path.join(self.scratch_dir, name)
+            if not os.path.exists(local_file):
+                continue
+            with open(local_file, "rb") as src, gzip.open(
+                os.path.join(self.output_dir, f"{name}.gz"), "wb", compresslevel=1
+            ) as dst:
+                shutil.copyfileobj(src, dst, BUFFER_SIZE)
+
+    def run(self):
+        signal.signal(signal.SIGTERM, ScratchRun.terminate)
+        signal.signal(signal.SIGUSR2, ScratchRun.terminate)
+        # $TMPDIR may not be set on every node, fall back to the system temporary directory
+        scratch = os.path.expandvars(self.args.scratch) or tempfile.gettempdir()
+        os.makedirs(scratch, exist_ok=True)
+        self.scratch_dir = tempfile.mkdtemp(prefix="eirepeat.", dir=scratch)
+        try:
+            self.stage_inputs()
+            command = self.localise_command()
+            logging.info(f"Running '{' '.join(command)}' in '{self.scratch_dir}'")
+            exit_code = subprocess.call(command, cwd=self.scratch_dir)
+            if exit_code == 0:
+                self.copy_back()
+            return exit_code
+        finally:
+            logging.info(f"Removing scratch directory '{self.scratch_dir}'")
+            shutil.rmtree(self.scratch_dir, ignore_errors=True)
+
+
+def main():
+    parser = argparse.ArgumentParser(
+        description="Script to run a tool on node-local scratch and copy back only its outputs",
+        formatter_class=RawTextHelpFormatter,
+        epilog="Example command:\n\t"
+        + script
+        + " --scratch $TMPDIR --inputs /path/to/genome.fa --output_dir /path/to/RepeatMasker_low --keep genome.fa.out.gff --compress genome.fa.align"
+        + " -- RepeatMasker -gff -dir /path/to/RepeatMasker_low /path/to/genome.fa\n\nContact:"
+        + __author__
+        + "("
+        + __email__
+        + ")",
+    )
+    parser.add_argument(
+        "--scratch",
+        required=True,
+        help="Provide node-local scratch directory, a temporary directory is created inside",
+    )
+    parser.add_argument(
+        "--inputs",
+        nargs="+",
+        default=list(),
+        help="Provide input files to copy to scratch. Paths to these files (and to --output_dir) in the command are rewritten to the local copy",
+    )
+    parser.add_argument(
+        "--output_dir",
+        required=True,
+        help="Provide directory to copy the outputs back to",
+    )
+    parser.add_argument(
+        "--keep",
+        nargs="+",
+        default=list(),
+        help="Provide output filenames to copy back as they are",
+    )
+    parser.add_argument(
+        "--compress",
+        nargs="*",
+        default=list(),
+        help="Provide output filenames to copy back gzip compressed (default: %(default)s)",
+    )
+    parser.add_argument(
+        "command", nargs=argparse.REMAINDER, help="Tool command, after '--'"
+    )
+    profiling.add_argument(parser)
+    args = parser.parse_args()
+    if args.command and args.command[0] == "--":
+        args.command = args.command[1:]
+    if not args.command:
+        parser.error("No command provided")
+
+    with profiling.profile(script, args):
+        exit_code = ScratchRun(args).run()
+    sys.exit(exit_code)
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,247 @@
+#!/usr/bin/env python3
+# -*- coding: utf-8 -*-
+"""
+Script to look up the species and clades of the RepeatMasker database tree (queryRepeatDatabase.tree.txt)
+"""
+
+# authorship
+__author__ = "Gemy George Kaithakottil"
+__maintainer__ = "Gemy George Kaithakottil"
+__email__ = "gemygk@gmail.com"
+
+# import libraries
+import argparse
+from argparse import RawTextHelpFormatter
+import bisect
+from collections import Counter
+import hashlib
+import os
+import pickle
+import re
+import sys
+
+from eirepeat import FULL_SPECIES_TREE_FILE
+from eirepeat.scripts import profiling
+
+# get script name
+script = os.path.basename(sys.argv[0])
+
+# '    Acanthamoeba castellanii [ 22 ]', some clades carry an extra '{n}' count
+TREE_LINE = re.compile(r"^( *)(.+?) \[ (\d+)(?: \{\d+\})? \]$")
+INDENT = 4
+# bump when the index layout changes, to rebuild the cached indices
+INDEX_VERSION = 1
+
+
+class SpeciesIndex:
+    @staticmethod
+    def get_trigrams(name):
+        # padded like PostgreSQL pg_trgm, so that short names and word starts weigh in
+        padded = f"  {name.lower()} "
+        return {padded[i : i + 3] for i in range(len(padded) - 2)}
+
+    @staticmethod
+    def get_cache_file(tree_file):
+        stat = os.stat(tree_file)
+        key = hashlib.sha1(
+            f"{INDEX_VERSION}:{os.path.abspath(tree_file)}:{stat.st_size}:{stat.st_mtime_ns}".encode()
+        ).hexdigest()
+        cache_dir = os.path.join(
+            os.environ.get("XDG_CACHE_HOME", os.path.join("~", ".cache")), "eirepeat"
+        )
+        return os.path.join(
+            os.path.expanduser(cache_dir), f"species_index.{key[:16]}.pickle"
+        )
+
+    @staticmethod
+    def load(tree_file=FULL_SPECIES_TREE_FILE):
+        """
+        :return: SpeciesIndex of the tree, from the cache if the tree is unchanged since it was indexed
+        """
+        cache_file = SpeciesIndex.get_cache_file(tree_file)
+        try:
+            with open(cache_file, "rb") as fh:
+                return pickle.load(fh)
+        except (OSError, pickle.UnpicklingError, EOFError, AttributeError):
+            pass
+        index = SpeciesIndex(tree_file)
+        try:
+            os.makedirs(os.path.dirname(cache_file), exist_ok=True)
+            tmp_file = f"{cache_file}.{os.getpid()}.tmp"
+            with open(tmp_file, "wb") as fh:
+                pickle.dump(index, fh, protocol=pickle.HIGHEST_PROTOCOL)
+            os.replace(tmp_file, cache_file)
+        except OSError:
+            # read-only home, the index is rebuilt every time
+            pass
+        return index
+
+    def __init__(self, tree_file):
+        # node id to name, parent node id and number of RepeatMasker families in the clade
+        self.names = list()
+        self.parents = list()
+        self.counts = list()
+        # lower case name to node id
+        self.ids = dict()
+        self.sorted_names = list()
+        # trigram to node ids, and the number of trigrams per node
+        self.trigrams = dict()
+        self.trigram_counts = list()
+        self.__parse(tree_file)
+
+    def __parse(self, tree_file):
+        stack = list()
+        with open(tree_file, "r") as fh:
+            for line in fh:
+                match = TREE_LINE.match(line.rstrip("\n"))
+                if not match:
+                    continue
+                depth = len(match.group(1)) // INDENT
+                del stack[depth:]
+                node = len(self.names)
+                self.names.append(match.group(2))
+                self.parents.append(stack[-1] if stack else None)
+                self.counts.append(int(match.group(3)))
+                self.ids.setdefault(match.group(2).lower(), node)
+                stack.append(node)
+        self.sorted_names = sorted(self.ids)
+        for node, name in enumerate(self.names):
+            trigrams = SpeciesIndex.get_trigrams(name)
+            self.trigram_counts.append(len(trigrams))
+            for trigram in trigrams:
+                self.trigrams.setdefault(trigram, list()).append(node)
+
+    def get(self, name):
+        """
+        :return: Name as written in the tree, matched case insensitively, or None
+        """
+        node = self.ids.get(name.strip().lower())
+        return None if node is None else self.names[node]
+
+    def get_count(self, name):
+        return self.counts[self.ids[name.lower()]]
+
+    def get_lineage(self, name):
+        """
+        :return: List of clade names from the root down to the name
+        """
+        lineage = list()
+        node = self.ids[name.lower()]
+        while node is not None:
+            lineage.append(self.names[node])
+            node = self.parents[node]
+        return lineage[::-1]
+
+    def search_prefix(self, prefix, limit=10):
+        prefix = prefix.strip().lower()
+        matches = list()
+        for i in range(
+            bisect.bisect_left(self.sorted_names, prefix), len(self.sorted_names)
+        ):
+            if not self.sorted_names[i].startswith(prefix) or len(matches) == limit:
+                break
+            matches.append(self.names[self.ids[self.sorted_names[i]]])
+        return matches
+
+    def search_fuzzy(self, query, limit=10, min_similarity=0.3):
+        """
+        :return: List of (name, similarity) of the closest names by trigram similarity,
+        ties going to the clades with more families
+        """
+        trigrams = SpeciesIndex.get_trigrams(query.strip())
+        shared = Counter()
+        for trigram in trigrams:
+            shared.update(self.trigrams.get(trigram, ()))
+        scored = list()
+        for node, count in shared.items():
+            total = len(trigrams) + self.trigram_counts[node]
+            similarity = count / (total - count)
+            if similarity >= min_similarity:
+                scored.append((similarity, self.counts[node], node))
+        scored.sort(key=lambda x: (-x[0], -x[1]))
+        return [(self.names[node], round(s, 2)) for s, _, node in scored[:limit]]
+
+    def search(self, query, limit=10):
+        """
+        :return: List of names, the prefix matches first and then the fuzzy matches
+        """
+        matches = self.search_prefix(query, limit)
+        for name, _ in self.search_fuzzy(query, limit):
+            if len(matches) == limit:
+                break
+            if name not in matches:
+                matches.append(name)
+        return matches
+
+
+def main():
+    parser = argparse.ArgumentParser(
+        description="Script to look up the species and clades of the RepeatMasker database tree (queryRepeatDatabase.tree.txt)",
+        formatter_class=RawTextHelpFormatter,
+        epilog="Example command:\n\t"
+        + script
+        + " Insecta\n\t"
+        + script
+        + " --fuzzy 'bombus vestallis'\n\nContact:"
+        + __author__
+        + "("
+        + __email__
+        + ")",
+    )
+    parser.add_argument("query", help="Provide species or clade name, or its start")
+    group = parser.add_mutually_exclusive_group()
+    group.add_argument(
+        "--prefix",
+        action="store_true",
+        help="Only list names starting with the query (default: %(default)s)",
+    )
+    group.add_argument(
+        "--fuzzy",
+        action="store_true",
+        help="Only list names similar to the query (default: %(default)s)",
+    )
+    parser.add_argument(
+        "--limit",
+        type=int,
+        default=10,
+        help="List at most this many names (default: %(default)s)",
+    )
+    parser.add_argument(
+        "--lineage",
+        action="store_true",
+        help="Print the lineage of each name (default: %(default)s)",
+    )
+    parser.add_argument(
+        "--tree",
+        default=FULL_SPECIES_TREE_FILE,
+        help="Provide queryRepeatDatabase.pl -tree output (default: %(default)s)",
+    )
+    profiling.add_argument(parser)
+    args = parser.parse_args()
+
+    with profiling.profile(script, args):
+        exit_code = print_matches(args)
+    sys.exit(exit_code)
+
+
+def print_matches(args):
+    index = SpeciesIndex.load(args.tree)
+    if args.prefix:
+        matches = index.search_prefix(args.query, args.limit)
+    elif args.fuzzy:
+        matches = [name for name, _ in index.search_fuzzy(args.query, args.limit)]
+    else:
+        matches = index.search(args.query, args.limit)
+    if not matches:
+        print(f"No species or clade matches '{args.query}'", file=sys.stderr)
+        return 1
+    for name in matches:
+        line = f"{name}\t{index.get_count(name)}"
+        if args.lineage:
+            line += "\t" + " > ".join(index.get_lineage(name))
+        print(line)
+    return 0
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,244 @@
+#!/usr/bin/env python3
+# -*- coding: utf-8 -*-
+"""
+Script to extract the RepeatMasker library of a species once, to pass to RepeatMasker with -lib
+"""
+
+# authorship
+__author__ = "Gemy George Kaithakottil"
+__maintainer__ = "Gemy George Kaithakottil"
+__email__ = "gemygk@gmail.com"
+
+# import libraries
+import argparse
+from argparse import RawTextHelpFormatter
+import os
+import re
+import shutil
+import subprocess
+import sys
+import tempfile
+
+from eirepeat import repeats
+from eirepeat.scripts import profiling
+
+# get script name
+script = os.path.basename(sys.argv[0])
+
+
+class SpeciesLibrary:
+    @staticmethod
+    def get_masking(output_dir, name):
+        """
+        :return: Tuple of the number of hits in the RepeatMasker .out and of soft-masked bases in the .masked FASTA,
+        RepeatMasker writes neither without repeats found
+        """
+        hits, masked = 0, 0
+        out = os.path.join(output_dir, f"{name}.out")
+        if os.path.exists(out):
+            with open(out, "r") as fh:
+                hits = sum(1 for _ in repeats.read_repeatmasker_out(fh))
+        masked_fasta = os.path.join(output_dir, f"{name}.masked")
+        if os.path.exists(masked_fasta):
+            with open(masked_fasta, "r") as fh:
+                for line in fh:
+                    if not line.startswith(">"):
+                        masked += sum(1 for base in line if base.islower())
+        return hits, masked
+
+    def __init__(self, args):
+        self.args = args
+        self.repeatmasker_dir = self.args.repeatmasker_dir
+        if not self.repeatmasker_dir:
+            repeatmasker = shutil.which("RepeatMasker")
+            if not repeatmasker:
+                raise FileNotFoundError(
+                    "RepeatMasker not found in PATH, please source it or provide --repeatmasker_dir"
+                )
+            self.repeatmasker_dir = os.path.dirname(os.path.realpath(repeatmasker))
+        self.libraries_dir = os.path.join(self.repeatmasker_dir, "Libraries")
+
+    def get_database(self):
+        """
+        :return: Tuple of the database type and path, Dfam famdb for RepeatMasker 4.1 and later or EMBL before
+        """
+        for name in ["famdb", "RepeatMaskerLib.h5"]:
+            if os.path.exists(os.path.join(self.libraries_dir, name)):
+                return "famdb", os.path.join(self.libraries_dir, name)
+        embl = os.path.join(self.libraries_dir, "RepeatMaskerLib.embl")
+        if os.path.exists(embl):
+            return "embl", embl
+        raise FileNotFoundError(
+            f"No RepeatMasker database found in '{self.libraries_dir}'"
+        )
+
+    def get_version(self):
+        database_type, database = self.get_database()
+        release = None
+        if database_type == "famdb":
+            info = subprocess.run(
+                [
+                    os.path.join(self.repeatmasker_dir, "famdb.py"),
+                    "-i",
+                    database,
+                    "info",
+                ],
+                stdout=subprocess.PIPE,
+                universal_newlines=True,
+                check=True,
+            ).stdout
+            match = re.search(r"^\s*(?:Version|Release):\s*(\S+)", info, re.MULTILINE)
+            release = match.group(1) if match else None
+        else:
+            # e.g. 'CC   RELEASE 20181026;'
+            with open(database, "r") as fh:
+                for line in fh:
+                    match = re.search(r"RELEASE\s+(\S+?);", line)
+                    if match:
+                        release = match.group(1)
+                        break
+                    if line.startswith("ID"):
+                        break
+        if not release:
+            # an unversioned database changes with its file
+            stat = os.stat(database)
+            release = f"{stat.st_size}.{int(stat.st_mtime)}"
+        return f"{database_type}-{release}"
+
+    def extract(self):
+        database_type, database = self.get_database()
+        if database_type == "famdb":
+            # the families RepeatMasker -species searches with
+            cmd = [
+                os.path.join(self.repeatmasker_dir, "famdb.py"),
+                "-i",
+                database,
+                "families",
+                "--format",
+                "fasta_name",
+                "--ancestors",
+                "--descendants",
+                "--include-class-in-name",
+                self.args.species,
+            ]
+        else:
+            cmd = [
+                "perl",
+                os.path.join(self.repeatmasker_dir, "util", "queryRepeatDatabase.pl"),
+                "-species",
+                self.args.species,
+            ]
+        tmp_output = f"{self.args.output}.tmp"
+        with open(tmp_output, "w") as fh:
+            subprocess.run(cmd, stdout=fh, check=True)
+        if os.path.getsize(tmp_output) == 0:
+            os.remove(tmp_output)
+            raise ValueError(
+                f"No repeat families found for species '{self.args.species}' in '{database}'"
+            )
+        os.rename(tmp_output, self.args.output)
+
+    def compare(self):
+        """
+        Mask the --compare genome with -species and with -lib of the extracted library, which should find the same
+        repeats
+        """
+        library = os.path.abspath(self.args.output)
+        fasta = os.path.abspath(self.args.compare)
+        masking = dict()
+        with tempfile.TemporaryDirectory(dir=os.path.dirname(library)) as tmp_dir:
+            for option in (["-species", self.args.species], ["-lib", library]):
+                output_dir = os.path.join(tmp_dir, option[0].lstrip("-"))
+                os.makedirs(output_dir)
+                subprocess.run(
+                    [
+                        os.path.join(self.repeatmasker_dir, "RepeatMasker"),
+                        "-engine",
+                        "ncbi",
+                        "-xsmall",
+                        "-pa",
+                        str(self.args.threads),
+                        *option,
+                        "-dir",
+                        output_dir,
+                        fasta,
+                    ],
+                    stdout=subprocess.DEVNULL,
+                    check=True,
+                )
+                masking[option[0]] = SpeciesLibrary.get_masking(
+                    output_dir, os.path.basename(fasta)
+                )
+                print(
+                    f"RepeatMasker {option[0]}: {masking[option[0]][0]} hits, {masking[option[0]][1]} masked bases"
+                )
+        if masking["-species"] != masking["-lib"]:
+            sys.exit(
+                f"Error: RepeatMasker -species '{self.args.species}' and -lib '{self.args.output}' mask '{self.args.compare}' differently"
+            )
+
+    def run(self):
+        if self.args.print_version:
+            print(self.get_version())
+            return
+        if not os.path.exists(self.args.output) or not self.args.compare:
+            self.extract()
+        if self.args.compare:
+            self.compare()
+
+
+def main():
+    parser = argparse.ArgumentParser(
+        description="Script to extract the RepeatMasker library of a species once, to pass to RepeatMasker with -lib",
+        formatter_class=RawTextHelpFormatter,
+        epilog="Example command:\n\t"
+        + script
+        + " --species Insecta --output species.lib.fa\n\t"
+        + script
+        + " --print_version\n\t"
+        + script
+        + " --species Insecta --output species.lib.fa --compare small_genome.fa\n\nContact:"
+        + __author__
+        + "("
+        + __email__
+        + ")",
+    )
+    parser.add_argument(
+        "--species",
+        help="Provide species name, as for RepeatMasker -species",
+    )
+    parser.add_argument(
+        "--output",
+        help="Provide output FASTA library",
+    )
+    parser.add_argument(
+        "--repeatmasker_dir",
+        help="Provide RepeatMasker installation directory (default: from RepeatMasker in PATH)",
+    )
+    parser.add_argument(
+        "--print_version",
+        action="store_true",
+        help="Print the RepeatMasker database version and exit (default: %(default)s)",
+    )
+    parser.add_argument(
+        "--compare",
+        help="Provide small genome FASTA to mask with RepeatMasker -species and with -lib of the --output library, exiting with an error if the hits or masked bases differ (default: %(default)s)",
+    )
+    parser.add_argument(
+        "-t",
+        "--threads",
+        default=1,
+        type=int,
+        help="Run RepeatMasker --compare with this many threads (default: %(default)s)",
+    )
+    profiling.add_argument(parser)
+    args = parser.parse_args()
+    if not args.print_version and not (args.species and args.output):
+        parser.error("--species and --output are required")
+
+    with profiling.profile(script, args):
+        SpeciesLibrary(args).run()
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,272 @@
+#!/usr/bin/env python3
+# -*- coding: utf-8 -*-
+"""
+Script to build a reproducible, length-stratified subsample of a genome FASTA
+"""
+
+# authorship
+__author__ = "Gemy George Kaithakottil"
+__maintainer__ = "Gemy George Kaithakottil"
+__email__ = "gemygk@gmail.com"
+
+# import libraries
+import argparse
+from argparse import RawTextHelpFormatter
+from collections import defaultdict
+import math
+import os
+import random
+import shutil
+import sys
+import logging
+
+from eirepeat.scripts import profiling
+
+# get script name
+script = os.path.basename(sys.argv[0])
+
+logging.basicConfig(
+    format="%(asctime)s - %(process)d - %(name)s - %(levelname)s - %(message)s",
+    datefmt="%d-%b-%y %H:%M:%S",
+    level=logging.DEBUG,
+)
+
+
+class SubsampleGenome:
+    @staticmethod
+    def get_stratum(length):
+        # sequences are stratified by order of magnitude of their length
+        return int(math.log10(length)) if length > 0 else 0
+
+    def __init__(self, args):
+        self.args = args
+        self.lengths = list()
+        self.total_length = 0
+        # sequence name to byte offset, line bases and line width, from the .fai
+        self.offsets = None
+
+    def process_fasta(self):
+        # first pass, only the sequence lengths are kept
+        name, length = None, 0
+        with open(self.args.fasta, "r") as fh:
+            for line in fh:
+                if line.startswith(">"):
+                    if name is not None:
+                        self.lengths.append((name, length))
+                    name, length = line[1:].split()[0], 0
+                else:
+                    length += len(line.rstrip())
+        if name is not None:
+            self.lengths.append((name, length))
+        self.total_length = sum(length for _, length in self.lengths)
+
+    def process_fai(self):
+        # the lengths and byte offsets are read from the genome index instead of scanning the FASTA
+        self.offsets = dict()
+        with open(self.args.fai, "r") as fh:
+            for line in fh:
+                name, length, offset, line_bases, line_width = line.split("\t")[:5]
+                self.lengths.append((name, int(length)))
+                self.offsets[name] = (int(offset), int(line_bases), int(line_width))
+        self.total_length = sum(length for _, length in self.lengths)
+
+    def get_units(self):
+        """
+        Split the genome into sampling units, whole sequences up to --window_size and windows of longer ones
+        :return: Dictionary of stratum to list of (sequence name, start, end)
+        """
+        units = defaultdict(list)
+        for name, length in self.lengths:
+            # nothing to sample, and no line length in the .fai to seek with
+            if not length:
+                continue
+            stratum = SubsampleGenome.get_stratum(length)
+            if length <= self.args.window_size:
+                units[stratum].append((name, 0, length))
+                continue
+            for start in range(0, length, self.args.window_size):
+                units[stratum].append(
+                    (name, start, min(start + self.args.window_size, length))
+                )
+        return units
+
+    def get_sample(self):
+        """
+        Sample every stratum in proportion to its share of the genome
+        :return: Dictionary of sequence name to sorted list of (start, end, stratum)
+        """
+        fraction = self.args.target_size / self.total_length
+        rng = random.Random(self.args.seed)
+        sample = defaultdict(list)
+        for stratum, units in sorted(self.get_units().items()):
+            budget = fraction * sum(end - start for _, start, end in units)
+            rng.shuffle(units)
+            sampled = 0
+            for name, start, end in units:
+                if sampled >= budget:
+                    break
+                sample[name].append((start, end, stratum))
+                sampled += end - start
+        for intervals in sample.values():
+            intervals.sort()
+        return sample
+
+    def print_manifest_header(self, fh):
+        print(
+            f"# seed={self.args.seed} target_size={self.args.target_size} window_size={self.args.window_size} genome_size={self.total_length}",
+            file=fh,
+        )
+        print("#sample_id\tsequence\tstart\tend\tlength\tstratum", file=fh)
+
+    def write_record(self, out, manifest, count, name, start, end, stratum, seq):
+        # short identifiers, RepeatModeler can fail on long FASTA headers
+        sample_id = f"sample{count}"
+        out.write(f">{sample_id}\n")
+        for i in range(0, len(seq), 60):
+            out.write(f"{seq[i : i + 60]}\n")
+        print(
+            f"{sample_id}\t{name}\t{start}\t{end}\t{end - start}\t{stratum}",
+            file=manifest,
+        )
+
+    def write_sample_by_offset(self, sample):
+        # only the sampled intervals are read, seeking to them with the .fai offsets
+        count = 0
+        with open(self.args.fasta, "rb") as fh, open(
+            self.args.output, "w"
+        ) as out, open(self.args.manifest, "w") as manifest:
+            self.print_manifest_header(manifest)
+            for name, _ in self.lengths:
+                offset, line_bases, line_width = self.offsets[name]
+                for start, end, stratum in sample.get(name, list()):
+                    first = (
+                        offset + start // line_bases * line_width + start % line_bases
+                    )
+                    last = offset + end // line_bases * line_width + end % line_bases
+                    fh.seek(first)
+                    seq = (
+                        fh.read(last - first)
+                        .decode()
+                        .replace("\n", "")
+                        .replace("\r", "")
+                    )
+                    count += 1
+                    self.write_record(
+                        out, manifest, count, name, start, end, stratum, seq
+                    )
+        return count
+
+    def write_sample(self, sample):
+        # second pass, the sampled intervals are written out as they stream past
+        count = 0
+        with open(self.args.fasta, "r") as fh, open(self.args.output, "w") as out, open(
+            self.args.manifest, "w"
+        ) as manifest:
+            self.print_manifest_header(manifest)
+            intervals, position, buffer, name = list(), 0, list(), None
+            for line in fh:
+                if line.startswith(">"):
+                    name = line[1:].split()[0]
+                    intervals, position, buffer = (
+                        list(sample.get(name, list())),
+                        0,
+                        list(),
+                    )
+                    continue
+                line = line.rstrip()
+                line_start, position = position, position + len(line)
+                while intervals and intervals[0][0] < position:
+                    start, end, stratum = intervals[0]
+                    buffer.append(line[max(start - line_start, 0) : end - line_start])
+                    if end > position:
+                        break
+                    count += 1
+                    self.write_record(
+                        out, manifest, count, name, start, end, stratum, "".join(buffer)
+                    )
+                    intervals.pop(0)
+                    buffer = list()
+        return count
+
+    def run(self):
+        with profiling.phase("process_fasta"):
+            if self.args.fai:
+                self.process_fai()
+            else:
+                self.process_fasta()
+        if self.total_length <= self.args.target_size:
+            logging.info(
+                f"Genome size {self.total_length} is within the target size {self.args.target_size}, using the full genome"
+            )
+            shutil.copyfile(self.args.fasta, self.args.output)
+            with open(self.args.manifest, "w") as manifest:
+                self.print_manifest_header(manifest)
+                for name, length in self.lengths:
+                    print(
+                        f"{name}\t{name}\t0\t{length}\t{length}\t{SubsampleGenome.get_stratum(length)}",
+                        file=manifest,
+                    )
+            return
+        with profiling.phase("get_sample"):
+            sample = self.get_sample()
+        with profiling.phase("write_sample"):
+            if self.args.fai:
+                count = self.write_sample_by_offset(sample)
+            else:
+                count = self.write_sample(sample)
+        sampled = sum(end - start for v in sample.values() for start, end, _ in v)
+        logging.info(
+            f"Sampled {count} sequences and windows, {sampled} of {self.total_length} bp"
+        )
+
+
+def main():
+    parser = argparse.ArgumentParser(
+        description="Script to build a reproducible, length-stratified subsample of a genome FASTA",
+        formatter_class=RawTextHelpFormatter,
+        epilog="Example command:\n\t"
+        + script
+        + " genome.fa --fai genome.fa.fai --target_size 3000000000 --output subsample/genome.fa --manifest subsample/manifest.tsv\n\nContact:"
+        + __author__
+        + "("
+        + __email__
+        + ")",
+    )
+    parser.add_argument("fasta", help="Provide genome FASTA")
+    parser.add_argument(
+        "--target_size",
+        type=int,
+        required=True,
+        help="Provide target subsample size in bp",
+    )
+    parser.add_argument(
+        "--window_size",
+        type=int,
+        default=1000000,
+        help="Provide window size in bp, longer sequences are sampled in windows of this size (default: %(default)s)",
+    )
+    parser.add_argument(
+        "--seed",
+        type=int,
+        default=7,
+        help="Provide random seed (default: %(default)s)",
+    )
+    parser.add_argument("--output", required=True, help="Provide output FASTA")
+    parser.add_argument(
+        "--manifest",
+        required=True,
+        help="Provide output TSV of the sampled sequences and windows",
+    )
+    parser.add_argument(
+        "--fai",
+        help="Provide .fai index of the genome FASTA, to read the sampled intervals by offset instead of streaming the genome twice (default: %(default)s)",
+    )
+    profiling.add_argument(parser)
+    args = parser.parse_args()
+
+    with profiling.profile(script, args):
+        SubsampleGenome(args).run()
+
+
+if __name__ == "__main__":
+    main()
@@ -24,7 +24,7 @@ setup(
     ],
     entry_points={"console_scripts": ["eirepeat = eirepeat.__main__:main"]},
     install_requires=requirements,
-    packages=find_packages(".", exclude=["tests"]),
+    packages=find_packages(".", exclude=["tests", "benchmarks", "benchmarks.*"]),
     scripts=[script for script in glob.glob("eirepeat/scripts/*")],
     package_data={
         "eirepeat.workflow": ["Snakefile"],
@@ -0,0 +1,78 @@
+import os
+from argparse import Namespace
+
+from eirepeat.scripts.artifact_cache import ArtifactCache
+
+
+def get_cache(cache, command, **kwargs):
+    return ArtifactCache(Namespace(cache=str(cache), command=command, **kwargs))
+
+
+def test_key_is_by_content_and_params(tmp_path):
+    (tmp_path / "a.fa").write_text(">s\nACGT\n")
+    (tmp_path / "b.fa").write_text(">s\nACGT\n")
+    key = ArtifactCache.get_key([str(tmp_path / "a.fa")], "-engine ncbi  -srand 7")
+    # a copied input and reformatted parameters give the same key
+    assert key == ArtifactCache.get_key(
+        [str(tmp_path / "b.fa")], "-engine ncbi -srand 7"
+    )
+    assert key != ArtifactCache.get_key([str(tmp_path / "a.fa")], "-engine ncbi")
+
+
+def test_store_and_restore_copies(tmp_path):
+    cache, index = tmp_path / "cache", tmp_path / "index"
+    index.mkdir()
+    (index / "families.fa").write_text(">rnd-1\nACGT\n")
+    key = "ab" + "0" * 62
+    store = get_cache(
+        cache,
+        "store",
+        key=key,
+        output_dir=str(index),
+        files=["families.fa"],
+        max_size=1,
+    )
+    assert store.run() == 0
+    assert (cache / "ab" / key / "families.fa").exists()
+    assert not [p for p in (cache / "ab").iterdir() if p.name.startswith(".")]
+
+    restored = tmp_path / "restored"
+    restore = get_cache(cache, "restore", key=key, output_dir=str(restored))
+    assert restore.run() == 0
+    assert (restored / "families.fa").read_text() == ">rnd-1\nACGT\n"
+    # an in-place write to a restored output leaves the cached file as it was
+    assert not os.path.samefile(
+        restored / "families.fa", cache / "ab" / key / "families.fa"
+    )
+    with open(restored / "families.fa", "a") as fh:
+        fh.write(">rnd-2\nTTTT\n")
+    assert (cache / "ab" / key / "families.fa").read_text() == ">rnd-1\nACGT\n"
+
+    miss = get_cache(cache, "restore", key="cd" + "0" * 62, output_dir=str(restored))
+    assert miss.run() == 1
+
+
+def test_evict_least_recently_used(tmp_path):
+    cache, outputs = tmp_path / "cache", tmp_path / "outputs"
+    outputs.mkdir()
+    (outputs / "db.nsq").write_bytes(b"x" * 1000)
+    keys = [f"{i:02d}" + "0" * 62 for i in range(3)]
+    for last_used, key in enumerate(keys):
+        get_cache(
+            cache,
+            "store",
+            key=key,
+            output_dir=str(outputs),
+            files=["db.nsq"],
+            max_size=1,
+        ).run()
+        os.utime(cache / key[:2] / key, (last_used, last_used))
+    # restoring marks the oldest entry as used
+    get_cache(
+        cache, "restore", key=keys[0], output_dir=str(tmp_path / "restored")
+    ).run()
+    get_cache(cache, "evict", max_size=2500 / 1024**3).run()
+    assert sorted(key for key in keys if (cache / key[:2] / key).exists()) == [
+        keys[0],
+        keys[2],
+    ]
@@ -0,0 +1,176 @@
+import json
+import os
+from argparse import Namespace
+
+import pytest
+
+from benchmarks.fake_tools import FakeTool, write_fasta
+from benchmarks.generators import SyntheticRepeats
+from benchmarks.run_benchmarks import BENCHMARKS, RunBenchmarks
+from benchmarks.run_pipeline import RunPipeline
+from eirepeat.scripts.gather_hits import GatherHits
+from eirepeat.scripts.red_rpt_to_GFF3 import REDToGFF3
+from eirepeat.scripts.repeatmasker_to_GFF3 import RepeatMakerToGFF3
+
+
+def read(path):
+    with open(path, "r") as fh:
+        return fh.read()
+
+
+def test_generators_are_seeded(tmp_path):
+    first = SyntheticRepeats(500, scaffolds=20, seed=1).write_all(tmp_path / "a")
+    second = SyntheticRepeats(500, scaffolds=20, seed=1).write_all(tmp_path / "b")
+    other = SyntheticRepeats(500, scaffolds=20, seed=2).write_all(tmp_path / "c")
+    for name in first:
+        assert read(first[name]) == read(second[name])
+    assert read(first["gff3"]) != read(other["gff3"])
+
+
+@pytest.mark.parametrize("overlap", [0, 0.5])
+def test_repeats_fit_the_scaffolds(overlap):
+    repeats = SyntheticRepeats(2000, scaffolds=30, overlap=overlap)
+    records = list(repeats.get_repeats())
+    assert len(records) == 2000
+    overlapping = 0
+    for previous, (name, start, end, *_) in zip([None] + records, records):
+        assert 1 <= start <= end <= repeats.sizes[name]
+        if previous and previous[0] == name and start <= previous[2]:
+            overlapping += 1
+    assert (overlapping > 500) == (overlap > 0)
+
+
+def test_every_benchmark_runs(tmp_path):
+    output = tmp_path / "results.json"
+    args = Namespace(
+        records=[200],
+        scaffolds=10,
+        scaffold_size=5000,
+        overlap=0.2,
+        seed=7,
+        only=None,
+        repeat=1,
+        output=str(output),
+        baseline=None,
+        tolerance=0.2,
+        tmpdir=str(tmp_path),
+    )
+    assert RunBenchmarks(args).run() == 0
+    results = json.loads(output.read_text())
+    assert [r["name"] for r in results["results"]] == list(BENCHMARKS)
+    assert all(r["records"] == 200 and r["seconds"] >= 0 for r in results["results"])
+
+    # a much faster baseline is reported as a regression
+    for result in results["results"]:
+        result["seconds"] = 1e-9
+    output.write_text(json.dumps(results))
+    args.only, args.output, args.baseline = ["merge_repeats"], None, str(output)
+    assert RunBenchmarks(args).run() == 1
+
+
+def test_compare_against_baseline():
+    baseline = {
+        "results": [
+            {"name": "a", "records": 10, "seconds": 1.0, "peak_memory_mb": 10},
+            {"name": "b", "records": 10, "seconds": 1.0, "peak_memory_mb": 10},
+        ]
+    }
+    results = {
+        "results": [
+            {"name": "a", "records": 10, "seconds": 1.1, "peak_memory_mb": 15},
+            {"name": "b", "records": 100, "seconds": 9.0, "peak_memory_mb": 90},
+        ]
+    }
+    assert RunBenchmarks.compare(results, baseline, 0.2) == [
+        ("a", 10, "peak_memory_mb", 10, 15)
+    ]
+
+
+def test_fake_tool_outputs_are_read_by_the_scripts(tmp_path, monkeypatch):
+    monkeypatch.chdir(tmp_path)
+    genome = SyntheticRepeats(0, scaffolds=5, scaffold_size=2000)
+    genome.write_fasta("genome.fa")
+    config = {"records": 300, "families": 20, "log": str(tmp_path / "tools.log")}
+
+    def run(tool, *args):
+        FakeTool(tool, list(args), config).run()
+
+    run("RepeatMasker", "-engine", "ncbi", "-xsmall", "-gff", "-dir", ".", "genome.fa")
+    with open("genome.fa.out.gff", "r") as fh:
+        RepeatMakerToGFF3(
+            Namespace(
+                repeatmasker_out_gff=fh, output_gff="rm.gff3", source=None, tag="RM"
+            )
+        ).run()
+    assert (tmp_path / "rm.gff3").read_text().count("\tmatch\t") == 300
+    masked = (tmp_path / "genome.fa.masked").read_text()
+    assert masked.count(">") == 5 and any(c.islower() for c in masked)
+
+    os.makedirs("gnm")
+    os.makedirs("rpt")
+    os.makedirs("msk")
+    os.symlink(tmp_path / "genome.fa", "gnm/genome.fa")
+    run("Red", "-gnm", "gnm", "-rpt", "rpt", "-msk", "msk")
+    with open("rpt/genome.rpt", "r") as fh:
+        REDToGFF3(
+            Namespace(
+                red_rpk=fh,
+                output_bed="red.bed",
+                output_gff="red.gff3",
+                source="red",
+                tag="red",
+            )
+        ).run()
+    assert len((tmp_path / "red.bed").read_text().splitlines()) == 300
+
+    write_fasta([(f"cds_{i}", "ACGT" * 100) for i in range(50)], "chunk-1.txt")
+    run("transposonPSI.pl", "chunk-1.txt", "nuc")
+    write_fasta([("rnd-1_family-1#Unknown", "ACGT" * 50)], "unknown.fa")
+    write_fasta([("chloroplast", "ACGT" * 500)], "organellar.fa")
+    run("makeblastdb", "-dbtype", "nucl", "-in", "organellar.fa")
+    run("blastn", "-query", "unknown.fa", "-db", "organellar.fa", "-out", "hits.tsv")
+    for hits, hits_format in (
+        ("chunk-1.txt.TPSI.allHits", "transposonpsi"),
+        ("hits.tsv", "blast"),
+    ):
+        GatherHits(
+            Namespace(hits=[hits], format=hits_format, output=f"{hits}.bed")
+        ).run()
+    assert (tmp_path / "chunk-1.txt.TPSI.allHits.bed").read_text()
+    assert os.path.exists("organellar.fa.nsq")
+    # one line per tool run
+    assert len((tmp_path / "tools.log").read_text().splitlines()) == 5
+
+
+def test_union_of_tool_runs():
+    assert RunPipeline.get_union_seconds([]) == 0
+    assert RunPipeline.get_union_seconds([(0, 2), (1, 3), (5, 6), (5.5, 5.7)]) == 4
+
+
+def test_pipeline_runs_with_fake_tools(tmp_path):
+    args = Namespace(
+        modes=["run1"],
+        records=200,
+        scaffolds=5,
+        scaffold_size=5000,
+        overlap=0.2,
+        seed=7,
+        close_reference_count=10,
+        families=10,
+        species="Insecta",
+        tool_seconds=0,
+        seconds_per_tool=["RepeatModeler=0.5"],
+        cores=2,
+        memory=10**6,
+        output=str(tmp_path / "pipeline.json"),
+        baseline=None,
+        tolerance=0.2,
+        workdir=str(tmp_path / "work"),
+        tmpdir=None,
+    )
+    assert RunPipeline(args).run() == 0
+    (result,) = json.loads((tmp_path / "pipeline.json").read_text())["results"]
+    assert result["jobs"] == 14
+    assert result["tools"]["RepeatModeler"]["seconds"] >= 0.5
+    assert result["wall_seconds"] >= result["tool_seconds"] >= 0.5
+    assert (tmp_path / "work" / "run1" / "eirepeat.completed.txt").exists()
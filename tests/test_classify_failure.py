@@ -0,0 +1,102 @@
+import json
+import subprocess
+import sys
+from argparse import Namespace
+
+import pytest
+
+from eirepeat.scripts.classify_failure import ClassifyFailure
+from eirepeat.scripts.hpc_config import HpcConfig
+
+
+@pytest.mark.parametrize(
+    "exit_code, failure", [(137, "memory"), (140, "time"), (143, "time"), (1, "tool")]
+)
+def test_exit_codes(tmp_path, exit_code, failure):
+    assert ClassifyFailure.classify(exit_code, str(tmp_path / "missing.log")) == failure
+
+
+@pytest.mark.parametrize(
+    "line, failure",
+    [
+        ("slurmstepd: error: Detected 1 oom-kill event(s)", "memory"),
+        ("terminate called after throwing an instance of 'std::bad_alloc'", "memory"),
+        ("\tCommand terminated by signal 9", "memory"),
+        (
+            "slurmstepd: error: *** JOB 42 CANCELLED AT 2023 DUE TO TIME LIMIT ***",
+            "time",
+        ),
+        ("\tCommand terminated by signal 15", "time"),
+        ("Error: cannot open file genome.fa", "tool"),
+    ],
+)
+def test_log_patterns(tmp_path, line, failure):
+    log = tmp_path / "rule.log"
+    log.write_text(f"running\n{line}\n")
+    assert ClassifyFailure.classify(1, str(log)) == failure
+
+
+def run(command, log, **kwargs):
+    return ClassifyFailure(Namespace(command=command, log=str(log), **kwargs)).run()
+
+
+def test_check_only_retries_resource_failures(tmp_path):
+    log = tmp_path / "RepeatModeler.log"
+    log.write_text("Command terminated by signal 9\n")
+    assert run("record", log, exit_code=1) == 1
+    assert (tmp_path / "RepeatModeler.log.failure").read_text() == "memory\n"
+    assert run("check", log, attempt=2) == 0
+
+    log.write_text("Error: cannot open file genome.fa\n")
+    assert run("record", log, exit_code=2) == 1
+    assert run("check", log, attempt=3) == 1
+
+    # an attempt killed by the scheduler before recording is retried, a new run starts clean
+    (tmp_path / "RepeatModeler.log.failure").unlink()
+    assert run("check", log, attempt=2) == 0
+    log.write_text("Error\n")
+    run("record", log, exit_code=2)
+    assert run("check", log, attempt=1) == 0
+    assert not (tmp_path / "RepeatModeler.log.failure").exists()
+
+
+def test_resources_escalate_by_attempt(tmp_path):
+    hpc_config = tmp_path / "hpc_config.json"
+    hpc_config.write_text(
+        json.dumps(
+            {
+                "__default__": {"memory": 1000, "partition": "long"},
+                "__partitions__": {"long": {"memory": 5000}},
+                "RepeatModeler": {
+                    "memory": 1000,
+                    "time": 60,
+                    "retry": {"attempts": 3, "multiplier": 2, "max_time": 200},
+                },
+            }
+        )
+    )
+    config = HpcConfig(str(hpc_config))
+    assert config.get_retries("RepeatModeler") == 3
+    assert config.get_retries("clean_genome") == 0
+    # capped by the partition memory and the policy max_time
+    assert [config.get_memory("RepeatModeler", attempt=a) for a in (1, 2, 3, 4)] == [
+        1000,
+        2000,
+        4000,
+        5000,
+    ]
+    assert [config.get_time("RepeatModeler", attempt=a) for a in (1, 2, 3)] == [
+        60,
+        120,
+        200,
+    ]
+    assert config.get_memory("clean_genome", attempt=3) == 1000
+
+
+def test_command_line_exit_codes(tmp_path):
+    log = tmp_path / "rule.log"
+    log.write_text("Error\n")
+    script = [sys.executable, "-m", "eirepeat.scripts.classify_failure"]
+    record = subprocess.run(script + ["record", "--exit_code", "2", str(log)])
+    check = subprocess.run(script + ["check", "--attempt", "2", str(log)])
+    assert (record.returncode, check.returncode) == (1, 1)
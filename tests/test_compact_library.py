@@ -0,0 +1,90 @@
+import random
+from argparse import Namespace
+
+import pytest
+
+from eirepeat.scripts.compact_library import CompactLibrary
+
+
+def mutate(seq, rate, rng):
+    return "".join(
+        rng.choice([b for b in "ACGT" if b != base]) if rng.random() < rate else base
+        for base in seq
+    )
+
+
+def compact(tmp_path, records):
+    fasta = tmp_path / "families.fa"
+    fasta.write_text("".join(f">{name} (family)\n{seq}\n" for name, seq in records))
+    args = Namespace(
+        fasta=str(fasta),
+        output=str(tmp_path / "compact.fa"),
+        report=str(tmp_path / "collapsed.tsv"),
+        min_identity=0.98,
+        kmer_size=15,
+        sketch_size=512,
+        processes=1,
+    )
+    CompactLibrary(args).run()
+    kept = [
+        line[1:].split()[0]
+        for line in (tmp_path / "compact.fa").read_text().splitlines()
+        if line.startswith(">")
+    ]
+    collapsed = {
+        line.split("\t")[0]: line.split("\t")[1]
+        for line in (tmp_path / "collapsed.tsv").read_text().splitlines()[1:]
+    }
+    return kept, collapsed
+
+
+def test_identity_jaccard_roundtrip():
+    jaccard = CompactLibrary.identity_to_jaccard(0.98, 15)
+    assert CompactLibrary.jaccard_to_identity(jaccard, 15) == pytest.approx(0.98)
+    assert CompactLibrary.get_class("rnd-1_family-5#LINE/L1") == "LINE/L1"
+    assert CompactLibrary.get_class("rnd-1_family-5") == ""
+
+
+def test_near_duplicates_collapse_and_distant_variants_survive(tmp_path):
+    rng = random.Random(7)
+    line = "".join(rng.choice("ACGT") for _ in range(2000))
+    records = [
+        ("rnd-1_family-1#LINE/L1", line),
+        # a shorter near-identical copy, and a single substitution
+        ("rnd-1_family-2#LINE/L1", line[100:1900]),
+        (
+            "rnd-1_family-3#LINE/L1",
+            line[:999] + mutate(line[999], 1, rng) + line[1000:],
+        ),
+        # 10% divergent, a different subfamily
+        ("rnd-1_family-4#LINE/L1", mutate(line, 0.1, rng)),
+        ("rnd-1_family-5#DNA/hAT", "".join(rng.choice("ACGT") for _ in range(500))),
+    ]
+    kept, collapsed = compact(tmp_path, records)
+    assert kept == [
+        "rnd-1_family-1#LINE/L1",
+        "rnd-1_family-4#LINE/L1",
+        "rnd-1_family-5#DNA/hAT",
+    ]
+    assert collapsed == {
+        "rnd-1_family-2#LINE/L1": "rnd-1_family-1#LINE/L1",
+        "rnd-1_family-3#LINE/L1": "rnd-1_family-1#LINE/L1",
+    }
+
+
+def test_identical_consensi_of_other_classes_are_kept(tmp_path):
+    rng = random.Random(11)
+    seq = "".join(rng.choice("ACGT") for _ in range(1000))
+    records = [
+        ("rnd-1_family-1#LTR/Gypsy", seq),
+        ("rnd-1_family-2#LTR/Copia", seq),
+        ("rnd-1_family-3#Unknown", seq[:900]),
+        ("rnd-1_family-4#LTR/Gypsy", seq[50:]),
+    ]
+    kept, collapsed = compact(tmp_path, records)
+    assert kept == [
+        "rnd-1_family-1#LTR/Gypsy",
+        "rnd-1_family-2#LTR/Copia",
+        "rnd-1_family-3#Unknown",
+    ]
+    assert collapsed == {"rnd-1_family-4#LTR/Gypsy": "rnd-1_family-1#LTR/Gypsy"}
@@ -0,0 +1,96 @@
+import os
+from argparse import Namespace
+
+from eirepeat.scripts import content_manifest
+from eirepeat.scripts.content_manifest import ContentManifest
+
+
+def get_manifest(manifest_dir, command, inputs, outputs, params=""):
+    return ContentManifest(
+        Namespace(
+            manifest_dir=str(manifest_dir),
+            command=command,
+            inputs=[str(f) for f in inputs],
+            outputs=[str(f) for f in outputs],
+            params=params,
+        )
+    )
+
+
+def record(manifest_dir, inputs, outputs, params=""):
+    return get_manifest(manifest_dir, "record", inputs, outputs, params).run()
+
+
+def restore(manifest_dir, inputs, outputs, params=""):
+    return get_manifest(manifest_dir, "restore", inputs, outputs, params).run()
+
+
+def test_restores_the_outputs_of_unchanged_inputs(tmp_path):
+    manifest_dir = tmp_path / ".manifest"
+    genome, gff = tmp_path / "genome.fa", tmp_path / "out" / "repeats.gff"
+    genome.write_text(">s\nACGT\n")
+    gff.parent.mkdir()
+    gff.write_text("s\tRM\trepeat\t1\t4\n")
+    assert restore(manifest_dir, [genome], [gff]) == 1
+    assert record(manifest_dir, [genome], [gff], "-pa 4") == 0
+    assert (tmp_path / ".manifest" / ".lock").exists()
+
+    gff.unlink()
+    assert restore(manifest_dir, [genome], [gff], "-pa 4") == 0
+    assert gff.read_text() == "s\tRM\trepeat\t1\t4\n"
+    # other parameters or input content rerun the rule
+    assert restore(manifest_dir, [genome], [gff], "-pa 8") == 1
+    genome.write_text(">s\nACGA\n")
+    assert restore(manifest_dir, [genome], [gff], "-pa 4") == 1
+
+
+def test_small_outputs_are_restored_as_separate_files(tmp_path):
+    manifest_dir = tmp_path / ".manifest"
+    genome = tmp_path / "genome.fa"
+    genome.write_text(">s\nACGT\n")
+    low, interspersed = tmp_path / "low.completed", tmp_path / "interspersed.completed"
+    low.touch()
+    interspersed.touch()
+    assert record(manifest_dir, [genome], [low]) == 0
+    assert record(manifest_dir, [genome], [interspersed]) == 0
+
+    low.unlink()
+    interspersed.unlink()
+    assert restore(manifest_dir, [genome], [low]) == 0
+    assert restore(manifest_dir, [genome], [interspersed]) == 0
+    # identical empty markers share no inode with each other or the objects, touching one leaves the other alone
+    assert not os.path.samefile(low, interspersed)
+    os.utime(low, ns=(0, 0))
+    assert os.stat(interspersed).st_mtime_ns != 0
+
+
+def test_large_outputs_are_hardlinked(tmp_path, monkeypatch):
+    monkeypatch.setattr(content_manifest, "LINK_MIN_SIZE", 4)
+    manifest_dir = tmp_path / ".manifest"
+    genome, gff = tmp_path / "genome.fa", tmp_path / "repeats.gff"
+    genome.write_text(">s\nACGT\n")
+    gff.write_text("s\tRM\trepeat\t1\t4\n")
+    assert record(manifest_dir, [genome], [gff]) == 0
+    (obj,) = (manifest_dir / "objects").iterdir()
+    assert os.path.samefile(obj, gff)
+
+
+def test_prune_keeps_only_referenced_objects(tmp_path):
+    manifest_dir = tmp_path / ".manifest"
+    genome, gff, bed = tmp_path / "genome.fa", tmp_path / "a.gff", tmp_path / "a.bed"
+    genome.write_text(">s\nACGT\n")
+    gff.write_text("first\n")
+    bed.write_text("bed\n")
+    assert record(manifest_dir, [genome], [gff]) == 0
+    assert record(manifest_dir, [genome], [bed]) == 0
+    objects = manifest_dir / "objects"
+    first = {p.name for p in objects.iterdir()}
+    assert len(first) == 2
+
+    # rerunning a rule replaces its output, the object of the old content goes
+    gff.write_text("second\n")
+    assert record(manifest_dir, [genome], [gff]) == 0
+    second = {p.name for p in objects.iterdir()}
+    assert len(second) == 2
+    assert len(first & second) == 1
+    assert restore(manifest_dir, [genome], [bed]) == 0
@@ -0,0 +1,68 @@
+import json
+
+import pytest
+
+from eirepeat.scripts.critical_path import CriticalPath
+
+
+def test_runtimes_of_multi_job_rules_are_per_job(tmp_path):
+    runtimes_file = tmp_path / "eirepeat.telemetry.json"
+    runtimes_file.write_text(
+        json.dumps(
+            {
+                "transposonpsi": {
+                    "wall_clock_seconds": 36000,
+                    "jobs": 10,
+                    "max_job_wall_clock_seconds": 3600,
+                },
+                "clean_genome": {"wall_clock_seconds": 1800},
+                "red": 7200,
+            }
+        )
+    )
+    runtimes = CriticalPath.load_runtimes(str(runtimes_file))
+    assert runtimes == {
+        "transposonpsi": pytest.approx(1),
+        "clean_genome": pytest.approx(0.5),
+        "red": pytest.approx(2),
+    }
+    assert CriticalPath.load_runtimes(str(tmp_path / "missing.json")) == {}
+
+
+def get_critical_path():
+    # mask -> repeatmodeler -> repeatmasker -> gff, and a short mask -> red -> gff
+    graph = {
+        "mask": set(),
+        "repeatmodeler": {"mask"},
+        "red": {"mask"},
+        "repeatmasker": {"repeatmodeler"},
+        "gff": {"repeatmasker", "red"},
+    }
+    costs = {"mask": 0.1, "repeatmodeler": 20, "red": 0.25, "repeatmasker": 2, "gff": 0}
+    return CriticalPath(graph, costs)
+
+
+def test_critical_path_is_the_longest_chain():
+    critical_path = get_critical_path()
+    assert critical_path.get_critical_path() == [
+        "mask",
+        "repeatmodeler",
+        "repeatmasker",
+        "gff",
+    ]
+    assert critical_path.get_path_length("mask") == pytest.approx(22.1)
+    assert critical_path.get_path_length("red") == pytest.approx(0.25)
+
+
+def test_priorities_order_rules_under_an_hour():
+    priorities = get_critical_path().get_priorities()
+    assert priorities == {
+        "mask": 1326,
+        "repeatmodeler": 1320,
+        "red": 15,
+        "repeatmasker": 120,
+        "gff": 0,
+    }
+    # short rules are still ordered apart from the end of the workflow
+    short = CriticalPath({"a": set(), "b": {"a"}}, {"a": 0.2, "b": 0.3})
+    assert short.get_priorities() == {"a": 30, "b": 18}
@@ -0,0 +1,78 @@
+import json
+import subprocess
+import sys
+from argparse import Namespace
+
+from eirepeat import DEFAULT_HPC_CONFIG_FILE
+
+
+def get_rule_block(output, rulename):
+    block = output.split(f"rule {rulename}:\n", 1)[1]
+    return block.split("\n\n", 1)[0]
+
+
+def dry_run(run_config, *args):
+    return subprocess.run(
+        [sys.executable, "-m", "eirepeat", "run", str(run_config), "-np"]
+        + ["--executor", "local", "--cores", "32", "--memory", "100000"]
+        + list(args),
+        check=True,
+        capture_output=True,
+        text=True,
+    ).stdout
+
+
+def test_run_uses_the_hpc_config_it_is_given(tmp_path):
+    (tmp_path / "genome.fa").write_text(">scaffold1\n" + "ACGT" * 50 + "\n")
+    subprocess.run(
+        [sys.executable, "-m", "eirepeat", "configure", str(tmp_path / "genome.fa")]
+        + ["--species", "Insecta", "-o", str(tmp_path / "run")],
+        check=True,
+        stdout=subprocess.DEVNULL,
+    )
+    with open(DEFAULT_HPC_CONFIG_FILE, "r") as fh:
+        hpc_config = json.load(fh)
+    hpc_config["RepeatMasker_low"].update(cores=7, memory=12345)
+    (tmp_path / "custom.json").write_text(json.dumps(hpc_config))
+
+    run_config = tmp_path / "run" / "run_config.yaml"
+    block = get_rule_block(dry_run(run_config), "RepeatMasker_low")
+    assert "threads: 7" not in block
+    assert "mem_mb=12345" not in block
+    block = get_rule_block(
+        dry_run(run_config, "--hpc_config", str(tmp_path / "custom.json")),
+        "RepeatMasker_low",
+    )
+    assert "threads: 7" in block
+    assert "mem_mb=12345," in block
+
+
+def test_restarts_and_rule_retries_come_from_one_hpc_config(tmp_path):
+    from eirepeat.__main__ import EIRepeat
+
+    with open(DEFAULT_HPC_CONFIG_FILE, "r") as fh:
+        hpc_config = json.load(fh)
+    hpc_config["__default__"]["retry"]["attempts"] = 3
+    (tmp_path / "custom.json").write_text(json.dumps(hpc_config))
+    (tmp_path / "run_config.yaml").write_text(
+        "jira: {jira_id: null}\noutput: out\nspecies: Insecta\nrun_red_repeats: false\n"
+        "logs: out/logs\nprefix: {index_name: genome.fa}\n"
+    )
+    args = Namespace(
+        run_config=str(tmp_path / "run_config.yaml"),
+        hpc_config=str(tmp_path / "custom.json"),
+        jobs=1,
+        latency_wait=1,
+        no_posting=True,
+        verbose=False,
+        exclude_hosts=False,
+        dry_run=True,
+        executor="local",
+        cores=1,
+        memory=1000,
+        metrics_file=None,
+        metrics_interval=60,
+    )
+    cmd = EIRepeat(args).get_command()
+    assert f" hpc_config={tmp_path / 'custom.json'} " in cmd
+    assert " --restart-times 3 " in cmd
@@ -0,0 +1,172 @@
+import gzip
+import json
+from argparse import Namespace
+
+import pytest
+
+import eirepeat.scripts.fasta_stats as fasta_stats
+from eirepeat.scripts.fasta_stats import FastaStats
+from eirepeat import DEFAULT_HPC_CONFIG_FILE
+from eirepeat.scripts.hpc_config import HpcConfig
+from eirepeat.scripts.subsample_genome import SubsampleGenome
+
+FASTA = b">scaffold1 description\nACGTACGTAC\nACG\n>scaffold2\nACGTA\n>scaffold1\n\n>scaffold3\r\nAC\r\nGT"
+
+
+def scan(path):
+    stats = FastaStats(Namespace(fasta=str(path)))
+    stats.process_fasta()
+    return stats
+
+
+def get_lines(data):
+    # the .fai records, computed line by line
+    records, offset = list(), 0
+    for line in data.splitlines(keepends=True):
+        if line.startswith(b">"):
+            records.append([line[1:].split()[0].decode(), 0, offset + len(line), 0, 0])
+        elif not records[-1][3]:
+            records[-1][1:] = [
+                len(line.rstrip()),
+                records[-1][2],
+                len(line.rstrip()),
+                len(line),
+            ]
+        else:
+            records[-1][1] += len(line.rstrip())
+        offset += len(line)
+    return records
+
+
+@pytest.mark.parametrize("block_size", [1, 2, 7, 1024])
+def test_scan_across_blocks(tmp_path, monkeypatch, block_size):
+    monkeypatch.setattr(fasta_stats, "BLOCK_SIZE", block_size)
+    path = tmp_path / "genome.fa"
+    path.write_bytes(FASTA)
+    assert scan(path).records == get_lines(FASTA)
+
+
+def test_stats_and_fai(tmp_path):
+    path = tmp_path / "genome.fa.gz"
+    with gzip.open(path, "wb") as fh:
+        fh.write(FASTA)
+    stats = scan(path)
+    assert stats.get_stats() == {
+        "fasta": str(path),
+        "total_length": 22,
+        "sequence_count": 4,
+        "n50": 13,
+        "max_length": 13,
+        "max_header_length": 9,
+        "duplicate_ids": ["scaffold1"],
+        "duplicate_id_count": 1,
+    }
+    stats.write_fai(tmp_path / "genome.fa.fai")
+    assert (tmp_path / "genome.fa.fai").read_text().splitlines()[:2] == [
+        "scaffold1\t13\t23\t10\t11",
+        "scaffold2\t5\t49\t5\t6",
+    ]
+    stats.write_bed(tmp_path / "genome.bed")
+    assert (tmp_path / "genome.bed").read_text().splitlines()[:2] == [
+        "scaffold1\t0\t13",
+        "scaffold2\t0\t5",
+    ]
+
+
+def test_subsample_by_offset(tmp_path):
+    # sequences of different lengths and line widths, sampled in windows
+    with open(tmp_path / "genome.fa", "w") as fh:
+        for i, (length, width) in enumerate([(5000, 60), (1234, 50), (80, 60)]):
+            seq = "".join("ACGT"[(i + j * j) % 4] for j in range(length))
+            fh.write(f">seq{i} description\n")
+            for j in range(0, length, width):
+                fh.write(seq[j : j + width] + "\n")
+    stats = scan(tmp_path / "genome.fa")
+    stats.write_fai(tmp_path / "genome.fa.fai")
+    outputs = list()
+    for fai in (None, str(tmp_path / "genome.fa.fai")):
+        output = tmp_path / f"subsample.{bool(fai)}.fa"
+        manifest = tmp_path / f"subsample.{bool(fai)}.tsv"
+        args = Namespace(
+            fasta=str(tmp_path / "genome.fa"),
+            fai=fai,
+            target_size=2000,
+            window_size=300,
+            seed=7,
+            output=str(output),
+            manifest=str(manifest),
+        )
+        SubsampleGenome(args).run()
+        outputs.append((output.read_text(), manifest.read_text()))
+    # seeking with the .fai offsets writes the same subsample as streaming the genome
+    assert outputs[0] == outputs[1]
+    assert outputs[0][0].count(">") > 1
+
+
+def test_resources_scale_with_default_stats(tmp_path):
+    hpc_config = tmp_path / "hpc_config.json"
+    hpc_config.write_text(
+        json.dumps(
+            {
+                "__default__": {"memory": 1000, "partition": "short"},
+                "RepeatModeler": {"memory": {"base": 1000, "per_gb": 2000}},
+            }
+        )
+    )
+    stats_file = str(tmp_path / "genome.fa.stats.json")
+    default_stats = {"total_length": 2e9, "sequence_count": 10}
+    config = HpcConfig(str(hpc_config), default_stats)
+    # until the genome stats file is written
+    assert config.get_memory("RepeatModeler", stats_file) == 5000
+    assert config.get_memory("RepeatModeler") == 1000
+    with open(stats_file, "w") as fh:
+        json.dump({"total_length": 1e9, "sequence_count": 10}, fh)
+    assert config.get_memory("RepeatModeler", stats_file) == 3000
+
+
+def test_missing_resource_names_the_rule(tmp_path):
+    hpc_config = tmp_path / "hpc_config.json"
+    hpc_config.write_text(
+        json.dumps({"__default__": {"cores": 1, "partition": "short"}})
+    )
+    config = HpcConfig(str(hpc_config))
+    assert config.get_cores("new_rule") == 1
+    with pytest.raises(KeyError, match="'memory' for the rule 'new_rule'"):
+        config.get_memory("new_rule")
+    # the shipped config has a default for every resource but the walltime
+    config = HpcConfig(DEFAULT_HPC_CONFIG_FILE)
+    assert config.get_memory("new_rule") == 4096
+    assert config.get_cost("new_rule")
+    assert config.get_time("new_rule") is None
+    assert config.get_time("RepeatMasker_low") == 1440
+
+
+def test_subsample_skips_empty_sequences(tmp_path):
+    # the empty sequence falls in the stratum of the short sequences
+    (tmp_path / "genome.fa").write_text(
+        ">seq1\n"
+        + "ACGT" * 50
+        + "\n>empty\n"
+        + "".join(f">short{i}\nACGTACGT\n" for i in range(4))
+    )
+    stats = scan(tmp_path / "genome.fa")
+    stats.write_fai(tmp_path / "genome.fa.fai")
+    outputs = list()
+    for fai in (None, str(tmp_path / "genome.fa.fai")):
+        output = tmp_path / f"subsample.{bool(fai)}.fa"
+        manifest = tmp_path / f"subsample.{bool(fai)}.tsv"
+        args = Namespace(
+            fasta=str(tmp_path / "genome.fa"),
+            fai=fai,
+            target_size=231,
+            window_size=100,
+            seed=7,
+            output=str(output),
+            manifest=str(manifest),
+        )
+        SubsampleGenome(args).run()
+        outputs.append((output.read_text(), manifest.read_text()))
+    assert outputs[0] == outputs[1]
+    sampled = [line.split("\t")[1] for line in outputs[0][1].splitlines()[2:]]
+    assert sampled and "empty" not in sampled
+    assert ">\n" not in outputs[0][0] and "\n\n" not in outputs[0][0]
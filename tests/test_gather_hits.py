@@ -0,0 +1,58 @@
+import io
+import random
+from argparse import Namespace
+
+from eirepeat.scripts.gather_hits import GatherHits
+
+
+def test_hits_are_merged_and_sorted(tmp_path):
+    # qseqid sseqid pident qstart qend, the reverse strand hit has its coordinates swapped
+    (tmp_path / "chunk-1.tblr").write_text(
+        "seq1\tchl\t99\t1\t10\n"
+        "seq1\tchl\t99\t20\t11\n"
+        "seq1\tchl\t99\t15\t30\n"
+        "seq2\tchl\t99\t5\t8\n"
+    )
+    (tmp_path / "chunk-2.tblr").write_text(
+        "# comment\n\nseq2\tchl\t99\t7\t9\nseq1\tchl\t99\t1\t5\n"
+        # joins the two intervals before it, book-ended on both sides
+        "seq0\tchl\t99\t1\t10\nseq0\tchl\t99\t21\t30\nseq0\tchl\t99\t50\t60\n"
+        "seq0\tchl\t99\t11\t20\n"
+    )
+    output = tmp_path / "hits.bed"
+    gather = GatherHits(
+        Namespace(
+            hits=[str(tmp_path / "chunk-1.tblr"), str(tmp_path / "chunk-2.tblr")],
+            format="blast",
+            output=str(output),
+        )
+    )
+    gather.run()
+    # overlapping and book-ended hits are merged across the files, sorted by sequence and start
+    assert output.read_text().splitlines() == [
+        "seq0\t0\t30",
+        "seq0\t49\t60",
+        "seq1\t0\t30",
+        "seq2\t4\t9",
+    ]
+    assert (gather.hit_count, gather.interval_count) == (10, 4)
+
+
+def test_merging_matches_a_sort_and_merge():
+    rng = random.Random(7)
+    hits = [
+        (f"seq{rng.randint(1, 3)}", start, start + rng.randint(1, 30))
+        for start in (rng.randint(0, 500) for _ in range(300))
+    ]
+    gather = GatherHits(Namespace(format="blast"))
+    for hit in hits:
+        gather.add_hit(*hit)
+    expected = list()
+    for seqid, start, end in sorted(hits):
+        if expected and expected[-1][0] == seqid and start <= expected[-1][2]:
+            expected[-1][2] = max(expected[-1][2], end)
+        else:
+            expected.append([seqid, start, end])
+    fh = io.StringIO()
+    gather.write_intervals(fh)
+    assert fh.getvalue() == "".join(f"{s}\t{b}\t{e}\n" for s, b, e in expected)
@@ -0,0 +1,241 @@
+import json
+import socket
+import subprocess
+import sys
+import threading
+import time
+from http.server import BaseHTTPRequestHandler, ThreadingHTTPServer
+
+import pytest
+import yaml
+
+from eirepeat.scripts.jiracomms import JiraInfo
+from eirepeat.scripts.jira_notifier import JiraNotifier
+
+
+class StubJira(ThreadingHTTPServer):
+    """
+    JIRA REST API stub recording the requests, failing the first `failures` of them with `status`
+    """
+
+    def __init__(self, failures=0, delay=0, status=503):
+        super().__init__(("127.0.0.1", 0), StubJiraHandler)
+        self.failures = failures
+        self.delay = delay
+        self.status = status
+        self.requests = list()
+        self.attempts = 0
+        self.thread = threading.Thread(target=self.serve_forever, daemon=True)
+
+    @property
+    def site(self):
+        return f"http://127.0.0.1:{self.server_address[1]}"
+
+
+class StubJiraHandler(BaseHTTPRequestHandler):
+    # keep-alive, to check that the connection is reused
+    protocol_version = "HTTP/1.1"
+
+    def log_message(self, *args):
+        pass
+
+    def do_POST(self):
+        body = self.rfile.read(int(self.headers["Content-Length"]))
+        self.server.attempts += 1
+        time.sleep(self.server.delay)
+        if self.server.failures:
+            self.server.failures -= 1
+            self.reply(self.server.status, {"error": "unavailable"})
+            return
+        self.server.requests.append(
+            {"path": self.path, "port": self.client_address[1], "body": body}
+        )
+        if self.path.endswith("/attachments"):
+            self.reply(200, [{"filename": "report.txt", "content": "http://x/1"}])
+        else:
+            self.reply(201, {"id": str(len(self.server.requests))})
+
+    def reply(self, status, payload):
+        data = json.dumps(payload).encode()
+        self.send_response(status)
+        self.send_header("Content-Type", "application/json")
+        self.send_header("Content-Length", str(len(data)))
+        self.end_headers()
+        self.wfile.write(data)
+
+
+@pytest.fixture(autouse=True)
+def new_session():
+    JiraInfo.SESSION = None
+    yield
+    JiraInfo.SESSION = None
+
+
+def start_server(**kwargs):
+    server = StubJira(**kwargs)
+    server.thread.start()
+    return server
+
+
+def get_config(tmp_path, site):
+    password_file = tmp_path / "token"
+    password_file.write_text("secret\n")
+    return {
+        "jira": {
+            "site": site,
+            "username": "user",
+            "password_file": str(password_file),
+            "timeout": 5,
+            "retries": 3,
+            "backoff": 0,
+        }
+    }
+
+
+def get_closed_port():
+    with socket.socket() as s:
+        s.bind(("127.0.0.1", 0))
+        return s.getsockname()[1]
+
+
+def get_comment(request):
+    return json.loads(request["body"])["body"]["content"][0]["content"][0]["text"]
+
+
+def test_comment_is_delivered(tmp_path):
+    server = start_server()
+    notifier = JiraNotifier(
+        "TEST-1", get_config(tmp_path, server.site), tmp_path / "outbox"
+    )
+    notifier.submit("hello")
+    assert notifier.close(timeout=10) == 0
+    assert [r["path"] for r in server.requests] == ["/rest/api/3/issue/TEST-1/comment"]
+    assert get_comment(server.requests[0]) == "hello"
+    server.shutdown()
+
+
+def test_attachment_and_comment_share_a_connection(tmp_path):
+    server = start_server()
+    report = tmp_path / "report.txt"
+    report.write_text("stats\n")
+    notifier = JiraNotifier(
+        "TEST-1", get_config(tmp_path, server.site), tmp_path / "outbox"
+    )
+    notifier.submit("Attaching report: ", str(report))
+    notifier.submit(str(report))
+    assert notifier.close(timeout=10) == 0
+    assert [r["path"].rsplit("/", 1)[1] for r in server.requests] == [
+        "attachments",
+        "comment",
+        "comment",
+    ]
+    # the message given as a file is posted with its content
+    assert get_comment(server.requests[2]) == "stats\n"
+    assert len({r["port"] for r in server.requests}) == 1
+    server.shutdown()
+
+
+def test_server_errors_are_retried(tmp_path):
+    server = start_server(failures=2)
+    notifier = JiraNotifier(
+        "TEST-1", get_config(tmp_path, server.site), tmp_path / "outbox"
+    )
+    notifier.submit("hello")
+    assert notifier.close(timeout=10) == 0
+    assert len(server.requests) == 1
+    server.shutdown()
+
+
+@pytest.mark.parametrize("status", [429, 503])
+def test_post_is_retried_when_turned_away(tmp_path, status):
+    server = start_server(failures=2, status=status)
+    JiraInfo.initialise(get_config(tmp_path, server.site))
+    response = JiraInfo.post(
+        f"{server.site}/rest/api/3/issue/TEST-1/comment", data="{}"
+    )
+    assert response.status_code == 201
+    assert server.attempts == 3
+    server.shutdown()
+
+
+def test_post_is_not_repeated_once_sent(tmp_path, monkeypatch):
+    # the comment may have been accepted by a server failing or timing out on the response
+    server = start_server(failures=1, status=500)
+    JiraInfo.initialise(get_config(tmp_path, server.site))
+    url = f"{server.site}/rest/api/3/issue/TEST-1/comment"
+    assert JiraInfo.post(url, data="{}").status_code == 500
+    assert server.attempts == 1
+
+    server.delay = 2
+    monkeypatch.setattr(JiraInfo, "TIMEOUT", 0.5)
+    assert JiraInfo.post(url, data="{}") is None
+    time.sleep(2)
+    assert server.attempts == 2
+    server.shutdown()
+
+
+def test_submit_does_not_wait_for_jira(tmp_path):
+    server = start_server(delay=1)
+    notifier = JiraNotifier(
+        "TEST-1", get_config(tmp_path, server.site), tmp_path / "outbox"
+    )
+    start = time.perf_counter()
+    notifier.submit("hello")
+    assert time.perf_counter() - start < 0.5
+    assert notifier.close(timeout=10) == 0
+    server.shutdown()
+
+
+def test_undelivered_messages_are_flushed_in_order(tmp_path):
+    outbox = tmp_path / "outbox"
+    report = tmp_path / "report.txt"
+    report.write_text("stats\n")
+    site = f"http://127.0.0.1:{get_closed_port()}"
+    notifier = JiraNotifier("TEST-1", get_config(tmp_path, site), outbox)
+    notifier.submit("first")
+    notifier.submit("Attaching report: ", str(report))
+    notifier.submit("last")
+    assert notifier.close(timeout=10) == 3
+    # the attachment is kept in the outbox, even if the original is gone
+    report.unlink()
+
+    JiraInfo.SESSION = None
+    server = start_server()
+    notifier = JiraNotifier("TEST-1", get_config(tmp_path, server.site), outbox)
+    assert notifier.flush() == (3, 0)
+    assert [r["path"].rsplit("/", 1)[1] for r in server.requests] == [
+        "comment",
+        "attachments",
+        "comment",
+        "comment",
+    ]
+    assert get_comment(server.requests[0]) == "first"
+    assert get_comment(server.requests[3]) == "last"
+    assert list(outbox.iterdir()) == []
+    server.shutdown()
+
+
+def test_rejected_message_stays_in_the_outbox_for_notify_flush(tmp_path):
+    server = start_server(failures=1, status=400)
+    config = get_config(tmp_path, server.site)
+    outbox = tmp_path / ".jira_outbox"
+    notifier = JiraNotifier("TEST-1", config, str(outbox))
+    notifier.submit("first")
+    notifier.submit("second")
+    assert notifier.close(timeout=10) == 2
+    # a client error is not retried, and the next message is not tried once JIRA failed
+    assert server.attempts == 1
+
+    run_config = tmp_path / "run_config.yaml"
+    config["jira"]["jira_id"] = "TEST-1"
+    config["output"] = str(tmp_path)
+    run_config.write_text(yaml.safe_dump(config))
+    notify = [sys.executable, "-m", "eirepeat", "notify", str(run_config)]
+    result = subprocess.run(notify, capture_output=True, text=True, check=True)
+    assert result.stdout.startswith(f"2 JIRA messages in '{outbox}'")
+    result = subprocess.run(notify + ["--flush"], capture_output=True, text=True)
+    assert result.returncode == 0
+    assert "Delivered 2 JIRA messages, 0 left" in result.stdout
+    assert [get_comment(r) for r in server.requests] == ["first", "second"]
+    assert list(outbox.iterdir()) == []
+    server.shutdown()
@@ -0,0 +1,92 @@
+import io
+import os
+import re
+
+from eirepeat.scripts import metrics_exporter
+from eirepeat.scripts.metrics_exporter import MetricsExporter
+from eirepeat.scripts.progress_monitor import ProgressMonitor
+
+LOG = os.path.join(os.path.dirname(__file__), "data", "snakemake7.log")
+# labels of the run, the quotes in the project are escaped
+LABELS = '{project="plant \\"x\\""}'
+# text exposition format, a metric name, optional labels and a value
+SAMPLE = re.compile(r'^([a-z_]+)(\{(?:[a-z_]+="(?:[^"\\]|\\.)*",?)*\})? (\S+)$')
+
+
+def get_exporter(tmp_path, lines):
+    monitor = ProgressMonitor(str(tmp_path / "events.jsonl"), io.StringIO())
+    for line in lines:
+        monitor.process_line(line)
+    output = tmp_path / "output"
+    output.mkdir()
+    (output / "genome.fa").write_text("A" * 100)
+    os.link(output / "genome.fa", output / "genome.link.fa")
+    return MetricsExporter(
+        monitor, str(tmp_path / "eirepeat.prom"), 'plant "x"', str(output), 3600
+    )
+
+
+def test_textfile_format(tmp_path):
+    with open(LOG) as fh:
+        lines = fh.readlines()
+    exporter = get_exporter(
+        tmp_path, lines[: lines.index("Trying to restart job 5.\n")]
+    )
+    exporter.write()
+    text = (tmp_path / "eirepeat.prom").read_text()
+    assert text.endswith("\n")
+    families = dict()
+    samples = dict()
+    for line in text.splitlines():
+        if line.startswith("# HELP ") or line.startswith("# TYPE "):
+            kind, name, rest = line[2:].split(" ", 2)
+            families.setdefault(name, dict())[kind] = rest
+            continue
+        match = SAMPLE.match(line)
+        assert match, line
+        name, labels, value = match.groups()
+        # every sample belongs to a family declared before it
+        assert re.sub(r"_(sum|count)$", "", name) in families
+        float(value)
+        samples[f"{name}{labels}"] = value
+    assert families["eirepeat_jobs"]["TYPE"] == "gauge"
+    assert families["eirepeat_job_duration_seconds"]["TYPE"] == "summary"
+    labels = 'project="plant \\"x\\""'
+    assert samples[f'eirepeat_jobs{{{labels},rule="b",state="queued"}}'] == "1"
+    assert samples[f'eirepeat_jobs{{{labels},rule="b",state="completed"}}'] == "1"
+    assert samples[f'eirepeat_jobs{{{labels},rule="flaky",state="failed"}}'] == "1"
+    assert samples[f'eirepeat_job_duration_seconds_count{{{labels},rule="a"}}'] == "2"
+    # the hardlinked copy is counted once
+    assert samples[f"eirepeat_output_bytes{{{labels}}}"] == "100"
+    assert samples[f"eirepeat_run_running{{{labels}}}"] == "1"
+
+
+def test_eta_is_nan_before_the_first_job(tmp_path):
+    exporter = get_exporter(tmp_path, list())
+    assert "eirepeat_run_eta_seconds" + LABELS + " NaN\n" in exporter.get_metrics()
+    assert exporter.get_metrics(running=False).endswith(
+        "eirepeat_run_running" + LABELS + " 0\n"
+    )
+
+
+def test_write_replaces_the_file_atomically(tmp_path, monkeypatch):
+    exporter = get_exporter(tmp_path, list())
+    metrics_file = tmp_path / "eirepeat.prom"
+    metrics_file.write_text("old\n")
+    replaced = list()
+    os_replace = os.replace
+
+    def replace(src, dest):
+        # the new content is complete before it takes the place of the old file
+        assert metrics_file.read_text() == "old\n"
+        with open(src) as fh:
+            assert fh.read().endswith("eirepeat_run_running" + LABELS + " 1\n")
+        assert os.path.dirname(src) == os.path.dirname(dest)
+        replaced.append(dest)
+        os_replace(src, dest)
+
+    monkeypatch.setattr(metrics_exporter.os, "replace", replace)
+    exporter.write()
+    assert replaced == [str(metrics_file)]
+    assert metrics_file.read_text().startswith("# HELP eirepeat_jobs")
+    assert sorted(os.listdir(tmp_path)) == ["eirepeat.prom", "events.jsonl", "output"]
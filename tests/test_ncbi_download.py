@@ -0,0 +1,171 @@
+import gzip
+import json
+import threading
+from argparse import Namespace
+from http.server import BaseHTTPRequestHandler, ThreadingHTTPServer
+from urllib.parse import parse_qs, urlparse
+
+import pytest
+
+from eirepeat.scripts.ncbi_download import NCBIDownload
+
+
+class MockEutils(ThreadingHTTPServer):
+    """
+    E-utilities mock serving `accessions` as FASTA records, failing the efetch of each offset in `failures` once
+    """
+
+    def __init__(self, accessions, failures=()):
+        super().__init__(("127.0.0.1", 0), MockEutilsHandler)
+        self.accessions = accessions
+        self.failures = set(failures)
+        self.fetched = list()
+        self.lock = threading.Lock()
+        self.thread = threading.Thread(target=self.serve_forever, daemon=True)
+        self.thread.start()
+
+    @property
+    def base_url(self):
+        return f"http://127.0.0.1:{self.server_address[1]}"
+
+
+class MockEutilsHandler(BaseHTTPRequestHandler):
+    def log_message(self, *args):
+        pass
+
+    def do_GET(self):
+        url = urlparse(self.path)
+        params = {k: v[0] for k, v in parse_qs(url.query).items()}
+        if url.path == "/esearch.fcgi":
+            result = {
+                "esearchresult": {
+                    "count": str(len(self.server.accessions)),
+                    "webenv": "MCID_1",
+                    "querykey": "1",
+                }
+            }
+            self.reply(json.dumps(result).encode())
+            return
+        start, size = int(params["retstart"]), int(params["retmax"])
+        if params["rettype"] == "acc":
+            accessions = self.server.accessions[start : start + size]
+            self.reply("".join(f"{a}\n" for a in accessions).encode())
+            return
+        with self.server.lock:
+            if start in self.server.failures:
+                self.server.failures.discard(start)
+                self.send_error(502)
+                return
+            self.server.fetched.append(start)
+        records = [
+            f">{accession} sequence {i}\nACGT{i}\n"
+            for i, accession in enumerate(self.server.accessions)
+        ][start : start + size]
+        self.reply("".join(records).encode())
+
+    def reply(self, data):
+        self.send_response(200)
+        self.send_header("Content-Length", str(len(data)))
+        self.end_headers()
+        self.wfile.write(data)
+
+
+def get_args(server, output, **kwargs):
+    args = dict(
+        query="test[Organism]",
+        output_fasta=str(output),
+        email="test@example.com",
+        batch_size=3,
+        threads=3,
+        api_key=None,
+        requests_per_second=100,
+        retries=0,
+        dedupe=False,
+        gzip=False,
+        base_url=server.base_url,
+    )
+    args.update(kwargs)
+    return Namespace(**args)
+
+
+def read_accessions(output, opener=open):
+    with opener(output, "rt") as fh:
+        return [line[1:].split()[0] for line in fh if line.startswith(">")]
+
+
+def test_download_in_order(tmp_path):
+    accessions = [f"ACC{i}.1" for i in range(10)]
+    server = MockEutils(accessions)
+    output = tmp_path / "out.fasta"
+    NCBIDownload(get_args(server, output)).run()
+    assert read_accessions(output) == accessions
+    assert sorted(server.fetched) == [0, 3, 6, 9]
+    # the checkpoint and batches are removed once the download completes
+    assert sorted(p.name for p in tmp_path.iterdir()) == ["out.fasta"]
+    server.shutdown()
+
+
+def test_interrupted_download_resumes(tmp_path):
+    accessions = [f"ACC{i}.1" for i in range(10)]
+    server = MockEutils(accessions, failures=[6])
+    output = tmp_path / "out.fasta"
+    with pytest.raises(SystemExit):
+        NCBIDownload(get_args(server, output)).run()
+    with open(f"{output}.checkpoint.json") as fh:
+        assert sorted(json.load(fh)["completed"]) == [0, 3, 9]
+    server.fetched.clear()
+    NCBIDownload(get_args(server, output)).run()
+    # only the failed batch is downloaded again
+    assert server.fetched == [6]
+    assert read_accessions(output) == accessions
+    server.shutdown()
+
+
+def test_reordered_search_results_start_over(tmp_path):
+    accessions = [f"ACC{i}.1" for i in range(10)]
+    server = MockEutils(accessions, failures=[6])
+    output = tmp_path / "out.fasta"
+    with pytest.raises(SystemExit):
+        NCBIDownload(get_args(server, output)).run()
+    with open(f"{output}.checkpoint.json") as fh:
+        assert json.load(fh)["uids"] == ["ACC0.1", "ACC9.1"]
+    # the same number of records, in another order
+    server.accessions = accessions[::-1]
+    server.fetched.clear()
+    NCBIDownload(get_args(server, output)).run()
+    assert sorted(server.fetched) == [0, 3, 6, 9]
+    assert read_accessions(output) == accessions[::-1]
+    server.shutdown()
+
+
+def test_failed_batch_is_retried(tmp_path):
+    accessions = [f"ACC{i}.1" for i in range(4)]
+    server = MockEutils(accessions, failures=[3])
+    output = tmp_path / "out.fasta"
+    NCBIDownload(get_args(server, output, retries=1)).run()
+    assert read_accessions(output) == accessions
+    server.shutdown()
+
+
+def test_dedupe_and_gzip(tmp_path):
+    accessions = ["A.1", "B.1", "A.1", "C.1", "B.1"]
+    server = MockEutils(accessions)
+    output = tmp_path / "out.fasta.gz"
+    NCBIDownload(get_args(server, output, dedupe=True, gzip=True)).run()
+    assert read_accessions(output, gzip.open) == ["A.1", "B.1", "C.1"]
+    server.shutdown()
+
+
+def test_gzip_output_gets_the_suffix(tmp_path):
+    server = MockEutils(["A.1", "B.1"])
+    NCBIDownload(get_args(server, tmp_path / "out.fasta", gzip=True)).run()
+    assert sorted(p.name for p in tmp_path.iterdir()) == ["out.fasta.gz"]
+    assert read_accessions(tmp_path / "out.fasta.gz", gzip.open) == ["A.1", "B.1"]
+    server.shutdown()
+
+
+def test_count_records_across_chunks():
+    assert NCBIDownload.count_records(b">a\nAC\n>b\nGT", b"") == 2
+    # a record starting right at the chunk boundary
+    assert NCBIDownload.count_records(b">c\nAC", b"\n") == 1
+    assert NCBIDownload.count_records(b">c\nAC", b"T") == 0
@@ -0,0 +1,66 @@
+import subprocess
+import sys
+from argparse import Namespace
+
+from eirepeat.scripts import profiling
+from eirepeat.scripts.compute_coverage import ComputeCoverage
+
+GFF = "scaffold1\tRM\tmatch_part\t1\t10\t.\t+\t.\tID=a\nscaffold1\tRM\tmatch_part\t5\t20\t.\t+\t.\tID=b\n"
+
+
+def test_disabled_profiling_is_a_null_context(tmp_path, monkeypatch):
+    monkeypatch.chdir(tmp_path)
+    monkeypatch.delenv(profiling.PROFILE_ENV, raising=False)
+    assert (
+        profiling.profile("script", Namespace(profile=False)) is profiling.NULL_CONTEXT
+    )
+    assert profiling.phase("phase") is profiling.NULL_CONTEXT
+    monkeypatch.setenv(profiling.PROFILE_ENV, "0")
+    assert profiling.profile("script") is profiling.NULL_CONTEXT
+    assert not list(tmp_path.iterdir())
+
+
+def test_profile_with_phase_timings(tmp_path, monkeypatch, capsys):
+    (tmp_path / "genome.bed").write_text("scaffold1\t0\t100\n")
+    (tmp_path / "repeats.gff3").write_text(GFF)
+    monkeypatch.setenv(profiling.PROFILE_ENV, str(tmp_path / "profiles"))
+    args = Namespace(
+        bed3_file=str(tmp_path / "genome.bed"),
+        gff_file=str(tmp_path / "repeats.gff3"),
+        gff_type="match_part",
+    )
+    with profiling.profile("compute_coverage", args):
+        ComputeCoverage(args).run()
+    assert profiling.phases is None
+    assert capsys.readouterr().out == "scaffold1\t0\t100\t2\t20\t100\t0.2000000\n"
+
+    assert (tmp_path / "profiles" / "compute_coverage.prof").exists()
+    report = (tmp_path / "profiles" / "compute_coverage.profile.txt").read_text()
+    for name in ("process_gff", "process_bed"):
+        assert f"\n{name} " in report
+    assert "Top 30 memory allocations" in report
+    assert "cumulative" in report
+
+
+def test_profile_is_written_next_to_the_rule_log(tmp_path, monkeypatch):
+    (tmp_path / "repeats.gff3").write_text(GFF)
+    monkeypatch.delenv(profiling.PROFILE_ENV, raising=False)
+    log = tmp_path / "rule.log"
+    with open(log, "w") as fh:
+        subprocess.run(
+            [
+                sys.executable,
+                "-m",
+                "eirepeat.scripts.clean_GFF3_source",
+                str(tmp_path / "repeats.gff3"),
+                "--source",
+                "all",
+                "--profile",
+            ],
+            stdout=subprocess.DEVNULL,
+            stderr=fh,
+            check=True,
+        )
+    assert "Profile written to" in log.read_text()
+    assert (tmp_path / "rule.log.clean_GFF3_source.py.profile.txt").exists()
+    assert (tmp_path / "rule.log.clean_GFF3_source.py.prof").exists()
@@ -0,0 +1,60 @@
+import io
+import json
+import os
+
+from eirepeat.scripts.progress_monitor import ProgressMonitor
+
+# captured from Snakemake 7.32.4, the first attempt of rule flaky fails and is restarted
+LOG = os.path.join(os.path.dirname(__file__), "data", "snakemake7.log")
+
+
+def test_follows_a_snakemake_7_log(tmp_path):
+    out = io.StringIO()
+    events_file = tmp_path / "eirepeat.events.jsonl"
+    monitor = ProgressMonitor(str(events_file), out)
+    with open(LOG) as fh:
+        lines = fh.readlines()
+    restart = lines.index("Trying to restart job 5.\n")
+    for line in lines[:restart]:
+        monitor.process_line(line)
+    assert dict(monitor.totals) == {"a": 2, "all": 1, "b": 2, "flaky": 1}
+    assert (monitor.steps_done, monitor.steps_total) == (3, 6)
+    assert monitor.get_rule_counts("a") == (2, 0, 0, 0)
+    assert monitor.get_rule_counts("b") == (1, 0, 1, 0)
+    assert monitor.get_rule_counts("flaky") == (0, 0, 0, 1)
+    assert (
+        "[eirepeat]   flaky: 0 done, 0 running, 0 pending, 1 failed" in out.getvalue()
+    )
+
+    for line in lines[restart:]:
+        monitor.process_line(line)
+    assert (monitor.steps_done, monitor.steps_total) == (6, 6)
+    assert monitor.running == {}
+    for rulename, total in monitor.totals.items():
+        assert monitor.get_rule_counts(rulename) == (total, 0, 0, 0)
+    assert "[eirepeat] 6 of 6 jobs done, 0 running, 0 failed" in out.getvalue()
+
+    monitor.close(0)
+    events = [json.loads(line) for line in events_file.read_text().splitlines()]
+    assert [(e["event"], e.get("rule")) for e in events] == [
+        ("run_start", None),
+        ("start", "a"),
+        ("finish", "a"),
+        ("start", "a"),
+        ("finish", "a"),
+        ("start", "b"),
+        ("finish", "b"),
+        ("start", "flaky"),
+        ("error", "flaky"),
+        ("restart", "flaky"),
+        ("start", "flaky"),
+        ("finish", "flaky"),
+        ("start", "b"),
+        ("finish", "b"),
+        ("start", "all"),
+        ("finish", "all"),
+        ("run_end", None),
+    ]
+    assert events[-1]["exit_code"] == 0
+    summary = out.getvalue().split("Jobs per rule after")[1]
+    assert summary.split("\n")[3].split() == ["a", "2", "0", "0", "0"]
@@ -0,0 +1,169 @@
+import io
+import subprocess
+import sys
+
+import pytest
+
+from eirepeat import repeats
+
+RM_OUT = """   SW   perc perc perc  query      position in query    matching   repeat    position in repeat
+score   div. del. ins.  sequence   begin end (left)   repeat     class/family  begin end (left)   ID
+
+  594   14.9  0.7 11.7  scaffold_1   101  200 (800) + (TTAAG)n   Simple_repeat     1  100 (0)  1
+  337   12.4  0.5 10.8  scaffold_1   151  300 (700) C A-rich     Low_complexity  (0)  150  1    2
+  303   14.7  0.9 10.7  scaffold_1   501  600 (400) + A-rich     Low_complexity    1  100 (0)  3
+  308   16.3  0.0  7.8  scaffold_2    11   20 (80)  C Helitron   RC/Helitron     (5)   10  1    4
+"""
+BED = "scaffold_1\t0\t1000\nscaffold_2\t0\t100\nscaffold_3\t0\t50\n"
+
+
+def get_features():
+    return repeats.repeatmasker_to_gff3(
+        repeats.read_repeatmasker_out(io.StringIO(RM_OUT)), tag="RM"
+    )
+
+
+def test_repeatmasker_out_to_gff3():
+    features = list(get_features())
+    assert len(features) == 4
+    match, match_part = features[1]
+    assert match == [
+        "scaffold_1",
+        "RepeatMasker",
+        "match",
+        "151",
+        "300",
+        "12.4",
+        "-",
+        ".",
+        "ID=RM_2;Name=Motif:A-rich",
+    ]
+    assert match_part[repeats.ATTRIBUTE] == "ID=RM_2-exon1;Parent=RM_2"
+
+    fh = io.StringIO()
+    repeats.write_features(features[:1], fh)
+    assert fh.getvalue().splitlines()[-1] == "###"
+
+
+def test_missing_target_is_reported():
+    record = ["scaffold_1", "RM", "similarity", "1", "10", ".", "+", ".", "ID=x"]
+    with pytest.raises(ValueError, match="from the file 'genome.fa.out.gff'"):
+        list(repeats.repeatmasker_to_gff3([record], name="genome.fa.out.gff"))
+
+
+def test_merge_then_coverage_without_intermediate_files():
+    intervals = repeats.group_intervals(
+        repeats.get_records(get_features(), "match_part")
+    )
+    merged = repeats.merge_repeats(intervals)
+    assert [repeat[:4] for repeat in merged] == [
+        ["scaffold_1", 101, 300, "+"],
+        ["scaffold_1", 501, 600, "+"],
+        ["scaffold_2", 11, 20, "-"],
+    ]
+    assert len(merged[0][4]) == 2
+
+    fh = io.StringIO()
+    repeats.write_merged_ids(merged, fh, prefix="m")
+    assert fh.getvalue().splitlines()[1] == (
+        "m_1\t2\tID=RM_1-exon1;Parent=RM_1||ID=RM_2-exon1;Parent=RM_2"
+    )
+
+    # the merged repeats cover the same bases
+    merged_intervals = repeats.group_intervals(
+        repeats.get_records(repeats.merged_to_gff3(merged), "match_part")
+    )
+    for grouped in (intervals, merged_intervals):
+        rows = list(
+            repeats.compute_coverage(grouped, repeats.read_bed(io.StringIO(BED)))
+        )
+        assert [row[4:6] for row in rows] == [[300, 1000], [10, 100], [0, 50]]
+        assert rows[1][6] == pytest.approx(0.1)
+    assert repeats.summarise_coverage(rows) == {
+        "sequences": 3,
+        "bases": 1150,
+        "masked_bases": 310,
+        "masked_percentage": pytest.approx(310 / 1150 * 100),
+    }
+
+
+def test_merge_by_strand_and_ignore_duplicates():
+    records = [
+        ["s", "RM", "match_part", "1", "10", ".", "+", ".", "a"],
+        ["s", "RM", "match_part", "5", "20", ".", "-", ".", "b"],
+        ["s", "RM", "match_part", "10", "1", ".", "+", ".", "c"],
+        ["s", "RM", "match_part", "10", "30", ".", "+", ".", "d"],
+    ]
+    merged = repeats.merge_repeats(
+        repeats.group_intervals(records, use_strand=True, ignore_duplicate=True)
+    )
+    assert merged == [["s", 1, 30, "+", ["a", "d"]], ["s", 5, 20, "-", ["b"]]]
+    merged = repeats.merge_repeats(repeats.group_intervals(records))
+    assert merged == [["s", 1, 30, "+", ["a", "c", "b", "d"]]]
+
+
+def test_duplicate_sequence_is_reported():
+    with pytest.raises(ValueError, match="Potential duplicate entry"):
+        list(repeats.compute_coverage({}, [("s", 0, 10), ("s", 0, 10)]))
+
+
+def test_red_rpt_to_gff3():
+    intervals = list(
+        repeats.read_red_rpt(io.StringIO(">chr:1:99-200\nACGT\n>chr2:0-5\n"))
+    )
+    assert intervals == [("chr:1", 99, 200), ("chr2", 0, 5)]
+    (match, match_part), _ = repeats.red_to_gff3(intervals, tag="red")
+    assert match[repeats.START : repeats.END + 1] == ["100", "200"]
+    assert match_part[repeats.ATTRIBUTE] == "ID=red_1.match_part;Parent=red_1"
+
+
+def test_scripts_wrap_the_api(tmp_path):
+    (tmp_path / "genome.bed").write_text(BED)
+    (tmp_path / "genome.fa.out").write_text(RM_OUT)
+    subprocess.run(
+        [
+            sys.executable,
+            "-m",
+            "eirepeat.scripts.repeatmasker_out_to_gff",
+            "--repeatmasker_out",
+            "genome.fa.out",
+            "--output_gff",
+            "genome.fa.out.gff",
+        ],
+        cwd=tmp_path,
+        check=True,
+    )
+    subprocess.run(
+        [
+            sys.executable,
+            "-m",
+            "eirepeat.scripts.repeatmasker_to_GFF3",
+            "genome.fa.out.gff",
+            "--output_gff",
+            "genome.fa.out.gff3",
+        ],
+        cwd=tmp_path,
+        check=True,
+    )
+    coverage = subprocess.run(
+        [
+            sys.executable,
+            "-m",
+            "eirepeat.scripts.compute_coverage",
+            "--bed3_file",
+            "genome.bed",
+            "--gff_file",
+            "genome.fa.out.gff3",
+            "--gff_type",
+            "match_part",
+        ],
+        cwd=tmp_path,
+        check=True,
+        capture_output=True,
+        text=True,
+    ).stdout
+    assert coverage.splitlines() == [
+        "scaffold_1\t0\t1000\t3\t300\t1000\t0.3000000",
+        "scaffold_2\t0\t100\t1\t10\t100\t0.1000000",
+        "scaffold_3\t0\t50\t0\t0\t50\t0",
+    ]
@@ -0,0 +1,48 @@
+from argparse import Namespace
+
+import pytest
+
+from eirepeat.scripts.resource_telemetry import ResourceTelemetry
+
+
+def get_block(command, user, wall_clock):
+    return (
+        f'\tCommand being timed: "{command}"\n'
+        f"\tUser time (seconds): {user}\n"
+        "\tSystem time (seconds): 0.00\n"
+        f"\tElapsed (wall clock) time (h:mm:ss or m:ss): {wall_clock}\n"
+        "\tMaximum resident set size (kbytes): 2048\n"
+        "\tExit status: 0\n"
+    )
+
+
+def test_piped_commands_are_not_counted_twice(tmp_path):
+    logs = tmp_path / "logs"
+    (logs / "chunks").mkdir(parents=True)
+    (logs / "clean_genome.log").write_text(
+        "Timed pipeline: 2 commands\n"
+        + get_block("seqkit seq -o - genome.fasta", 30, "1:00.00")
+        + get_block("seqkit sort -o genome.fa", 50, "1:30.00")
+        + get_block("chmod 777 genome.fa", 0, "0:10.00")
+    )
+    for name, wall_clock in (("1", "0:20.00"), ("2", "0:40.00")):
+        (logs / "chunks" / f"{name}.log").write_text(
+            get_block("transposonPSI.pl chunk.fa", 10, wall_clock)
+        )
+    telemetry = ResourceTelemetry(Namespace(logs=str(logs)))
+    telemetry.process_logs()
+    telemetry.summarise()
+
+    rule = telemetry.rules["clean_genome"]
+    assert [c.get("pipeline") for c in rule["commands"]] == [1, 1, None]
+    assert rule["wall_clock_seconds"] == 100
+    assert rule["max_job_wall_clock_seconds"] == 100
+    assert rule["cpu_seconds"] == 80
+    assert rule["cpu_percent"] == 80
+    assert rule["programs"]["seqkit"]["wall_clock_seconds"] == 90
+
+    rule = telemetry.rules["chunks"]
+    assert rule["jobs"] == 2
+    assert rule["wall_clock_seconds"] == 60
+    assert rule["max_job_wall_clock_seconds"] == 40
+    assert rule["cpu_percent"] == pytest.approx(33.3)
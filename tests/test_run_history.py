@@ -0,0 +1,101 @@
+import json
+from argparse import Namespace
+
+import pytest
+
+from eirepeat.scripts.run_history import Estimate, RunHistory
+
+OPTIONS = RunHistory.get_options(dict())
+
+
+def get_stats(total_length):
+    return {"total_length": total_length, "sequence_count": 10, "n50": 1000}
+
+
+def get_telemetry(seconds, memory):
+    return {
+        "RepeatModeler": {
+            "wall_clock_seconds": seconds,
+            "cpu_seconds": seconds * 4,
+            "max_rss_mb": memory,
+        }
+    }
+
+
+def test_fit_is_a_power_law():
+    assert RunHistory.fit([100, 1000], [10, 100])(10000) == pytest.approx(1000)
+    assert RunHistory.fit([100, 1000], [10, 1000])(10000) == pytest.approx(100000)
+    # a single genome size scales linearly, the exponent is capped at 2
+    assert RunHistory.fit([100], [10])(300) == pytest.approx(30)
+    assert RunHistory.fit([10, 100], [1, 10000])(1000) == pytest.approx(100000)
+    assert RunHistory.fit([], [])(1000) == 0.0
+
+
+def test_record_replaces_a_run_and_estimates_by_size(tmp_path):
+    history = RunHistory(str(tmp_path / "history.sqlite"))
+    history.record("run1", "Insecta", get_stats(100), OPTIONS, get_telemetry(1, 1))
+    history.record("run1", "Insecta", get_stats(100), OPTIONS, get_telemetry(10, 100))
+    history.record(
+        "run2", "Insecta", get_stats(1000), OPTIONS, get_telemetry(100, 1000)
+    )
+    estimates, run_count, matched, matched_species = history.estimate(1000, OPTIONS)
+    assert (run_count, matched, matched_species) == (2, True, False)
+    assert estimates["RepeatModeler"]["runs"] == 2
+    assert estimates["RepeatModeler"]["max_rss_mb"] == pytest.approx(1000)
+    assert estimates["RepeatModeler"]["cpu_seconds"] == pytest.approx(400)
+    assert estimates["RepeatModeler"]["jobs"] == pytest.approx(1)
+
+    # no run with other options, all runs are used
+    other = dict(OPTIONS, run_red_repeats=True)
+    assert history.estimate(1000, other)[1:] == (2, False, False)
+
+
+def test_estimates_from_the_same_species_if_enough_runs(tmp_path):
+    history = RunHistory(str(tmp_path / "history.sqlite"))
+    for i, size in enumerate([100, 200, 400]):
+        history.record(
+            f"plant{i}",
+            "Viridiplantae",
+            get_stats(size),
+            OPTIONS,
+            get_telemetry(size, size),
+        )
+        history.record(
+            f"insect{i}",
+            "Insecta",
+            get_stats(size),
+            OPTIONS,
+            get_telemetry(size * 10, size),
+        )
+    estimates, run_count, _, matched_species = history.estimate(800, OPTIONS, "Insecta")
+    assert (run_count, matched_species) == (3, True)
+    assert estimates["RepeatModeler"]["max_job_wall_clock_seconds"] == pytest.approx(
+        8000
+    )
+
+    # a single run of the species is too few, all runs are used
+    history.record("fish", "Danio", get_stats(100), OPTIONS, get_telemetry(1, 1))
+    assert history.estimate(800, OPTIONS, "Danio")[1:] == (7, True, False)
+
+
+def test_estimate_reads_the_species_of_the_run_config(tmp_path, capsys):
+    db = tmp_path / "history.sqlite"
+    history = RunHistory(str(db))
+    for i, size in enumerate([100, 200, 400]):
+        history.record(
+            f"insect{i}", "Insecta", get_stats(size), OPTIONS, get_telemetry(size, size)
+        )
+    history.record(
+        "plant", "Viridiplantae", get_stats(100), OPTIONS, get_telemetry(1, 1)
+    )
+    run_config = tmp_path / "run_config.yaml"
+    run_config.write_text(
+        f"output: {tmp_path}\nprefix:\n  index_name: genome\nspecies: Insecta\nhistory: {db}\n"
+        "stats:\n  fasta:\n    fasta: genome.fa\n    total_length: 800\n    sequence_count: 1\n    n50: 800\n"
+    )
+    args = Namespace(input=str(run_config), db=None, species=None, headroom=1.0)
+    assert Estimate(args).run() == 0
+    out = capsys.readouterr().out
+    assert "Estimated from 3 recorded runs with the same options of Insecta" in out
+    overrides = json.loads(out[out.index("{") :])
+    assert overrides["RepeatModeler"]["time"] == 14
@@ -0,0 +1,121 @@
+import gzip
+import signal
+import subprocess
+import sys
+import time
+from argparse import Namespace
+
+import pytest
+
+from eirepeat.scripts.scratch_run import ScratchRun
+
+# writes the uppercased input to the output directory argument, and a large alignment file
+TOOL = (
+    "import os, sys; "
+    "genome, out = sys.argv[1:]; "
+    "open(os.path.join(out, 'genome.out'), 'w').write(open(genome).read().upper() + os.getcwd()); "
+    "open('genome.align', 'w').write('alignment' * 100); "
+    "open('scratch.tmp', 'w').write('temporary')"
+)
+
+
+def get_args(tmp_path, command, **kwargs):
+    args = dict(
+        scratch=str(tmp_path / "scratch"),
+        inputs=[str(tmp_path / "shared" / "genome.fa")],
+        output_dir=str(tmp_path / "output"),
+        keep=["genome.out"],
+        compress=["genome.align"],
+        command=command,
+    )
+    args.update(kwargs)
+    return Namespace(**args)
+
+
+@pytest.fixture
+def shared(tmp_path):
+    (tmp_path / "shared").mkdir()
+    (tmp_path / "shared" / "genome.fa").write_text(">s\nacgt\n")
+    (tmp_path / "output").mkdir()
+    return tmp_path
+
+
+def test_paths_are_rewritten_to_the_staged_copies(shared):
+    genome, output = str(shared / "shared" / "genome.fa"), str(shared / "output")
+    scratch_run = ScratchRun(
+        get_args(shared, ["tool", "-dir", output, genome, "/db/Dfam.h5", "-x"])
+    )
+    scratch_run.scratch_dir = str(shared / "scratch")
+    (shared / "scratch").mkdir()
+    scratch_run.stage_inputs()
+    assert (shared / "scratch" / "genome.fa").read_text() == ">s\nacgt\n"
+    # inputs and the output directory are local, other absolute paths are left alone
+    assert scratch_run.localise_command() == [
+        "tool",
+        "-dir",
+        ".",
+        "genome.fa",
+        "/db/Dfam.h5",
+        "-x",
+    ]
+
+
+def test_runs_on_scratch_and_copies_back_the_outputs(shared):
+    command = [
+        sys.executable,
+        "-c",
+        TOOL,
+        str(shared / "shared" / "genome.fa"),
+        str(shared / "output"),
+    ]
+    assert ScratchRun(get_args(shared, command)).run() == 0
+    out = (shared / "output" / "genome.out").read_text()
+    assert out.startswith(">S\nACGT\n")
+    # the tool ran in the scratch directory, which is removed
+    assert out[len(">S\nACGT\n") :].startswith(str(shared / "scratch" / "eirepeat."))
+    assert list((shared / "scratch").iterdir()) == []
+    with gzip.open(shared / "output" / "genome.align.gz", "rt") as fh:
+        assert fh.read() == "alignment" * 100
+    assert sorted(p.name for p in (shared / "output").iterdir()) == [
+        "genome.align.gz",
+        "genome.out",
+    ]
+
+
+def test_failed_tool_copies_nothing_back(shared):
+    command = [sys.executable, "-c", "open('genome.out', 'w'); raise SystemExit(3)"]
+    assert ScratchRun(get_args(shared, command)).run() == 3
+    assert list((shared / "output").iterdir()) == []
+    assert list((shared / "scratch").iterdir()) == []
+
+
+@pytest.mark.parametrize("signum", [signal.SIGTERM, signal.SIGUSR2])
+def test_scratch_is_removed_on_scheduler_signals(shared, signum):
+    process = subprocess.Popen(
+        [
+            sys.executable,
+            "-m",
+            "eirepeat.scripts.scratch_run",
+            "--scratch",
+            str(shared / "scratch"),
+            "--inputs",
+            str(shared / "shared" / "genome.fa"),
+            "--output_dir",
+            str(shared / "output"),
+            "--keep",
+            "genome.out",
+            "--",
+            sys.executable,
+            "-c",
+            "import time; open('started', 'w'); time.sleep(60)",
+        ],
+        stderr=subprocess.DEVNULL,
+    )
+    deadline = time.monotonic() + 30
+    while not list((shared / "scratch").glob("eirepeat.*/started")):
+        assert time.monotonic() < deadline and process.poll() is None
+        time.sleep(0.05)
+    process.send_signal(signum)
+    assert process.wait(timeout=30) == 128 + signum
+    assert list((shared / "scratch").iterdir()) == []
+    assert list((shared / "output").iterdir()) == []
@@ -0,0 +1,88 @@
+from argparse import Namespace
+
+import pytest
+
+from eirepeat.scripts.eirepeat_configure import EIRepeatConfigure
+from eirepeat.scripts.species_index import SpeciesIndex
+
+TREE = """\
+root [ 5 ]
+    cellular organisms [ 4 ]
+        Eukaryota [ 4 {1} ]
+            Insecta [ 3 ]
+                Apis mellifera [ 2 ]
+                Bombus terrestris [ 1 ]
+            Insectivora [ 1 ]
+    Viruses [ 1 ]
+"""
+
+
+@pytest.fixture(autouse=True)
+def cache_home(tmp_path, monkeypatch):
+    monkeypatch.setenv("XDG_CACHE_HOME", str(tmp_path / "cache"))
+
+
+@pytest.fixture
+def tree_file(tmp_path):
+    tree_file = tmp_path / "tree.txt"
+    tree_file.write_text(TREE)
+    return str(tree_file)
+
+
+def test_parse_and_lineage(tree_file):
+    index = SpeciesIndex.load(tree_file)
+    assert len(index.names) == 8
+    assert index.get("apis MELLIFERA") == "Apis mellifera"
+    assert index.get("Apis") is None
+    assert index.get_count("Eukaryota") == 4
+    assert index.get_lineage("Bombus terrestris") == [
+        "root",
+        "cellular organisms",
+        "Eukaryota",
+        "Insecta",
+        "Bombus terrestris",
+    ]
+    assert index.get_lineage("Viruses") == ["root", "Viruses"]
+
+
+def test_search(tree_file):
+    index = SpeciesIndex.load(tree_file)
+    assert index.search_prefix("ins") == ["Insecta", "Insectivora"]
+    assert index.search_prefix("ins", limit=1) == ["Insecta"]
+    assert index.search_fuzzy("Insekta")[0][0] == "Insecta"
+    assert index.search_fuzzy("bombus terestris", limit=1)[0][0] == "Bombus terrestris"
+    assert index.search_fuzzy("xyz") == []
+    # prefix matches come first
+    assert index.search("insect")[:2] == ["Insecta", "Insectivora"]
+
+
+def test_index_is_cached(tree_file, tmp_path):
+    SpeciesIndex.load(tree_file)
+    assert len(list((tmp_path / "cache" / "eirepeat").iterdir())) == 1
+    # the cached index is used while the tree is unchanged
+    assert SpeciesIndex.load(tree_file).get("Insecta") == "Insecta"
+    with open(tree_file, "a") as fh:
+        fh.write("    Plantae [ 1 ]\n")
+    assert SpeciesIndex.load(tree_file).get("Plantae") == "Plantae"
+
+
+def get_args(tmp_path, species, skip_species_check=False):
+    fasta = tmp_path / "genome.fasta"
+    fasta.write_text(">1\nACGT\n")
+    return Namespace(
+        fasta=str(fasta),
+        species=species,
+        skip_species_check=skip_species_check,
+        close_reference=None,
+        organellar_fasta=None,
+        output=str(tmp_path / "output"),
+    )
+
+
+def test_configure_checks_species(tmp_path):
+    configure = EIRepeatConfigure(get_args(tmp_path, "insecta"))
+    assert configure.args.species == "Insecta"
+    with pytest.raises(ValueError, match="Did you mean: Insecta"):
+        EIRepeatConfigure(get_args(tmp_path, "Insekta"))
+    configure = EIRepeatConfigure(get_args(tmp_path, "Insekta", True))
+    assert configure.args.species == "Insekta"
@@ -0,0 +1,66 @@
+import os
+import stat
+import sys
+from argparse import Namespace
+
+import pytest
+
+from eirepeat.scripts.species_library import SpeciesLibrary
+
+OUT = """   SW   perc perc perc  query      position in query    matching   repeat    position in repeat
+score   div. del. ins.  sequence   begin end (left)   repeat     class/family  begin end (left)   ID
+
+  594   14.9  0.7 11.7  seq1          1    4 (4)   + (TTAAG)n   Simple_repeat     1    4 (0)  1
+"""
+# stand-in RepeatMasker finding one repeat, and with '-lib' in 'differ' mode another one as well
+REPEATMASKER = """#!{python}
+import os, sys
+args = sys.argv[1:]
+name = os.path.basename(args[-1])
+output = os.path.join(args[args.index("-dir") + 1], name)
+extra = "{mode}" == "differ" and "-lib" in args
+with open(output + ".out", "w") as fh:
+    fh.write({out!r})
+    if extra:
+        fh.write({out!r}.splitlines()[-1] + "\\n")
+with open(output + ".masked", "w") as fh:
+    fh.write(">seq1\\nacgt" + ("acgt" if extra else "ACGT") + "\\n")
+"""
+
+
+def write_repeatmasker(repeatmasker_dir, mode):
+    os.makedirs(repeatmasker_dir / "Libraries")
+    (repeatmasker_dir / "Libraries" / "famdb").touch()
+    path = repeatmasker_dir / "RepeatMasker"
+    path.write_text(REPEATMASKER.format(python=sys.executable, mode=mode, out=OUT))
+    path.chmod(path.stat().st_mode | stat.S_IXUSR)
+
+
+@pytest.mark.parametrize("mode", ["same", "differ"])
+def test_compare_species_and_library_masking(tmp_path, mode, capsys):
+    write_repeatmasker(tmp_path / "RepeatMasker", mode)
+    (tmp_path / "genome.fa").write_text(">seq1\nACGTACGT\n")
+    (tmp_path / "species.lib.fa").write_text(">TTAAG#Simple_repeat\nTTAAGTTAAG\n")
+    args = Namespace(
+        species="Insecta",
+        output=str(tmp_path / "species.lib.fa"),
+        repeatmasker_dir=str(tmp_path / "RepeatMasker"),
+        print_version=False,
+        compare=str(tmp_path / "genome.fa"),
+        threads=1,
+    )
+    if mode == "same":
+        SpeciesLibrary(args).run()
+    else:
+        with pytest.raises(SystemExit, match="mask '.*genome.fa' differently"):
+            SpeciesLibrary(args).run()
+    assert capsys.readouterr().out.splitlines() == [
+        "RepeatMasker -species: 1 hits, 4 masked bases",
+        f"RepeatMasker -lib: {1 if mode == 'same' else 2} hits, {4 if mode == 'same' else 8} masked bases",
+    ]
+    # the library is not extracted again, and the comparison runs are removed
+    assert sorted(p.name for p in tmp_path.iterdir()) == [
+        "RepeatMasker",
+        "genome.fa",
+        "species.lib.fa",
+    ]
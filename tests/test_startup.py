@@ -0,0 +1,61 @@
+import os
+import subprocess
+import sys
+import time
+
+import pytest
+
+# seconds `eirepeat --version` may take on top of the bare interpreter startup
+STARTUP_BUDGET = float(os.environ.get("EIREPEAT_STARTUP_BUDGET", 0.5))
+HEAVY_MODULES = ["pkg_resources", "snakemake", "requests", "yaml", "tabulate"]
+
+
+def best_time(cmd, repeats=5):
+    best = None
+    for _ in range(repeats):
+        start = time.perf_counter()
+        subprocess.run(cmd, check=True, stdout=subprocess.DEVNULL)
+        elapsed = time.perf_counter() - start
+        best = elapsed if best is None else min(best, elapsed)
+    return best
+
+
+def test_version_startup_within_budget():
+    baseline = best_time([sys.executable, "-c", "pass"])
+    version = best_time([sys.executable, "-m", "eirepeat", "--version"])
+    assert version - baseline < STARTUP_BUDGET, (
+        f"'eirepeat --version' took {version:.3f}s, "
+        f"{version - baseline:.3f}s over the interpreter startup (budget {STARTUP_BUDGET}s)"
+    )
+
+
+@pytest.mark.parametrize("module", HEAVY_MODULES)
+def test_cli_import_is_lazy(module):
+    code = f"import sys, eirepeat.__main__; sys.exit(int({module!r} in sys.modules))"
+    result = subprocess.run([sys.executable, "-c", code])
+    assert result.returncode == 0, f"importing the CLI imports '{module}'"
+
+
+def test_version_output():
+    from eirepeat import __version__
+
+    result = subprocess.run(
+        [sys.executable, "-m", "eirepeat", "--version"],
+        check=True,
+        capture_output=True,
+        text=True,
+    )
+    assert result.stdout.strip().endswith(__version__)
+
+
+def test_estimate_arguments_are_shared():
+    helps = list()
+    for module in ("eirepeat", "eirepeat.scripts.run_history"):
+        result = subprocess.run(
+            [sys.executable, "-m", module, "estimate", "-h"],
+            check=True,
+            capture_output=True,
+            text=True,
+        )
+        helps.append(result.stdout[result.stdout.index("positional arguments") :])
+    assert helps[0] == helps[1]